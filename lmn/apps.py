@@ -1,5 +1,36 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+def install_search(using='default', **kwargs):
+    """ Puts back the search triggers of any table a migration rebuilt, see search.py. """
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+    from .search import install
+
+    connection = connections[using]
+    # Not when the migration adding search has been rolled back.
+    if ('lmn', '0010_search_index') in MigrationRecorder(connection).applied_migrations():
+        install(connection)
 
 
 class LmnConfig(AppConfig):
     name = 'lmn'
+
+    def ready(self):
+        from .autocomplete import clear_for_model, models
+        from .models import Note, note_deleted
+        from .note_cache import note_changed
+        from . import notes_feed
+
+        post_migrate.connect(install_search, sender=self)
+        for model in models.values():
+            post_save.connect(clear_for_model, sender=model)
+            post_delete.connect(clear_for_model, sender=model)
+        post_delete.connect(note_deleted, sender=Note)
+        post_save.connect(note_changed, sender=Note)
+        post_delete.connect(note_changed, sender=Note)
+        post_save.connect(notes_feed.note_changed, sender=Note)
+        post_delete.connect(notes_feed.note_changed, sender=Note)
+        for model in notes_feed.display_fields:
+            post_save.connect(notes_feed.display_changed, sender=model)
@@ -0,0 +1,203 @@
+""" Autocomplete for artist and venue names, answered from memory without a database query.
+
+Each process keeps a prefix index of the names: every name is normalized, to lower case words without accents
+or punctuation, and listed once for each word in it, starting from that word, so 'beat' completes The Beatles.
+The listings are sorted, and a prefix's matches are the run of listings found by bisecting for the prefix.
+Matches are ranked by note activity, the number of notes on the artist's or venue's shows, then by shorter name.
+
+An index is loaded on the first request for it, with one query. Saving or deleting an artist or venue, and an
+ingest run, clear this process's index so the next request reloads it. Other processes, such as the sync worker's,
+can't clear it, so an index older than AUTOCOMPLETE_MAX_AGE seconds is also reloaded, on a background thread
+while the old index keeps answering. """
+
+import re
+import time
+import heapq
+import logging
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from .models import Artist, Venue
+
+
+# The most names a completion returns.
+max_limit = 50
+
+# Prefixes matching more listings than this have their best names found when the index is built,
+# since ranking a long run of listings takes too long to do for each keystroke.
+remembered_run_length = 256
+
+
+word_pattern = re.compile(r'\w+')
+
+
+def normalize(text):
+    """ text in lower case, without accents, as its words separated by single spaces. """
+    text = text.casefold()
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return ' '.join(word_pattern.findall(text))
+
+
+class PrefixIndex:
+    """ The names of one model, ready to complete prefixes. """
+
+    def __init__(self, rows):
+        """ rows are (pk, name, activity) tuples. """
+
+        # Best first, so a name's position in this list is its rank.
+        self.rows = sorted(rows, key=lambda row: (-row[2], len(row[1]), row[1].casefold(), row[0]))
+
+        listings = []
+        for rank, (pk, name, activity) in enumerate(self.rows):
+            words = normalize(name)
+            listings.append((words, rank))
+            space = words.find(' ')
+            while space != -1:
+                listings.append((words[space + 1:], rank))
+                space = words.find(' ', space + 1)
+        listings.sort()
+
+        self.keys = [key for key, rank in listings]
+        self.ranks = [rank for key, rank in listings]
+        self.remembered = self.best_for_long_runs()
+        self.built = time.monotonic()
+
+    def run(self, prefix, start=0, end=None):
+        """ The start and end of the listings starting with prefix, searching between start and end. """
+        start = bisect_left(self.keys, prefix, start, len(self.keys) if end is None else end)
+        # Every key starting with prefix sorts before prefix followed by the highest character.
+        return start, bisect_left(self.keys, prefix + '\U0010ffff', start, len(self.keys) if end is None else end)
+
+    def best(self, start, end, limit):
+        """ The ranks of the best limit names listed between start and end. """
+        # A name can be listed more than once in a run, once for each of its matching words.
+        return heapq.nsmallest(limit, set(self.ranks[start:end]))
+
+    def best_for_long_runs(self):
+        """ The ranks of the best max_limit names for each prefix with a run longer than remembered_run_length.
+        Looks at one character longer prefixes inside each long run, until the runs are short. """
+        remembered = {}
+        long_runs = [(0, len(self.keys))]
+        length = 1
+        while long_runs:
+            longer_runs = []
+            for run_start, run_end in long_runs:
+                position = run_start
+                while position < run_end:
+                    prefix = self.keys[position][:length]
+                    start, end = self.run(prefix, position, run_end)
+                    if len(prefix) == length and end - start > remembered_run_length:
+                        longer_runs.append((start, end))
+                        # Searches are normalized, so never end with a space.
+                        if not prefix.endswith(' '):
+                            remembered[prefix] = self.best(start, end, max_limit)
+                    # Keys shorter than length sort first in their run, and are only matched by shorter prefixes.
+                    position = end if end > position else position + 1
+            long_runs = longer_runs
+            length += 1
+        return remembered
+
+    def complete(self, text, limit):
+        """ The best limit names with a word starting with text, as (pk, name, activity) tuples. """
+        prefix = normalize(text)
+        if not prefix:
+            return []
+
+        if prefix in self.remembered and limit <= max_limit:
+            best = self.remembered[prefix][:limit]
+        else:
+            best = self.best(*self.run(prefix), limit)
+        return [self.rows[rank] for rank in best]
+
+
+def load(model):
+    """ A PrefixIndex of model's names, with their note activity, from one query. """
+    activity = Coalesce(Sum('show__note_count'), 0)
+    return PrefixIndex(model.objects.annotate(activity=activity).values_list('pk', 'name', 'activity'))
+
+
+models = {'artists': Artist, 'venues': Venue}
+
+# The loaded index of each of models, or None until it is next needed.
+_indexes = dict.fromkeys(models)
+_lock = threading.Lock()
+_reloading = set()
+# Counts the clears, so a background reload that started before a clear doesn't put back what it read.
+_generation = 0
+
+
+def clear(kind=None):
+    """ Forgets the index of kind, or of every model, so it's reloaded when next needed. """
+    global _generation
+
+    with _lock:
+        _generation += 1
+        for key in [kind] if kind else models:
+            _indexes[key] = None
+
+
+def clear_for_model(sender, **kwargs):
+    """ A post_save and post_delete receiver, connected in apps.py. """
+    for kind, model in models.items():
+        if sender is model:
+            clear(kind)
+
+
+def _reload_in_background(kind):
+    """ Replaces kind's index with a fresh one, on a thread, unless one is already being loaded. """
+    with _lock:
+        if kind in _reloading:
+            return
+        _reloading.add(kind)
+        generation = _generation
+
+    def reload():
+        try:
+            fresh = load(models[kind])
+            with _lock:
+                if generation == _generation:
+                    _indexes[kind] = fresh
+        except Exception as e:
+            logging.exception(f'Error: reloading the {kind} autocomplete index. {e}')
+        finally:
+            _reloading.discard(kind)
+            # This thread's database connection isn't closed by the end of a request.
+            connection.close()
+
+    threading.Thread(target=reload, daemon=True).start()
+
+
+def index(kind):
+    """ The index of kind, 'artists' or 'venues', loading it if needed. """
+    current = _indexes[kind]
+    if current is None:
+        with _lock:
+            # Another request may have loaded it while this one waited.
+            current = _indexes[kind]
+            if current is None:
+                current = _indexes[kind] = load(models[kind])
+    elif time.monotonic() - current.built > settings.AUTOCOMPLETE_MAX_AGE:
+        _reload_in_background(kind)
+    return current
+
+
+def complete(kind, text, limit=10):
+    """
+    Completes text as an artist or venue name.
+
+    Args:
+        kind (str): 'artists' or 'venues'.
+        text (str): What has been typed so far.
+        limit (int): The most names returned.
+
+    Returns:
+        list: Up to limit dictionaries with the id, name and note activity of a match, most active first.
+    """
+    return [{'id': pk, 'name': name, 'notes': activity} for pk, name, activity in index(kind).complete(text, limit)]
@@ -0,0 +1,128 @@
+""" Compares the read-only JSON API with the pages rendered from templates, by timing both as they page through
+the same artists, venues and notes, 20 at a time, following each page's next cursor.
+Then compares serializing alone: rows from values() written as JSON, against model instances rendered by the
+show notes template.
+
+Run with
+python manage.py test lmn.benchmarks.bench_api
+
+Set BENCH_API_NOTES to change the number of notes, 20000 by default.
+"""
+
+import os
+import json
+import time
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from lmn.models import Artist, Note, Show, Venue
+from lmn.views.views_json_api import lookups, note_fields, serialize
+
+
+note_count = int(os.getenv('BENCH_API_NOTES', 20000))
+show_count = max(note_count // 10, 10)
+artist_count = venue_count = user_count = max(note_count // 20, 10)
+# The most pages read from each list.
+page_count = 100
+serialized_rows = 2000
+
+
+# Show notes pages aren't cached, so both read the database on every page.
+@override_settings(NOTES_PAGE_CACHE_SECONDS=0)
+class ApiBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        random.seed(0)
+        start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+
+        Artist.objects.bulk_create([Artist(name=f'Artist {n}') for n in range(artist_count)])
+        Venue.objects.bulk_create([
+            Venue(name=f'Venue {n}', city='Minneapolis', state='MN') for n in range(venue_count)
+        ])
+        User.objects.bulk_create([User(username=f'user{n}') for n in range(user_count)])
+        artist_pks = list(Artist.objects.values_list('pk', flat=True))
+        venue_pks = list(Venue.objects.values_list('pk', flat=True))
+        user_pks = list(User.objects.values_list('pk', flat=True))
+
+        Show.objects.bulk_create([
+            Show(
+                artist_id=random.choice(artist_pks), venue_id=random.choice(venue_pks),
+                show_date=start + timedelta(hours=n)
+            )
+            for n in range(show_count)
+        ], batch_size=5000)
+        show_pks = list(Show.objects.values_list('pk', flat=True))
+        cls.show_pk = show_pks[0]
+
+        # Every note is for one of a few shows, so a show has many pages of notes.
+        Note.objects.bulk_create([
+            Note(show_id=show_pks[n % 5], user_id=random.choice(user_pks), title=f'Note {n}', text='Great show ' * 20)
+            for n in range(note_count)
+        ], batch_size=5000)
+
+    def walk(self, url, filters, next_cursor, rows):
+        """ Reads up to page_count pages from url with GET parameters filters, following next_cursor(response).
+        Returns the rows read and the time taken. """
+        read = 0
+        params = dict(filters)
+        started = time.perf_counter()
+        for _ in range(page_count):
+            response = self.client.get(url, params)
+            self.assertEqual(200, response.status_code)
+            read += rows(response)
+            cursor = next_cursor(response)
+            if cursor is None:
+                break
+            params = dict(filters, cursor=cursor)
+        return read, time.perf_counter() - started
+
+    def walk_html(self, url, context_name):
+        def next_cursor(response):
+            page = response.context[context_name]
+            return page.next_cursor if page.has_next else None
+        return self.walk(url, {}, next_cursor, lambda response: len(response.context[context_name]))
+
+    def walk_json(self, url, filters):
+        def rows(response):
+            return len(response.json()['results'])
+        return self.walk(url, filters, lambda response: response.json()['next_cursor'], rows)
+
+    def test_json_pages_against_template_pages(self):
+        print(f'\n{note_count} notes, {show_count} shows, {artist_count} artists, venues and users')
+        lists = [
+            ('artists', reverse('artist_list'), 'artists', reverse('api_artist_list'), {}),
+            ('venues', reverse('venue_list'), 'venues', reverse('api_venue_list'), {}),
+            ('show notes', reverse('notes_for_show', kwargs={'show_pk': self.show_pk}), 'notes',
+             reverse('api_note_list'), {'show': self.show_pk}),
+        ]
+        for name, html_url, context_name, json_url, filters in lists:
+            html_rows, html_time = self.walk_html(html_url, context_name)
+            json_rows, json_time = self.walk_json(json_url, filters)
+            print(f'{name:>12}: template {html_rows / html_time:9.0f} rows/s   '
+                  f'json {json_rows / json_time:9.0f} rows/s   {html_time / json_time:5.1f}x')
+            with self.subTest(list=name):
+                self.assertEqual(html_rows, json_rows)
+
+    def test_values_serialization_against_template_rendering(self):
+        notes = Note.objects.select_related('show__artist', 'show__venue', 'user').order_by('-posted_date', '-id')
+        notes = list(notes[:serialized_rows])
+        rows = list(Note.objects.order_by('-posted_date', '-id').values(*lookups(note_fields))[:serialized_rows])
+
+        started = time.perf_counter()
+        render_to_string('lmn/notes/notes_for_show.html', {'show': notes[0].show, 'notes': notes, 'cache_seconds': 0})
+        template_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        json.dumps({'results': serialize(rows, note_fields)}, cls=DjangoJSONEncoder)
+        json_time = time.perf_counter() - started
+
+        print(f'\n{serialized_rows} notes: template {serialized_rows / template_time:9.0f} rows/s   '
+              f'values() json {serialized_rows / json_time:9.0f} rows/s   {template_time / json_time:5.1f}x')
+        self.assertLess(json_time, template_time)
@@ -0,0 +1,51 @@
+""" Times autocomplete keystrokes against an in-memory prefix index of a large catalog of artist names,
+typing each name of a sample one character at a time.
+
+Run with
+python manage.py test lmn.benchmarks.bench_autocomplete
+
+Set BENCH_AUTOCOMPLETE_ARTISTS to change the number of names.
+"""
+
+import os
+import time
+import random
+import string
+from statistics import median
+
+from django.test import SimpleTestCase
+
+from lmn.autocomplete import PrefixIndex
+
+
+artist_count = int(os.getenv('BENCH_AUTOCOMPLETE_ARTISTS', 500000))
+typed_names = 200
+
+
+class AutocompleteBenchmark(SimpleTestCase):
+
+    def test_keystrokes_answer_in_under_a_millisecond(self):
+        random.seed(0)
+        words = [''.join(random.choices(string.ascii_lowercase, k=random.randint(3, 9))) for _ in range(30000)]
+        rows = [
+            (n, ' '.join(random.choices(words, k=random.randint(1, 3))).title(), random.randint(0, 50))
+            for n in range(artist_count)
+        ]
+
+        started = time.perf_counter()
+        index = PrefixIndex(rows)
+        load_time = time.perf_counter() - started
+
+        timings = []
+        for pk, name, activity in random.sample(rows, typed_names):
+            for end in range(1, len(name) + 1):
+                started = time.perf_counter()
+                index.complete(name[:end], 10)
+                timings.append(time.perf_counter() - started)
+
+        timings.sort()
+        print(f'\n{artist_count} names indexed in {load_time:.2f}s, {len(index.keys)} listings')
+        print(f'{len(timings)} keystrokes: median {median(timings) * 1e6:.0f}us, '
+              f'99th percentile {timings[int(len(timings) * 0.99)] * 1e6:.0f}us, max {timings[-1] * 1e6:.0f}us')
+
+        self.assertLess(timings[int(len(timings) * 0.99)], 0.001)
@@ -0,0 +1,71 @@
+""" Measures ingest throughput, first through the HTTP client against the local stand-in server,
+then replaying the same pages from disk so only parsing and database writes are timed.
+
+Run with
+python manage.py test lmn.benchmarks.bench_ingest
+
+The payload can be changed with environment variables, for example
+BENCH_EVENTS=20000 BENCH_LATENCY=0.05 BENCH_WORKERS=8 python manage.py test lmn.benchmarks.bench_ingest
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from django.test import TestCase, override_settings
+
+from lmn.models import Artist, Venue, Show
+from lmn.ticketmaster.client import TicketmasterClient
+from lmn.ticketmaster.ratelimit import RequestScheduler
+from lmn.ticketmaster.sources import ApiSource, RecordingSource, ReplaySource
+from lmn.ticketmaster.standin import StandInServer
+from lmn.ticketmaster.sync import sync_all_events
+
+
+event_count = int(os.getenv('BENCH_EVENTS', 10000))
+latency = float(os.getenv('BENCH_LATENCY', 0.02))
+workers = int(os.getenv('BENCH_WORKERS', 4))
+
+
+@override_settings(TICKETMASTER_CACHE_DIR='', TICKETMASTER_MAX_RESULTS=event_count)
+class IngestBenchmark(TestCase):
+
+    def setUp(self):
+        self.server = StandInServer(
+            event_count=event_count, artist_count=event_count // 10, venue_count=200, latency=latency
+        )
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def timed_sync(self, source):
+        started = time.perf_counter()
+        sync_all_events({'dmaId': '336'}, full=True, source=source)
+        elapsed = time.perf_counter() - started
+        rows = Artist.objects.count() + Venue.objects.count() + Show.objects.count()
+        return rows, elapsed
+
+    def test_ingest_throughput(self):
+        with override_settings(TICKETMASTER_BASE_URL=self.server.base_url):
+            # The stand-in has no quota, so the scheduler only needs to let requests through.
+            client = TicketmasterClient('key', workers=workers, session=requests.Session(),
+                                        scheduler=RequestScheduler(rate=100000, max_retries=0))
+            http_rows, http_time = self.timed_sync(RecordingSource(ApiSource(client), self.directory.name))
+
+        Show.objects.all().delete()
+        Artist.objects.all().delete()
+        Venue.objects.all().delete()
+        replay_rows, replay_time = self.timed_sync(ReplaySource(self.directory.name))
+
+        print(f'\n{event_count} events, {latency * 1000:.0f}ms latency per request, {workers} fetch workers')
+        print(f'stand-in over HTTP: {http_rows:7d} rows {http_time:7.2f}s {http_rows / http_time:9.0f} rows/s')
+        print(f'replay from disk:   {replay_rows:7d} rows {replay_time:7.2f}s {replay_rows / replay_time:9.0f} rows/s')
+
+        self.assertEqual(http_rows, replay_rows)
+        self.assertEqual(Show.objects.count(), event_count)
@@ -0,0 +1,104 @@
+""" Checks that the queries listing notes and shows read their rows in order from an index, instead of scanning
+the table or sorting, by reading the database's query plan for each, on a large dataset.
+
+Run with
+python manage.py test lmn.benchmarks.bench_list_indexes
+
+Set BENCH_NOTES to change the number of notes, 200000 by default.
+"""
+
+import os
+import re
+import time
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from lmn.models import Artist, Note, Show, Venue
+
+
+note_count = int(os.getenv('BENCH_NOTES', 200000))
+show_count = note_count // 10
+artist_count = venue_count = user_count = max(note_count // 200, 10)
+
+
+def sorts_or_scans(plan):
+    """ The lines of a query plan that sort rows or read a whole table. """
+    if connection.vendor == 'postgresql':
+        return [line for line in plan.splitlines() if re.search(r'\b(Sort|Seq Scan)\b', line)]
+    # SQLite says SCAN table for a full scan, and SCAN table USING INDEX for reading an index in order.
+    # A covering index scan is fine too, but none of these queries should need one.
+    return [line for line in plan.splitlines() if 'TEMP B-TREE' in line or re.search(r'SCAN \w+\s*$', line)]
+
+
+class ListIndexBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        random.seed(0)
+        start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+
+        Artist.objects.bulk_create([Artist(name=f'Artist {n}') for n in range(artist_count)])
+        Venue.objects.bulk_create([
+            Venue(name=f'Venue {n}', city='Minneapolis', state='MN') for n in range(venue_count)
+        ])
+        User.objects.bulk_create([User(username=f'user{n}') for n in range(user_count)])
+        artist_pks = list(Artist.objects.values_list('pk', flat=True))
+        venue_pks = list(Venue.objects.values_list('pk', flat=True))
+        user_pks = list(User.objects.values_list('pk', flat=True))
+
+        Show.objects.bulk_create([
+            Show(
+                artist_id=random.choice(artist_pks), venue_id=random.choice(venue_pks),
+                show_date=start + timedelta(hours=n)
+            )
+            for n in range(show_count)
+        ], batch_size=5000)
+        show_pks = list(Show.objects.values_list('pk', flat=True))
+
+        # posted_date is set to now when a note is created, so set the dates after.
+        Note.objects.bulk_create([
+            Note(show_id=random.choice(show_pks), user_id=random.choice(user_pks), title=f'Note {n}', text='Great show')
+            for n in range(note_count)
+        ], batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE lmn_note SET posted_date = %s', [start])
+            # The query planner picks indexes from table statistics, which a real database keeps up to date.
+            cursor.execute('ANALYZE')
+
+        cls.show = Show.objects.get(pk=show_pks[len(show_pks) // 2])
+        cls.user = User.objects.get(pk=user_pks[0])
+        cls.artist = Artist.objects.get(pk=artist_pks[0])
+        cls.venue = Venue.objects.get(pk=venue_pks[0])
+
+    def queries(self):
+        """ The list queries of the views, by name. """
+        return {
+            'latest_notes':
+                Note.objects.select_related('show__artist', 'show__venue', 'user').order_by('-posted_date')[:20],
+            'notes_for_show':
+                Note.objects.filter(show=self.show.pk).select_related('user').order_by('-posted_date', '-id')[:21],
+            'user_profile':
+                Note.objects.filter(user=self.user.pk).select_related('show__artist', 'show__venue')
+                .order_by('-posted_date', '-id')[:21],
+            'venues_for_artist':
+                Show.objects.filter(artist=self.artist.pk).select_related('venue').order_by('-show_date'),
+            'artists_at_venue':
+                Show.objects.filter(venue=self.venue.pk).select_related('artist').order_by('-show_date'),
+        }
+
+    def test_list_queries_use_index_order(self):
+        print(f'\n{note_count} notes, {show_count} shows, {artist_count} artists, venues and users')
+        for name, queryset in self.queries().items():
+            plan = queryset.explain()
+            started = time.perf_counter()
+            rows = len(list(queryset))
+            elapsed = time.perf_counter() - started
+
+            print(f'{name:>18}: {rows:6d} rows in {elapsed * 1000:7.2f}ms')
+            print('    ' + plan.replace('\n', '\n    '))
+            with self.subTest(query=name):
+                self.assertEqual([], sorts_or_scans(plan))
@@ -0,0 +1,69 @@
+""" Times artist searches over a large catalog, with the trigram search index versus scanning every name
+with name__icontains, as the artist list did before.
+
+Run with
+python manage.py test lmn.benchmarks.bench_search
+
+Set BENCH_SEARCH_ARTISTS to change the catalog size, for example to 1000000. Loading a million artists
+takes a couple of minutes.
+"""
+
+import os
+import time
+import random
+import string
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from lmn.models import Artist
+from lmn.search import search
+
+
+artist_count = int(os.getenv('BENCH_SEARCH_ARTISTS', 200000))
+searches = ['zqxv', 'moon', 'aardv', 'blue the', 'Artist 12345']
+repeats = 5
+
+
+class SearchBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        random.seed(0)
+        words = [''.join(random.choices(string.ascii_lowercase, k=random.randint(3, 9))) for _ in range(20000)]
+        words += ['blue', 'moon', 'the', 'aardvark']
+        artists = (Artist(name=f'{" ".join(random.choices(words, k=2))} Artist {n}') for n in range(artist_count))
+        batch = []
+        for artist in artists:
+            batch.append(artist)
+            if len(batch) == 10000:
+                Artist.objects.bulk_create(batch)
+                batch = []
+        Artist.objects.bulk_create(batch)
+
+    def first_page(self, text):
+        """ What the artist list reads for a search, the first 20 results and the number of matches. """
+        results = search(Artist.objects.all(), text)
+        return list(results.order_by('search_rank', 'id')[:20]), results.count()
+
+    def measure(self, text):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            page, count = self.first_page(text)
+        return (time.perf_counter() - started) / repeats, count
+
+    def test_indexed_search_is_faster_than_scanning(self):
+        print(f'\n{artist_count} artists, milliseconds per search (first page and count)')
+        print(f'{"search":>14} {"matches":>8} {"indexed":>9} {"scan":>9}')
+
+        for text in searches:
+            indexed, matches = self.measure(text)
+            with patch('lmn.search.has_index', return_value=False):
+                scanned, scanned_matches = self.measure(text)
+
+            print(f'{text:>14} {matches:8d} {indexed * 1000:9.2f} {scanned * 1000:9.2f}')
+            self.assertEqual(matches, scanned_matches)
+
+            # Selective searches read a few index entries, where the scan reads every name.
+            if matches < 100:
+                self.assertLess(indexed, scanned)
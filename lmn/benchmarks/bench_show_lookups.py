@@ -0,0 +1,78 @@
+""" Compares the queries needed to match a 10,000 event Ticketmaster payload to its artists and venues,
+looking each one up per event versus preloading name to primary key maps with build_shows.
+
+Run with
+python manage.py test lmn.benchmarks.bench_show_lookups
+"""
+
+import time
+
+from django.db import connection
+from django.test import TestCase
+
+from lmn.models import Artist, Venue
+from lmn.ticketmaster.client import page_size
+from lmn.ticketmaster.ingest import build_shows
+
+
+event_count = 10000
+artist_count = 2000
+venue_count = 300
+
+
+def make_event(n):
+    return {
+        'id': str(n),
+        'dates': {'start': {'dateTime': f'2023-{n % 12 + 1:02d}-{n % 28 + 1:02d}T{n % 24:02d}:00:00Z'}},
+        '_embedded': {
+            'attractions': [{'name': f'Artist {n % artist_count}'}],
+            'venues': [
+                {'name': f'Venue {n % venue_count}', 'city': {'name': 'Minneapolis'}, 'state': {'stateCode': 'MN'}}
+            ],
+        },
+    }
+
+
+class ShowLookupBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Artist.objects.bulk_create([Artist(name=f'Artist {n}') for n in range(artist_count)])
+        Venue.objects.bulk_create([
+            Venue(name=f'Venue {n}', city='Minneapolis', state='MN') for n in range(venue_count)
+        ])
+        events = [make_event(n) for n in range(event_count)]
+        cls.pages = [events[start:start + page_size] for start in range(0, event_count, page_size)]
+
+    def measure(self, match):
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        # CaptureQueriesContext keeps at most 9000 queries, so count them directly.
+        with connection.execute_wrapper(count_query):
+            started = time.perf_counter()
+            for page in self.pages:
+                match(page)
+            elapsed = time.perf_counter() - started
+        return queries, elapsed
+
+    def per_event_lookups(self, page):
+        """ The previous approach: one get() for the artist and one for the venue of every event. """
+        for result in page:
+            Artist.objects.get(name=result['_embedded']['attractions'][0]['name'])
+            Venue.objects.get(name=result['_embedded']['venues'][0]['name'])
+
+    def test_preloaded_lookups_use_far_fewer_queries(self):
+        per_event_queries, per_event_time = self.measure(self.per_event_lookups)
+        preloaded_queries, preloaded_time = self.measure(build_shows)
+
+        print(f'\n{event_count} events in {len(self.pages)} pages')
+        print(f'per-event gets:   {per_event_queries:6d} queries {per_event_time:7.3f}s')
+        print(f'preloaded maps:   {preloaded_queries:6d} queries {preloaded_time:7.3f}s')
+
+        self.assertEqual(per_event_queries, 2 * event_count)
+        self.assertEqual(preloaded_queries, 2 * len(self.pages))
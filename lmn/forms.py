@@ -5,14 +5,19 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.forms import ValidationError
 from django.core.validators import RegexValidator
+from django.urls import reverse_lazy
 
 
 class VenueSearchForm(forms.Form):
-    search_name = forms.CharField(label='Venue Name', max_length=200)
+    search_name = forms.CharField(label='Venue Name', max_length=200, widget=forms.TextInput(
+        attrs={'autocomplete': 'off', 'data-autocomplete-url': reverse_lazy('venue_autocomplete')}
+    ))
 
 
 class ArtistSearchForm(forms.Form):
-    search_name = forms.CharField(label='Artist Name', max_length=200)
+    search_name = forms.CharField(label='Artist Name', max_length=200, widget=forms.TextInput(
+        attrs={'autocomplete': 'off', 'data-autocomplete-url': reverse_lazy('artist_autocomplete')}
+    ))
 
 
 class NewNoteForm(forms.ModelForm):
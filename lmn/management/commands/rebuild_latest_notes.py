@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from lmn import notes_feed
+
+
+class Command(BaseCommand):
+    help = 'Reads the latest notes feed from the database into the cache, for example after a deploy or a cache flush.'
+
+    def handle(self, *args, **options):
+        notes_feed.forget()
+        feed = notes_feed.rebuild()
+        self.stdout.write(f'Rebuilt the latest notes feed with {len(feed.notes)} notes.')
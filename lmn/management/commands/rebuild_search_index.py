@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from lmn.search import install
+
+
+class Command(BaseCommand):
+    help = 'Creates any missing artist and venue search indexes, and refills the SQLite indexes from the tables.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not install(connection, rebuild=True):
+                self.stdout.write(f'{connection.vendor} has no search index, so searches scan the names.')
+                return
+
+        self.stdout.write('Rebuilt the search indexes.')
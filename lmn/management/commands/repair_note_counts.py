@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from lmn.models import Note, Show
+
+
+def actual_note_counts():
+    """ An expression for the number of notes each show really has, to use in a Show query. """
+    counts = Note.objects.filter(show=OuterRef('pk')).order_by().values('show')
+    counts = counts.annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recounts the notes of every show, and fixes the shows whose stored note_count is wrong.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report the shows with a wrong note count, without fixing them.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            wrong = Show.objects.exclude(note_count=actual_note_counts())
+
+            if options['check']:
+                counts = wrong.annotate(actual=actual_note_counts()).values_list('pk', 'note_count', 'actual')
+                for show_pk, stored, actual in counts:
+                    self.stdout.write(f'Show {show_pk}: note_count {stored}, has {actual} notes')
+                self.stdout.write(f'{wrong.count()} shows have a wrong note count.')
+                return
+
+            # One UPDATE fixes every wrong count, however many shows there are.
+            fixed = wrong.update(note_count=actual_note_counts())
+
+        self.stdout.write(f'Fixed the note count of {fixed} shows.')
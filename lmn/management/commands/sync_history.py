@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from lmn.models import SyncRun
+from lmn.ticketmaster.stats import stages
+
+
+class Command(BaseCommand):
+    help = 'Shows recent Ticketmaster sync runs, with the time spent in each stage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('endpoint', nargs='?', help='Only show runs of this sync endpoint.')
+        parser.add_argument('--limit', type=int, default=20, help='Number of runs to show, newest first. Default 20.')
+        parser.add_argument('--json', action='store_true', help='Print each run\'s summary as one line of JSON.')
+
+    def handle(self, *args, **options):
+        runs = SyncRun.objects.order_by('-started', '-pk')
+        if options['endpoint']:
+            runs = runs.filter(endpoint=options['endpoint'])
+
+        for run in runs[:options['limit']]:
+            if options['json']:
+                self.stdout.write(json.dumps(dict(run.summary, id=run.pk, started=run.started.isoformat())))
+                continue
+
+            summary = run.summary
+            timings = '  '.join(
+                f"{stage} {summary['stages'][stage]['seconds']:.2f}s/{summary['stages'][stage]['rows']}"
+                for stage in stages
+            )
+            status = 'ok' if run.succeeded else f'FAILED {run.error}'
+            self.stdout.write(f"{run.started:%Y-%m-%d %H:%M:%S}  {run.endpoint:<7} {run.market:<20} "
+                              f"{summary['seconds']:>8.2f}s  {timings}  {summary['bytes_downloaded']} bytes  "
+                              f"{summary['retries']} retries  {status}")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lmn.ticketmaster.jobs import enqueue
+from lmn.ticketmaster.markets import run_sync
+from lmn.ticketmaster.sources import RecordingSource
+from lmn.ticketmaster.sync import event_source, syncs
+
+
+class Command(BaseCommand):
+    help = 'Syncs artists, venues and shows from the Ticketmaster API, now or by queueing a job for the sync worker.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('endpoint', nargs='?', default='events', choices=list(syncs),
+                            help='What to sync. "events" syncs artists, venues and shows together. Default events.')
+        parser.add_argument('--full', action='store_true', help='Ignore the sync cursor and reload everything.')
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Queue the sync for the sync worker instead of running it now.')
+        parser.add_argument('--record', metavar='DIRECTORY',
+                            help='Also write every page read to DIRECTORY, to replay later with '
+                                 'TICKETMASTER_REPLAY_DIR. Markets are then synced one at a time.')
+        parser.add_argument('--processes', type=int,
+                            help='Number of markets synced at the same time, each in its own process. '
+                                 'Default TICKETMASTER_PROCESSES.')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = enqueue(options['endpoint'], options['full'])
+            self.stdout.write(f'Queued sync job {job.pk}.')
+            return
+
+        try:
+            source = None
+            if options['record']:
+                source = RecordingSource(event_source(), options['record'])
+            result = run_sync(options['endpoint'], full=options['full'], source=source, processes=options['processes'])
+        except Exception as e:
+            raise CommandError(f'Sync failed: {e}')
+
+        self.stdout.write(self.style.SUCCESS(result))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from lmn.ticketmaster.jobs import work
+
+
+class Command(BaseCommand):
+    help = 'Runs queued Ticketmaster sync jobs, oldest first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=5,
+                            help='Seconds to wait between checks when the queue is empty. Default 5.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of waiting for more jobs.')
+
+    def handle(self, *args, **options):
+        jobs_run = work(poll_interval=options['poll_interval'], once=options['once'])
+        if options['once']:
+            self.stdout.write(f'Ran {jobs_run} sync jobs.')
@@ -0,0 +1,35 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lmn.ticketmaster.cache import ResponseCache
+
+
+class Command(BaseCommand):
+    help = 'Inspects or clears the on-disk cache of Ticketmaster responses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['info', 'list', 'clear'],
+                            help='info shows the cache size, list shows each cached page, clear empties the cache.')
+
+    def handle(self, *args, **options):
+        cache = ResponseCache.from_settings()
+        if cache is None:
+            raise CommandError(
+                'The Ticketmaster response cache is turned off. Set TICKETMASTER_CACHE_DIR to turn it on.'
+            )
+
+        if options['action'] == 'clear':
+            self.stdout.write(f'Removed {cache.clear()} cached responses.')
+            return
+
+        entries = cache.entries()
+
+        if options['action'] == 'list':
+            for key, meta, size, used in reversed(entries):
+                last_used = datetime.datetime.fromtimestamp(used).isoformat(timespec='seconds')
+                self.stdout.write(f"{key[:12]}  {size:>10} bytes  last used {last_used}  ETag {meta.get('etag')}  "
+                                  f"Last-Modified {meta.get('last_modified')}  {meta.get('url')}")
+
+        total = sum(size for _, _, size, _ in entries)
+        self.stdout.write(f'{len(entries)} cached responses, {total} of {cache.max_bytes} bytes, in {cache.directory}')
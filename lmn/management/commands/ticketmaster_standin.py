@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from lmn.ticketmaster.standin import StandInServer
+
+
+class Command(BaseCommand):
+    help = 'Serves synthetic music events and venues from a local stand-in for the Ticketmaster API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8001, help='Port to listen on. Default 8001.')
+        parser.add_argument('--events', type=int, default=10000, help='Number of events to serve. Default 10000.')
+        parser.add_argument('--artists', type=int, default=1000, help='Number of distinct artists. Default 1000.')
+        parser.add_argument('--venues', type=int, default=200, help='Number of distinct venues. Default 200.')
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help='Seconds to wait before answering each request. Default 0.')
+
+    def handle(self, *args, **options):
+        server = StandInServer(port=options['port'], event_count=options['events'], artist_count=options['artists'],
+                               venue_count=options['venues'], latency=options['latency'])
+
+        self.stdout.write(f'Serving {options["events"]} events. Sync from it with')
+        self.stdout.write(f'TICKETMASTER_BASE_URL={server.base_url} TICKETMASTER_MAX_RESULTS={options["events"]}')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
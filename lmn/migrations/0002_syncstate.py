@@ -0,0 +1,26 @@
+# Generated by Django 3.1.2 on 2026-10-16 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=50)),
+                ('market', models.CharField(max_length=100)),
+                ('last_synced', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='syncstate',
+            constraint=models.UniqueConstraint(fields=('endpoint', 'market'), name='unique_sync_state_per_market'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def merge_duplicate_artists_and_shows(apps, schema_editor):
+    """ Before Artist names and Shows are made unique, fold each set of duplicates into its oldest row.
+    Shows of a duplicate artist, and notes of a duplicate show, are moved to the row that is kept. """
+    Artist = apps.get_model('lmn', 'Artist')
+    Show = apps.get_model('lmn', 'Show')
+    Note = apps.get_model('lmn', 'Note')
+
+    kept_artists = {}
+    for artist in Artist.objects.order_by('pk'):
+        kept = kept_artists.setdefault(artist.name, artist)
+        if kept.pk != artist.pk:
+            Show.objects.filter(artist=artist).update(artist=kept)
+            artist.delete()
+
+    kept_shows = {}
+    for show in Show.objects.order_by('pk'):
+        kept = kept_shows.setdefault((show.artist_id, show.venue_id, show.show_date), show)
+        if kept.pk != show.pk:
+            Note.objects.filter(show=show).update(show=kept)
+            show.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0002_syncstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_artists_and_shows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.1.2 on 2026-10-16 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0003_merge_duplicate_artists_and_shows'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='artist',
+            name='name',
+            field=models.CharField(max_length=200, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='show',
+            constraint=models.UniqueConstraint(fields=('artist', 'venue', 'show_date'), name='unique_show'),
+        ),
+    ]
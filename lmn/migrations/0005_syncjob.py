@@ -0,0 +1,30 @@
+# Generated by Django 3.1.2 on 2026-10-16 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0004_unique_artist_and_show'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=50)),
+                ('full', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('result', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='syncjob',
+            index=models.Index(fields=['status', 'created'], name='sync_job_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.1.2 on 2026-10-16 20:51
+
+import hashlib
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+# Copied from lmn/ticketmaster/ingest.py as they were when this migration was written, so that later changes there
+# can't change what this migration does. A hash must match what the syncs compute, or the first sync rewrites the row.
+batch_size = 500
+
+
+def content_hash(obj, fields):
+    """ A 16 character hash of the values of fields on obj. Datetimes are hashed in UTC, as they are stored. """
+    values = []
+    for field in fields:
+        value = getattr(obj, field)
+        if isinstance(value, datetime):
+            value = value.astimezone(timezone.utc).isoformat()
+        values.append(str(value))
+
+    return hashlib.blake2b('\x1f'.join(values).encode(), digest_size=8).hexdigest()
+
+
+# The fields each sync hashes, as in the upsert calls in lmn/ticketmaster/sync.py.
+hashed_fields = {
+    'Artist': ('name',),
+    'Venue': ('name', 'city', 'state'),
+    'Show': ('artist_id', 'venue_id', 'show_date'),
+}
+
+
+def hash_existing_rows(apps, schema_editor):
+    """ Stores the hash of every existing row, so the first sync after this migration doesn't rewrite them all. """
+    for model_name, fields in hashed_fields.items():
+        model = apps.get_model('lmn', model_name)
+        rows = list(model.objects.all())
+        for row in rows:
+            row.content_hash = content_hash(row, fields)
+        model.objects.bulk_update(rows, ['content_hash'], batch_size=batch_size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0005_syncjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+        migrations.RunPython(hash_existing_rows, migrations.RunPython.noop),
+    ]
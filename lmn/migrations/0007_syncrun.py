@@ -0,0 +1,31 @@
+# Generated by Django 3.1.2 on 2026-10-16 20:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0006_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=50)),
+                ('market', models.CharField(max_length=100)),
+                ('full', models.BooleanField(default=False)),
+                ('succeeded', models.BooleanField(default=False)),
+                ('error', models.TextField(blank=True)),
+                ('started', models.DateTimeField()),
+                ('finished', models.DateTimeField()),
+                ('summary', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='syncrun',
+            index=models.Index(fields=['endpoint', 'started'], name='sync_run_history_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.1.2 on 2026-10-16 20:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_notes(apps, schema_editor):
+    """ Sets every show's note_count from its existing notes, in one UPDATE. """
+    Show = apps.get_model('lmn', 'Show')
+    Note = apps.get_model('lmn', 'Note')
+    counts = Note.objects.filter(show=OuterRef('pk')).order_by().values('show').annotate(count=Count('pk')).values('count')
+    Show.objects.update(note_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0007_syncrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='show',
+            name='note_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing_notes, migrations.RunPython.noop),
+    ]
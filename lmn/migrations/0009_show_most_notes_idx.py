@@ -0,0 +1,17 @@
+# Generated by Django 3.1.2 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0008_show_note_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(condition=models.Q(note_count__gt=0), fields=['-show_date', '-note_count'], name='show_most_notes_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+
+# The search index as it was when this migration was written, copied from lmn/search.py so that later changes
+# there can't change what this migration does. The post_migrate receiver in apps.py keeps it current afterwards.
+searched_tables = ('lmn_artist', 'lmn_venue')
+
+
+def fts_table(table):
+    return f'{table}_fts'
+
+
+def sqlite_statements(table):
+    fts = fts_table(table)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(name, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF name ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+    ]
+
+
+def postgresql_statements(table):
+    return [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f'CREATE INDEX IF NOT EXISTS {table}_name_trgm ON {table} USING gin ((UPPER(name::text)) gin_trgm_ops)',
+    ]
+
+
+def sqlite_has_trigram(schema_editor):
+    """ The trigram tokenizer is in SQLite 3.34 and later, when SQLite is built with FTS5. """
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.lmn_trigram_check USING fts5(name, tokenize='trigram')")
+        except Exception:
+            return False
+        cursor.execute('DROP TABLE temp.lmn_trigram_check')
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for table in searched_tables:
+            for statement in postgresql_statements(table):
+                schema_editor.execute(statement)
+    elif connection.vendor == 'sqlite' and sqlite_has_trigram(schema_editor):
+        for table in searched_tables:
+            for statement in sqlite_statements(table):
+                schema_editor.execute(statement)
+            # Fills the new index with the names already in the table.
+            schema_editor.execute(f"INSERT INTO {fts_table(table)}({fts_table(table)}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    for table in searched_tables:
+        if connection.vendor == 'sqlite':
+            # Dropping the FTS5 table leaves its triggers writing to a missing table, so they go first.
+            for trigger in ('insert', 'delete', 'update'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts_table(table)}_{trigger}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts_table(table)}')
+        elif connection.vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0009_show_most_notes_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.1.2 on 2026-10-16 21:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lmn', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['-posted_date', '-id'], name='note_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['show', '-posted_date', '-id'], name='note_show_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['user', '-posted_date', '-id'], name='note_user_posted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['artist', '-show_date'], name='show_artist_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(fields=['venue', '-show_date'], name='show_venue_date_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 
 from datetime import datetime, timezone
@@ -16,15 +16,31 @@ User._meta.get_field('last_name')._blank = False
 User._meta.get_field('first_name')._blank = False
 
 
-class Artist(models.Model):
+class SyncedModel(models.Model):
+    """ A model whose rows are synced from Ticketmaster. """
+    # A hash of the fields synced from Ticketmaster, so a sync can tell whether the row needs writing.
+    # See ticketmaster/ingest.py.
+    content_hash = models.CharField(max_length=16, blank=True, default='', editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # Syncs write with bulk_create and bulk_update, which don't call save(). A row saved any other way may no
+        # longer match its hash, so the hash is cleared and the next sync compares and rewrites the row.
+        self.content_hash = ''
+        super().save(*args, **kwargs)
+
+
+class Artist(SyncedModel):
     """ Represents a musician or a band - a music artist """
-    name = models.CharField(max_length=200, blank=False)
+    name = models.CharField(max_length=200, blank=False, unique=True)
 
     def __str__(self):
         return f'Name: {self.name}'
 
 
-class Venue(models.Model):
+class Venue(SyncedModel):
     """ Represents a place that Shows take place at. """
     name = models.CharField(max_length=200, blank=False, unique=True)
     city = models.CharField(max_length=200, blank=False)
@@ -34,19 +50,32 @@ class Venue(models.Model):
         return f'Name: {self.name} Location: {self.city}, {self.state}'
 
 
-class Show(models.Model):
+class Show(SyncedModel):
     """ One Artist playing at one Venue at a particular date and time. """
     show_date = models.DateTimeField(blank=False)
     artist = models.ForeignKey(Artist, on_delete=models.CASCADE)
     venue = models.ForeignKey(Venue, on_delete=models.CASCADE)
+    # The number of Notes for this show, kept up to date by Note.save and Note.delete.
+    # Rebuild it with python manage.py repair_note_counts if notes are ever changed another way.
+    note_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['artist', 'venue', 'show_date'], name='unique_show'),
+        ]
+        indexes = [
+            # Each artist's and each venue's shows, most recent first, read in order from the index without sorting.
+            models.Index(fields=['artist', '-show_date'], name='show_artist_date_idx'),
+            models.Index(fields=['venue', '-show_date'], name='show_venue_date_idx'),
+            # The shows with most notes leaderboard. Only shows with notes are indexed, in the page's order,
+            # so the top shows are read straight from the index, and note_count updates keep it current.
+            models.Index(fields=['-show_date', '-note_count'], condition=models.Q(note_count__gt=0),
+                         name='show_most_notes_idx'),
+        ]
 
     def __str__(self):
         return f'Artist: {self.artist} At: {self.venue} On: {self.show_date}'
 
-    @property
-    def note_count(self):
-        return self.note_set.count()
-    
     @property
     def in_past(self):
         # compare show_date to current date, and return boolean
@@ -61,6 +90,110 @@ class Note(models.Model):
     text = models.TextField(max_length=1000, blank=False)
     posted_date = models.DateTimeField(auto_now_add=True, blank=False)
 
+    class Meta:
+        indexes = [
+            # Notes are listed newest first: the latest notes, each show's notes and each user's notes.
+            # These indexes hold them in that order, with id to order notes posted at the same time,
+            # so the lists are read from an index without sorting.
+            models.Index(fields=['-posted_date', '-id'], name='note_posted_idx'),
+            models.Index(fields=['show', '-posted_date', '-id'], name='note_show_posted_idx'),
+            models.Index(fields=['user', '-posted_date', '-id'], name='note_user_posted_idx'),
+        ]
+
     def __str__(self):
         return f'User: {self.user} Show: {self.show} Note title: {self.title} \
-        Text: {self.text} Posted on: {self.posted_date}'
\ No newline at end of file
+        Text: {self.text} Posted on: {self.posted_date}'
+
+    def save(self, *args, **kwargs):
+        """ Saves the note. A new note is added to its show's note_count in the same transaction. """
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self._add_to_note_count(1)
+
+    def delete(self, *args, **kwargs):
+        """ Deletes the note, and takes it off its show's note_count in the same transaction.
+        Notes deleted any other way, by a queryset or by deleting their user or show, are taken off by note_deleted. """
+        self._counted_by_delete = True
+        with transaction.atomic():
+            deleted, per_model = super().delete(*args, **kwargs)
+            # If another request deleted the note first, nothing was deleted here and the count already went down.
+            if deleted:
+                self._add_to_note_count(-1)
+        return deleted, per_model
+
+    def _add_to_note_count(self, change):
+        # An F() update is done by the database, so notes added or deleted at the same time can't overwrite
+        # each other's count.
+        Show.objects.filter(pk=self.show_id).update(note_count=models.F('note_count') + change)
+        if Note.show.is_cached(self):
+            self.show.refresh_from_db(fields=['note_count'])
+
+
+def note_deleted(sender, instance, **kwargs):
+    """ post_delete receiver taking a note off its show's note_count. Sent for every deleted note, including the
+    cascades of QuerySet.delete() that never call Note.delete(), which counts its own note. """
+    if not getattr(instance, '_counted_by_delete', False):
+        instance._add_to_note_count(-1)
+
+
+class SyncState(models.Model):
+    """ When one Ticketmaster sync endpoint last completed successfully for one market. """
+    endpoint = models.CharField(max_length=50, blank=False)
+    market = models.CharField(max_length=100, blank=False)
+    last_synced = models.DateTimeField(blank=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'market'], name='unique_sync_state_per_market'),
+        ]
+
+    def __str__(self):
+        return f'Endpoint: {self.endpoint} Market: {self.market} Last synced: {self.last_synced}'
+
+
+class SyncJob(models.Model):
+    """ One Ticketmaster sync, queued by the sync endpoints and run by the sync worker. """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    endpoint = models.CharField(max_length=50, blank=False)
+    full = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created'], name='sync_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'Sync job {self.pk}: {self.endpoint} {self.status}'
+
+
+class SyncRun(models.Model):
+    """ The history of Ticketmaster syncs: one run of one sync endpoint for one market, with its timing summary. """
+    endpoint = models.CharField(max_length=50, blank=False)
+    market = models.CharField(max_length=100, blank=False)
+    full = models.BooleanField(default=False)
+    succeeded = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    started = models.DateTimeField(blank=False)
+    finished = models.DateTimeField(blank=False)
+    # Time spent and rows handled per stage, bytes downloaded, retries and so on. See ticketmaster/stats.py.
+    summary = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['endpoint', 'started'], name='sync_run_history_idx'),
+        ]
+
+    def __str__(self):
+        return f'Sync run {self.pk}: {self.endpoint} {self.market} {"succeeded" if self.succeeded else "failed"}'
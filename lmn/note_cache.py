@@ -0,0 +1,77 @@
+""" Cached pages of each show's notes.
+
+The notes_for_show template caches the list of a show's notes, one fragment for each page, keyed by the show,
+the page's cursor and the show's notes version. The version is a random token kept in the cache, and changing
+a note for a show, by adding, editing or deleting it, replaces that show's token, so the show's cached pages are
+no longer found and the next request for each renders it again. Other shows' pages stay cached, and the stale
+pages are evicted by the cache in time. Notes changed without saving or deleting each one, for example with
+QuerySet.update, aren't noticed until the pages expire, after NOTES_PAGE_CACHE_SECONDS.
+
+Pages are only cached when the cache is shared by every process, see CACHES in settings.py. A process with its own
+cache would keep serving pages another process's note changes had replaced.
+A cache that fails, because its server is down or its database table was never created, is logged and otherwise
+ignored: notes are still saved, and pages are rendered without it. """
+
+import logging
+from contextlib import contextmanager, nullcontext
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+def cache_is_shared():
+    """ True unless the default cache is kept in each process's memory, or doesn't keep anything. """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def page_cache_seconds():
+    """ How long to cache a page of a show's notes. 0, not cached, unless the cache is shared. """
+    return settings.NOTES_PAGE_CACHE_SECONDS if cache_is_shared() else 0
+
+
+@contextmanager
+def cache_failures_logged():
+    """ Logs, instead of raising, an error from the cache in the block, which ends there. A database cache is used
+    in a savepoint, so a failed cache query leaves the transaction saving a note usable. """
+    savepoint = transaction.atomic() if isinstance(caches['default'], DatabaseCache) else nullcontext()
+    try:
+        with savepoint:
+            yield
+    except Exception:
+        logging.exception('The cache failed, so it was not used.')
+
+
+def version_key(show_pk):
+    return f'lmn:show_notes_version:{show_pk}'
+
+
+def notes_version(show_pk):
+    """ The current version of show_pk's notes, for the keys of its cached pages, or None if the cache failed. """
+    version = None
+    with cache_failures_logged():
+        version = cache.get(version_key(show_pk))
+        if version is None:
+            # add doesn't overwrite a version another request set first.
+            cache.add(version_key(show_pk), uuid4().hex, None)
+            version = cache.get(version_key(show_pk))
+    return version
+
+
+@cache_failures_logged()
+def forget_notes_pages(show_pk):
+    """ Stops using show_pk's cached pages, by forgetting its notes version. """
+    cache.delete(version_key(show_pk))
+
+
+def note_changed(sender, instance, **kwargs):
+    """ A post_save and post_delete receiver for Note, connected in apps.py. """
+    show_pk = instance.show_id
+    forget_notes_pages(show_pk)
+    # A request reading the notes before this change commits could cache the old notes under a new version,
+    # so the pages are forgotten again once it commits.
+    transaction.on_commit(lambda: forget_notes_pages(show_pk))
@@ -0,0 +1,186 @@
+""" The latest notes feed, kept in the cache so the latest notes page is served without a database query.
+
+The feed is the newest notes, newest first, each with what the page displays already rendered: its title, its
+text cut to 100 characters, when it was posted, its show as artist, venue and date, and its user's name. It is a
+bounded buffer holding more notes than the page shows, so notes can be deleted without reading the list again.
+
+The feed is changed, not read again, when a note is saved or deleted: once the change commits, the note is read,
+in one query, and put in its place in the feed, or taken out. A rename of an artist, venue, show date or user in
+the feed forgets the feed. A feed that isn't in the cache, after a restart, a cache flush or a forgotten feed,
+is rebuilt on the next request, in one query, or ahead of time with python manage.py rebuild_latest_notes.
+Changes made without saving or deleting each row, for example by a Ticketmaster sync, show once the feed expires,
+after LATEST_NOTES_FEED_SECONDS.
+
+The feed is only kept when the cache is shared by every process, see CACHES in settings.py. Otherwise each process
+would keep its own feed, without the notes saved by the others, so the notes are read for every request instead.
+They are also read when the cache fails, and a failed change to the feed is logged, not raised. """
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.formats import localize
+from django.utils.text import Truncator
+from django.utils.timezone import template_localtime
+
+from .models import Artist, Note, Show, Venue
+from .note_cache import cache_failures_logged, cache_is_shared
+
+
+# The number of notes the latest notes page shows.
+shown = 20
+
+# The most notes the feed holds. The extra notes take the place of deleted notes.
+kept = 40
+
+feed_key = 'lmn:notes_feed'
+# Counts changes to the feed, so a rebuild can tell whether a note changed while it read the notes.
+changes_key = 'lmn:notes_feed:changes'
+lock_key = 'lmn:notes_feed:lock'
+# The longest a change to the feed may hold the lock, in seconds, if its process dies holding it.
+lock_seconds = 5
+
+
+FeedNote = namedtuple('FeedNote', [
+    'pk', 'title', 'text', 'posted_date', 'posted', 'show_pk', 'show', 'user_pk', 'username', 'artist_pk', 'venue_pk'
+])
+
+# complete is True when the feed holds every note, so a feed with fewer than shown notes needn't be rebuilt.
+Feed = namedtuple('Feed', ['notes', 'complete'])
+
+fields = ('pk', 'title', 'text', 'posted_date', 'show_id', 'show__show_date', 'show__artist_id', 'show__artist__name',
+          'show__venue_id', 'show__venue__name', 'user_id', 'user__username')
+
+# The FeedNote field each model's rows are displayed from, to know whether a change to a row changes the feed.
+display_fields = {Artist: 'artist_pk', Venue: 'venue_pk', Show: 'show_pk', User: 'user_pk'}
+
+
+def render(dt):
+    """ dt as {{ dt }} displays it in a template. """
+    return localize(template_localtime(dt))
+
+
+def feed_note(row):
+    """ A FeedNote from a row of fields. """
+    pk, title, text, posted_date, show_pk, show_date, artist_pk, artist, venue_pk, venue, user_pk, username = row
+    return FeedNote(
+        pk, title, Truncator(text).chars(100), posted_date, render(posted_date),
+        show_pk, f'{artist} at {venue} on {render(show_date)}', user_pk, username, artist_pk, venue_pk,
+    )
+
+
+def newest_first(note):
+    return (note.posted_date, note.pk)
+
+
+def latest_notes():
+    """ The newest notes, newest first, as FeedNotes. Reads the database only when the feed isn't cached. """
+    if not cache_is_shared():
+        return read().notes[:shown]
+    feed = None
+    with cache_failures_logged():
+        feed = cache.get(feed_key)
+    if feed is None:
+        feed = rebuild()
+    return feed.notes[:shown]
+
+
+def read():
+    """ The feed, read from the database in one query. """
+    rows = Note.objects.order_by('-posted_date', '-pk').values_list(*fields)[:kept + 1]
+    notes = [feed_note(row) for row in rows]
+    return Feed(notes[:kept], len(notes) <= kept)
+
+
+def rebuild():
+    """ Reads the feed from the database and caches it, unless a note changed while it was read. Returns the feed. """
+    changes = None
+    with cache_failures_logged():
+        changes = cache.get(changes_key)
+    feed = read()
+
+    # A note saved while the notes were read may be missing from them, and its change found no feed to change,
+    # so the feed is only cached if there were no changes since.
+    with cache_failures_logged():
+        if cache.add(lock_key, True, lock_seconds):
+            try:
+                if cache.get(changes_key) == changes:
+                    cache.set(feed_key, feed, settings.LATEST_NOTES_FEED_SECONDS)
+            finally:
+                cache.delete(lock_key)
+    return feed
+
+
+@cache_failures_logged()
+def forget():
+    """ Stops using the cached feed, so the next request rebuilds it. """
+    count_change()
+    cache.delete(feed_key)
+
+
+def count_change():
+    cache.add(changes_key, 0, None)
+    try:
+        cache.incr(changes_key)
+    except ValueError:
+        # Evicted since it was added.
+        cache.set(changes_key, 1, None)
+
+
+@cache_failures_logged()
+def update(note_pk):
+    """ Puts the note with note_pk in its place in the cached feed, or takes it out if it was deleted. """
+    count_change()
+    if cache.get(feed_key) is None:
+        return
+
+    row = Note.objects.filter(pk=note_pk).values_list(*fields).first()
+
+    if not cache.add(lock_key, True, lock_seconds):
+        # Another change is updating the feed, and this one could overwrite it.
+        cache.delete(feed_key)
+        return
+    try:
+        # Read again under the lock, so no other change is lost.
+        feed = cache.get(feed_key)
+        if feed is None:
+            return
+        notes = [note for note in feed.notes if note.pk != note_pk]
+        complete = feed.complete
+        if row is not None:
+            note = feed_note(row)
+            # Unless every note is in the feed, a note older than the feed's oldest might not be the next newest.
+            if complete or not notes or newest_first(note) > newest_first(notes[-1]):
+                notes.append(note)
+                notes.sort(key=newest_first, reverse=True)
+        if len(notes) > kept:
+            notes, complete = notes[:kept], False
+        if len(notes) < shown and not complete:
+            # Deleted notes leave the feed short, and the notes to fill it aren't in it.
+            cache.delete(feed_key)
+        else:
+            cache.set(feed_key, Feed(notes, complete), settings.LATEST_NOTES_FEED_SECONDS)
+    finally:
+        cache.delete(lock_key)
+
+
+def note_changed(sender, instance, **kwargs):
+    """ A post_save and post_delete receiver for Note, connected in apps.py. """
+    note_pk = instance.pk
+    # Not until the change commits, so other requests can read the note, or not, as the feed has it.
+    transaction.on_commit(lambda: update(note_pk))
+
+
+@cache_failures_logged()
+def display_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    """ A post_save receiver for Artist, Venue, Show and User, connected in apps.py.
+    Forgets the feed if a note in it displays the saved row. """
+    if created or (update_fields is not None and not {'name', 'show_date', 'username'} & set(update_fields)):
+        # New rows have no notes, and logging in saves only the user's last_login.
+        return
+    feed = cache.get(feed_key)
+    field = display_fields[sender]
+    if feed is not None and any(getattr(note, field) == instance.pk for note in feed.notes):
+        transaction.on_commit(forget)
@@ -0,0 +1,180 @@
+""" Keyset pagination for the artist and venue lists, and a user's notes.
+
+Pages are found by the name and id of the row they start after, or end before, instead of by page number,
+so the database reads one page of the (name, id) index wherever the page is, where OFFSET reads and skips
+every row before it. The links between pages carry cursors, opaque strings encoding that name and id.
+Search results are paged the same way by their search rank and id, see search.py, and a user's notes,
+newest first, by their posted date and id.
+Counting every row is the only part that still grows with the table, so it can be turned off with
+LIST_PAGINATION_COUNT. Set LIST_PAGINATION=numbered to use Django's numbered pages instead. """
+
+import json
+import binascii
+from datetime import date
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db.models import Q
+
+
+def encode_cursor(direction, value=None, pk=None):
+    """ An opaque cursor for the page after ('>') or before ('<') the row with pk, and value in the field paged by.
+    With no row, '<' is the last page. Dates and times are kept as ISO 8601 text, which filters compare as dates. """
+    if isinstance(value, date):
+        value = value.isoformat()
+    data = json.dumps([direction, value, pk], separators=(',', ':')).encode()
+    return urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """ The direction, value and pk in cursor, or None if the cursor is missing or not one of ours. """
+    if not cursor:
+        return None
+    try:
+        direction, value, pk = json.loads(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if direction not in ('>', '<') or (value is None) != (pk is None):
+        return None
+    if value is not None and not (isinstance(value, (str, int, float)) and isinstance(pk, int)):
+        return None
+    return direction, value, pk
+
+
+def cursor_position(queryset, cursor, key):
+    """ The direction, value and pk in cursor, with the value read as queryset's key field, or None if the cursor
+    is missing, not one of ours, or from a list ordered by another kind of key, a name where a date is expected. """
+    position = decode_cursor(cursor)
+    if position is None or position[1] is None:
+        return position
+    direction, value, pk = position
+    if key in queryset.query.annotations:
+        field = queryset.query.annotations[key].output_field
+    else:
+        field = queryset.model._meta.get_field(key)
+    try:
+        return direction, field.to_python(value), pk
+    except (ValidationError, ValueError, TypeError):
+        return None
+
+
+def row_value(row, field):
+    """ field of a model instance, or of a dictionary from QuerySet.values(). """
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+class KeysetPage:
+    """ One page of rows ordered by key, name for example, then id, with cursors for the pages either side.
+    The rows are model instances, or dictionaries from QuerySet.values() including key and id. """
+
+    def __init__(self, object_list, has_previous, has_next, count=None, key='name'):
+        self.object_list = object_list
+        self.key = key
+        self.has_previous = has_previous
+        self.has_next = has_next
+        # The number of rows on every page together, or None if they weren't counted.
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_other_pages(self):
+        return self.has_previous or self.has_next
+
+    @property
+    def previous_cursor(self):
+        first = self.object_list[0]
+        return encode_cursor('<', row_value(first, self.key), row_value(first, 'id'))
+
+    @property
+    def next_cursor(self):
+        last = self.object_list[-1]
+        return encode_cursor('>', row_value(last, self.key), row_value(last, 'id'))
+
+    @property
+    def last_cursor(self):
+        return encode_cursor('<')
+
+
+def keyset_page(queryset, cursor, per_page, count=True, key='name', descending=False):
+    """
+    The page of queryset that cursor points to, ordered by key then id.
+
+    Args:
+        queryset: Rows, filtered but not yet ordered.
+        cursor (str): A cursor from a KeysetPage with the same key. A missing or invalid cursor, or one from a list
+            with another key, gives the first page.
+        per_page (int): The most rows on a page.
+        count (bool): Count all of queryset's rows, as the page's count.
+        key (str): The field or annotation the rows are ordered by, before id.
+        descending (bool): Order by key then id from highest to lowest, newest first for a date.
+
+    Returns:
+        KeysetPage: The page, in key then id order. One query reads it, plus one to count the rows if count is True.
+    """
+
+    total = queryset.count() if count else None
+    position = cursor_position(queryset, cursor, key)
+    # Rows after the cursor's come later in the page order, and rows before it earlier.
+    after, before = ('lt', 'gt') if descending else ('gt', 'lt')
+    order = (f'-{key}', '-id') if descending else (key, 'id')
+    reverse_order = (key, 'id') if descending else (f'-{key}', '-id')
+
+    if position is None:
+        rows = list(queryset.order_by(*order)[:per_page + 1])
+        return KeysetPage(rows[:per_page], has_previous=False, has_next=len(rows) > per_page, count=total, key=key)
+
+    direction, value, pk = position
+    if direction == '>':
+        # key >= x narrows the index range; the rest skips the rows with key x up to and including the cursor's row.
+        rest = Q(**{f'{key}__{after}e': value}) & (Q(**{f'{key}__{after}': value}) | Q(**{f'id__{after}': pk}))
+        rows = list(queryset.filter(rest).order_by(*order)[:per_page + 1])
+        if rows:
+            return KeysetPage(rows[:per_page], has_previous=True, has_next=len(rows) > per_page, count=total, key=key)
+    else:
+        earlier = queryset
+        if value is not None:
+            rest = Q(**{f'{key}__{before}e': value}) & (Q(**{f'{key}__{before}': value}) | Q(**{f'id__{before}': pk}))
+            earlier = queryset.filter(rest)
+        # Read backwards from the cursor, then put the page back in order.
+        rows = list(earlier.order_by(*reverse_order)[:per_page + 1])
+        if rows:
+            page = rows[:per_page][::-1]
+            return KeysetPage(page, has_previous=len(rows) > per_page, has_next=value is not None, count=total, key=key)
+
+    # Nothing is left past the cursor, for example after rows were deleted, so start again from the first page.
+    page = keyset_page(queryset, None, per_page, count=False, key=key, descending=descending)
+    page.count = total
+    return page
+
+
+def numbered_page(queryset, page_number, per_page, key='name'):
+    """ The page of queryset with page_number, in key then id order, from Django's Paginator. """
+    paginator = Paginator(queryset.order_by(key, 'id'), per_page)
+    try:
+        page = paginator.page(page_number)
+    except PageNotAnInteger:
+        # If page is not an integer, deliver first page.
+        page = paginator.page(1)
+    except EmptyPage:
+        # If page is out of range (e.g. 9999), deliver last page of results.
+        page = paginator.page(paginator.num_pages)
+
+    # Link to a few pages either side of this one, instead of every page.
+    page.nearby_pages = range(max(1, page.number - 2), min(paginator.num_pages, page.number + 2) + 1)
+    return page
+
+
+def paginate(request, queryset, per_page, key='name'):
+    """ The page of queryset requested, ordered by key then id, using the pagination set in LIST_PAGINATION. """
+    if settings.LIST_PAGINATION == 'numbered':
+        return numbered_page(queryset, request.GET.get('page'), per_page, key)
+    return keyset_page(queryset, request.GET.get('cursor'), per_page, count=settings.LIST_PAGINATION_COUNT, key=key)
@@ -0,0 +1,168 @@
+""" Indexed search of artist and venue names.
+
+Searches match names containing every word searched for, case-insensitively, like the name__icontains search
+they replace, but read an index of the names' trigrams, every run of three characters, instead of scanning
+every name. So a word matches the start of a name or word in it as well as the middle, and results come back
+in milliseconds from a catalog of millions of names.
+On SQLite the index is an FTS5 table using the trigram tokenizer, kept up to date by triggers on the artist
+and venue tables, so every insert, update and delete, including the bulk writes of a Ticketmaster sync,
+updates it in the same transaction. On PostgreSQL it is a pg_trgm GIN index on the upper case name, which
+PostgreSQL maintains itself. Results are ranked by bm25 on SQLite and by trigram similarity on PostgreSQL,
+with names starting with the search counted twice as relevant.
+Words shorter than three characters have no trigrams to look up, so a search of only short words scans the
+names, as do searches on other databases. """
+
+import re
+
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+
+# The tables searched. Each model searched has a name field.
+searched_tables = ('lmn_artist', 'lmn_venue')
+
+# Words shorter than this can't be looked up in a trigram index.
+min_indexed_length = 3
+
+
+def fts_table(table):
+    return f'{table}_fts'
+
+
+def sqlite_statements(table):
+    """ The SQL that creates table's FTS5 index and the triggers keeping it up to date.
+    Each statement can be run again safely. """
+    fts = fts_table(table)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} "
+        f"USING fts5(name, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF name ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+    ]
+
+
+def postgresql_statements(table):
+    """ The SQL that creates table's trigram index. The expression is the one Django uses for name__icontains. """
+    return [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f'CREATE INDEX IF NOT EXISTS {table}_name_trgm ON {table} USING gin ((UPPER(name::text)) gin_trgm_ops)',
+    ]
+
+
+def sqlite_has_trigram(cursor):
+    """ The trigram tokenizer is in SQLite 3.34 and later, when SQLite is built with FTS5. """
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.lmn_trigram_check USING fts5(name, tokenize='trigram')")
+    except Exception:
+        return False
+    cursor.execute('DROP TABLE temp.lmn_trigram_check')
+    return True
+
+
+def install(using=connection, rebuild=False):
+    """
+    Creates the search indexes that don't exist yet, and on SQLite the triggers that maintain them.
+    Run by the migration that adds search, and after every migrate, since SQLite drops a table's triggers
+    when a migration rebuilds the table.
+
+    Args:
+        using: The database connection.
+        rebuild (bool): Refill the SQLite indexes from the tables, for an index that has fallen out of step.
+            Fills a new index too, so is done whenever an index is created.
+
+    Returns:
+        bool: Whether the database has search indexes.
+    """
+
+    with using.cursor() as cursor:
+        if using.vendor == 'postgresql':
+            for table in searched_tables:
+                for statement in postgresql_statements(table):
+                    cursor.execute(statement)
+            return True
+
+        if using.vendor != 'sqlite' or not sqlite_has_trigram(cursor):
+            return False
+
+        existing = using.introspection.table_names(cursor)
+        for table in searched_tables:
+            for statement in sqlite_statements(table):
+                cursor.execute(statement)
+            if rebuild or fts_table(table) not in existing:
+                cursor.execute(f"INSERT INTO {fts_table(table)}({fts_table(table)}) VALUES ('rebuild')")
+
+    _has_index.clear()
+    return True
+
+
+# Whether each database alias has its search indexes, looked up on the first search.
+_has_index = {}
+
+
+def has_index(using=connection):
+    if using.alias not in _has_index:
+        if using.vendor == 'postgresql':
+            _has_index[using.alias] = True
+        else:
+            tables = using.introspection.table_names() if using.vendor == 'sqlite' else []
+            _has_index[using.alias] = fts_table(searched_tables[0]) in tables
+    return _has_index[using.alias]
+
+
+def like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search(queryset, text):
+    """
+    Searches the names of queryset's model for text.
+
+    Args:
+        queryset: Artists or venues, possibly already filtered.
+        text (str): What was searched for.
+
+    Returns:
+        QuerySet: The rows whose name contains every word of text, annotated with search_rank,
+            lower for the better matches. Not yet ordered.
+    """
+
+    table = queryset.model._meta.db_table
+    words = re.findall(r'\w+', text)
+    indexed_words = [word for word in words if len(word) >= min_indexed_length]
+    prefix = like_escape(text.strip()) + '%'
+
+    if not words:
+        # Nothing but punctuation, which is searched for as it is.
+        queryset = queryset.filter(name__icontains=text.strip())
+
+    # Short words can't be looked up in the index. When there are long words too, they narrow the rows to check first.
+    for word in words:
+        if len(word) < min_indexed_length:
+            queryset = queryset.filter(name__icontains=word)
+
+    if connection.vendor == 'postgresql' or not indexed_words or not has_index():
+        # PostgreSQL looks the long words up in the trigram index. Elsewhere this scans the names.
+        for word in indexed_words:
+            queryset = queryset.filter(name__icontains=word)
+        if connection.vendor == 'postgresql':
+            rank = RawSQL(f"-similarity({table}.name, %s) * (CASE WHEN {table}.name ILIKE %s THEN 2 ELSE 1 END)",
+                          [text.strip(), prefix], output_field=FloatField())
+        else:
+            # Without an index there's no relevance score, so names starting with the search just come first.
+            rank = RawSQL(f"CASE WHEN {table}.name LIKE %s ESCAPE '\\' THEN -2.0 ELSE -1.0 END", [prefix],
+                          output_field=FloatField())
+        return queryset.annotate(search_rank=rank)
+
+    fts = fts_table(table)
+    # Each word is quoted, so it's matched as text, and never read as FTS5 query syntax.
+    match = ' AND '.join(f'"{word}"' for word in indexed_words)
+    queryset = queryset.extra(tables=[fts], where=[f'{fts}.rowid = {table}.id', f'{fts} MATCH %s'], params=[match])
+    rank = RawSQL(f"{fts}.rank * (CASE WHEN {table}.name LIKE %s ESCAPE '\\' THEN 2 ELSE 1 END)", [prefix],
+                  output_field=FloatField())
+    return queryset.annotate(search_rank=rank)
@@ -0,0 +1,25 @@
+// Suggests names as they're typed into a search box with a data-autocomplete-url,
+// from that URL's JSON results, in a datalist under the box.
+document.querySelectorAll('input[data-autocomplete-url]').forEach(function (input) {
+  var list = document.createElement('datalist');
+  list.id = input.id + '-suggestions';
+  input.setAttribute('list', list.id);
+  input.after(list);
+
+  var latest = 0;
+  input.addEventListener('input', function () {
+    var request = ++latest;
+    var url = input.dataset.autocompleteUrl + '?q=' + encodeURIComponent(input.value);
+    fetch(url)
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        // Answers can arrive out of order. Only show the answer to the latest text.
+        if (request !== latest) { return; }
+        list.replaceChildren.apply(list, data.results.map(function (result) {
+          var option = document.createElement('option');
+          option.value = result.name;
+          return option;
+        }));
+      });
+  });
+});
@@ -0,0 +1,46 @@
+// Adds the next page of a user's notes to the profile when Load more is clicked, from the JSON at the link's
+// data-load-more-url, instead of opening the next page. Without JavaScript the link opens the next page.
+document.querySelectorAll('a[data-load-more-url]').forEach(function (link) {
+  var notes = document.getElementById('user-notes');
+
+  function element(tag, className, text) {
+    var node = document.createElement(tag);
+    node.className = className;
+    node.textContent = text;
+    return node;
+  }
+
+  function noteElement(note) {
+    var div = element('div', 'note', '');
+    div.id = 'note-' + note.id;
+    var title = element('h3', 'note-title', '');
+    var titleLink = element('a', '', note.title);
+    titleLink.href = note.url;
+    title.appendChild(titleLink);
+    div.appendChild(title);
+    var showDate = new Date(note.show_date).toLocaleString();
+    div.appendChild(element('p', 'note-info', note.artist + ' at ' + note.venue + ' on ' + showDate));
+    div.appendChild(element('p', 'note-text', note.text));
+    div.appendChild(element('p', 'note-posted-at', new Date(note.posted_date).toLocaleString()));
+    return div;
+  }
+
+  var loading = false;
+  link.addEventListener('click', function (event) {
+    event.preventDefault();
+    if (loading) { return; }
+    loading = true;
+    fetch(link.dataset.loadMoreUrl)
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        data.notes.forEach(function (note) { notes.appendChild(noteElement(note)); });
+        if (data.next_cursor) {
+          link.href = '?cursor=' + data.next_cursor;
+          link.dataset.loadMoreUrl = link.dataset.loadMoreUrl.split('?')[0] + '?cursor=' + data.next_cursor;
+        } else {
+          link.remove();
+        }
+      })
+      .finally(function () { loading = false; });
+  });
+});
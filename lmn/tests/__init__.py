@@ -0,0 +1,26 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class SharedCacheMixin:
+    """
+    Caches in a new directory for each test, removed after it. The cache is shared by every process, like the
+    memcached a deployment would use, so note pages and the latest notes feed are cached. It isn't read with database
+    queries, so tests counting queries count only the pages' own.
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp(prefix='lmn_test_cache')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+
+        shared_cache = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directory,
+            }
+        })
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        super().setUp()
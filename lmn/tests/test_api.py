@@ -1,27 +1,746 @@
-from django.test import TestCase
-from unittest.mock import patch
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+
+import requests
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch, MagicMock
 from django.urls import reverse
-from django.http import HttpResponseServerError
+from lmn.models import Artist, Venue, Show, SyncState, SyncJob, SyncRun
 from lmn.views.views_api import unavailable_message
+from lmn.ticketmaster import client as ticketmaster_client, ingest, ratelimit
+from lmn.ticketmaster.client import TicketmasterClient, page_size
+from lmn.ticketmaster.cursors import published_since_filter
+from lmn.ticketmaster.ingest import build_shows, build_venue, content_hash, sync_events, sync_events_in_batches, upsert
+from lmn.ticketmaster.jobs import claim_next_job, enqueue, work
+from lmn.ticketmaster.markets import _start_worker
+from lmn.ticketmaster.ratelimit import RequestScheduler
+from lmn.ticketmaster.sources import StreamingApiSource, write_page
+from lmn.ticketmaster.standin import synthetic_event
+
 
 class ApiTests(TestCase):
-    @patch('requests.get', side_effect=[Exception])
+    @patch('requests.Session.get', side_effect=[Exception])
     def test_artist_server_error_500(self, requests_mock):
         url = reverse('admin_get_artist')
         response = self.client.get(url)
         self.assertContains(response, unavailable_message, status_code=500)
         self.assertEqual(response.status_code, 500)
 
-    @patch('requests.get', side_effect=[Exception])
+    @patch('requests.Session.get', side_effect=[Exception])
     def test_venue_server_error_500(self, requests_mock):
         url = reverse('admin_get_venue')
         response = self.client.get(url)
         self.assertContains(response, unavailable_message, status_code=500)
         self.assertEqual(response.status_code, 500)
 
-    @patch('requests.get', side_effect=[Exception])
+    @patch('requests.Session.get', side_effect=[Exception])
     def test_show_server_error_500(self, requests_mock):
         url = reverse('admin_get_show')
         response = self.client.get(url)
         self.assertContains(response, unavailable_message, status_code=500)
         self.assertEqual(response.status_code, 500)
+
+
+# Syncs in these tests aren't held to Ticketmaster's quota.
+unthrottled = RequestScheduler(rate=1000, max_retries=0)
+
+
+def event(event_id, artist_name, venue_name, date_time='2023-05-01T01:00:00Z'):
+    return {
+        'id': event_id,
+        'dates': {'start': {'dateTime': date_time}},
+        '_embedded': {
+            'attractions': [{'name': artist_name}],
+            'venues': [{'name': venue_name, 'city': {'name': 'Minneapolis'}, 'state': {'name': 'MN'}}],
+        },
+    }
+
+
+def page_response(resource, results, total_pages):
+    response = MagicMock(status_code=200, headers={})
+    response.json.return_value = {'_embedded': {resource: results}, 'page': {'totalPages': total_pages}}
+    return response
+
+
+def paged_get(resource, pages):
+    """ A stand-in for Session.get that answers each request with the page it asks for. """
+    def get(url, params, **kwargs):
+        return page_response(resource, pages[params['page']], len(pages))
+    return get
+
+
+class SyncTestCase(TestCase):
+
+    def sync(self, url):
+        """ Queues a sync through its URL, runs the sync worker until the queue is empty,
+        and returns the job's status. """
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        work(once=True)
+        return self.client.get(response.json()['status_url']).json()
+
+
+@patch('lmn.ticketmaster.sync.key', 'test-key')
+@patch('lmn.ticketmaster.ratelimit._scheduler', unthrottled)
+class PagedIngestTests(SyncTestCase):
+
+    def test_artists_read_from_every_page(self):
+        pages = [
+            [event('1', 'Yes', 'First Avenue'), event('2', 'REM', 'First Avenue')],
+            [event('3', 'Yes', 'First Avenue'), event('4', 'ACDC', 'Target Center')],
+        ]
+        with patch('requests.Session.get', side_effect=paged_get('events', pages)) as requests_mock:
+            response = self.sync(reverse('admin_get_artist'))
+
+        self.assertIn('Artists have been populated correctly. 3 rows', response['result'])
+        self.assertEqual(requests_mock.call_count, 2)
+        self.assertCountEqual(Artist.objects.values_list('name', flat=True), ['Yes', 'REM', 'ACDC'])
+
+    def test_paging_stops_at_deep_paging_limit(self):
+        pages = [[] for _ in range(100)]
+        with patch('requests.Session.get', side_effect=paged_get('venues', pages)) as requests_mock:
+            self.sync(reverse('admin_get_venue'))
+
+        self.assertEqual(requests_mock.call_count, settings.TICKETMASTER_MAX_RESULTS // page_size)
+
+    def test_shows_written_in_batches(self):
+        Artist.objects.create(name='Yes')
+        Venue.objects.create(name='First Avenue', city='Minneapolis', state='MN')
+        events = [event(str(n), 'Yes', 'First Avenue', f'2023-05-0{n + 1}T01:00:00Z') for n in range(5)]
+
+        with patch('lmn.ticketmaster.ingest.batch_size', 2), \
+                patch('requests.Session.get', side_effect=paged_get('events', [events])), \
+                patch.object(Show.objects, 'bulk_create', wraps=Show.objects.bulk_create) as bulk_mock:
+            response = self.sync(reverse('admin_get_show'))
+
+        self.assertIn('Shows have been populated correctly. 5 rows', response['result'])
+        self.assertEqual(bulk_mock.call_count, 3)
+        self.assertEqual(Show.objects.count(), 5)
+
+    def test_shows_skip_unknown_artists(self):
+        Venue.objects.create(name='First Avenue', city='Minneapolis', state='MN')
+        with patch('requests.Session.get', side_effect=paged_get('events', [[event('1', 'Yes', 'First Avenue')]])):
+            response = self.sync(reverse('admin_get_show'))
+
+        self.assertIn('0 rows', response['result'])
+        self.assertEqual(Show.objects.count(), 0)
+
+
+@patch('lmn.ticketmaster.sync.key', 'test-key')
+@patch('lmn.ticketmaster.ratelimit._scheduler', unthrottled)
+class DeltaSyncTests(SyncTestCase):
+
+    def sync_artists(self, query_string=''):
+        pages = [[event('1', 'Yes', 'First Avenue')]]
+        with patch('requests.Session.get', side_effect=paged_get('events', pages)) as get:
+            response = self.sync(reverse('admin_get_artist') + query_string)
+        return response, get.call_args[1]['params']
+
+    def test_first_sync_is_full_and_records_cursor(self):
+        response, params = self.sync_artists()
+        self.assertEqual(response['status'], 'succeeded')
+        self.assertNotIn('publicVisibilityStartDateTime', params)
+        self.assertEqual(params['dmaId'], '336')
+        self.assertTrue(SyncState.objects.filter(endpoint='artist', market='dmaId=336').exists())
+
+    def test_later_sync_only_requests_events_published_since_cursor(self):
+        SyncState.objects.create(endpoint='artist', market='dmaId=336',
+                                 last_synced=datetime.datetime(2023, 5, 1, 12, 30, tzinfo=datetime.timezone.utc))
+        response, params = self.sync_artists()
+        self.assertEqual(params['publicVisibilityStartDateTime'], '2023-05-01T12:30:00Z')
+        self.assertGreater(SyncState.objects.get(endpoint='artist').last_synced.year, 2023)
+
+    def test_full_sync_ignores_cursor(self):
+        SyncState.objects.create(endpoint='artist', market='dmaId=336', last_synced=timezone.now())
+        response, params = self.sync_artists('?full=1')
+        self.assertNotIn('publicVisibilityStartDateTime', params)
+
+    def test_cursors_are_per_endpoint(self):
+        SyncState.objects.create(endpoint='artist', market='dmaId=336', last_synced=timezone.now())
+        with patch('requests.Session.get', side_effect=paged_get('events', [[]])) as get:
+            self.sync(reverse('admin_get_show'))
+        self.assertNotIn('publicVisibilityStartDateTime', get.call_args[1]['params'])
+
+    def test_failed_sync_does_not_move_cursor(self):
+        last_synced = datetime.datetime(2023, 5, 1, tzinfo=datetime.timezone.utc)
+        SyncState.objects.create(endpoint='artist', market='dmaId=336', last_synced=last_synced)
+        with patch('requests.Session.get', side_effect=Exception):
+            response = self.sync(reverse('admin_get_artist'))
+        self.assertEqual(response['status'], 'failed')
+        self.assertEqual(SyncState.objects.get(endpoint='artist').last_synced, last_synced)
+
+
+def conditional_get(resource, results, requests):
+    """ A stand-in for Session.get that serves one page with an ETag, and answers 304 when the request revalidates it.
+    The headers of each request are added to requests. """
+    body = {'_embedded': {resource: results}, 'page': {'totalPages': 1}}
+
+    def get(url, params, headers, **kwargs):
+        requests.append(headers)
+        if headers.get('If-None-Match') == '"v1"':
+            return MagicMock(status_code=304, headers={}, content=b'')
+        response = MagicMock(status_code=200, headers={'ETag': '"v1"'}, content=json.dumps(body).encode())
+        response.json.return_value = body
+        return response
+    return get
+
+
+@patch('lmn.ticketmaster.sync.key', 'test-key')
+@patch('lmn.ticketmaster.ratelimit._scheduler', unthrottled)
+class ConditionalSyncTests(TransactionTestCase):
+    """ Syncs revalidating cached pages. A TransactionTestCase, since pages are cached once a sync's writes commit. """
+
+    sync = SyncTestCase.sync
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache_settings = override_settings(TICKETMASTER_CACHE_DIR=directory.name)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        Artist.objects.create(name='Yes')
+        Venue.objects.create(name='First Avenue', city='Minneapolis', state='MN')
+        self.requests = []
+        self.params = []
+
+    def sync_with_etag(self, url):
+        get = conditional_get('events', [event('1', 'Yes', 'First Avenue')], self.requests)
+
+        def recording_get(url, params, headers, **kwargs):
+            self.params.append(params)
+            return get(url, params, headers, **kwargs)
+
+        with patch('requests.Session.get', side_effect=recording_get):
+            return self.sync(url)
+
+    def test_syncs_sending_the_same_query_keep_separate_cached_pages(self):
+        self.sync_with_etag(reverse('admin_get_artist'))
+        response = self.sync_with_etag(reverse('admin_get_show'))
+        self.assertIn('Shows have been populated correctly. 1 rows', response['result'])
+        self.assertEqual(Show.objects.count(), 1)
+        self.assertEqual([{}, {}], self.requests)
+
+        # The show sync's own page hasn't changed, so it is skipped.
+        response = self.sync_with_etag(reverse('admin_get_show'))
+        self.assertEqual({'If-None-Match': '"v1"'}, self.requests[-1])
+        self.assertIn('0 rows', response['result'])
+
+    def test_back_to_back_delta_syncs_revalidate_the_run_before(self):
+        self.sync_with_etag(reverse('admin_get_events'))
+        self.sync_with_etag(reverse('admin_get_events'))
+        # As if the runs were a second apart, so each asks for events published since a different time.
+        SyncState.objects.update(last_synced=F('last_synced') - datetime.timedelta(seconds=1))
+        response = self.sync_with_etag(reverse('admin_get_events'))
+
+        # Each run after the first asks only for events published since the run before, and gets a 304.
+        self.assertNotIn(published_since_filter, self.params[0])
+        self.assertNotEqual(self.params[1][published_since_filter], self.params[2][published_since_filter])
+        self.assertEqual([{}, {'If-None-Match': '"v1"'}, {'If-None-Match': '"v1"'}], self.requests)
+        self.assertIn('0 rows', response['result'])
+
+    def test_full_sync_rereads_unchanged_pages(self):
+        self.sync_with_etag(reverse('admin_get_show'))
+        Show.objects.all().delete()
+        response = self.sync_with_etag(reverse('admin_get_show') + '?full=1')
+        self.assertEqual({}, self.requests[-1])
+        self.assertIn('1 rows', response['result'])
+        self.assertEqual(Show.objects.count(), 1)
+
+    def test_page_not_cached_when_its_rows_are_not_written(self):
+        with patch('lmn.ticketmaster.sync.upsert', side_effect=Exception('Database is down')):
+            response = self.sync_with_etag(reverse('admin_get_show'))
+        self.assertEqual(response['status'], 'failed')
+
+        response = self.sync_with_etag(reverse('admin_get_show'))
+        self.assertEqual({}, self.requests[-1])
+        self.assertEqual(Show.objects.count(), 1)
+
+
+@patch('lmn.ticketmaster.sync.key', 'test-key')
+@patch('lmn.ticketmaster.ratelimit._scheduler', unthrottled)
+class UpsertIngestTests(SyncTestCase):
+
+    def test_repeated_artist_sync_does_not_duplicate_artists(self):
+        pages = [[event('1', 'Yes', 'First Avenue'), event('2', 'REM', 'First Avenue')]]
+        for _ in range(2):
+            with patch('requests.Session.get', side_effect=paged_get('events', pages)):
+                response = self.sync(reverse('admin_get_artist') + '?full=1')
+
+        self.assertIn('0 rows written (0 created, 0 updated)', response['result'])
+        self.assertEqual(Artist.objects.count(), 2)
+
+    def test_venue_sync_updates_changed_venues_and_keeps_going(self):
+        upsert(Venue, [Venue(name='First Avenue', city='St Paul', state='MN'),
+                       Venue(name='Target Center', city='Minneapolis', state='MN')],
+               key_fields=('name',), update_fields=('city', 'state'))
+        venues = [
+            {'name': 'First Avenue', 'city': {'name': 'Minneapolis'}, 'state': {'name': 'MN'}},
+            {'name': 'Target Center', 'city': {'name': 'Minneapolis'}, 'state': {'name': 'MN'}},
+            {'name': 'Turf Club', 'city': {'name': 'St Paul'}, 'state': {'name': 'MN'}},
+        ]
+        with patch('requests.Session.get', side_effect=paged_get('venues', [venues])):
+            response = self.sync(reverse('admin_get_venue'))
+
+        self.assertIn('2 rows written (1 created, 1 updated), 1 unchanged', response['result'])
+        self.assertEqual(Venue.objects.get(name='First Avenue').city, 'Minneapolis')
+        self.assertEqual(Venue.objects.count(), 3)
+
+    def test_rows_inserted_by_concurrent_sync_not_counted_as_created(self):
+        Artist.objects.create(name='Yes')
+        lookups = [Artist.objects.none()]
+        filter_artists = Artist.objects.filter
+
+        # The first lookup misses Yes, as if another sync inserted it between the lookup and the insert.
+        def lookup(**kwargs):
+            return lookups.pop() if lookups else filter_artists(**kwargs)
+
+        with patch.object(Artist.objects, 'filter', side_effect=lookup):
+            counts = upsert(Artist, [Artist(name='Yes'), Artist(name='REM')], key_fields=('name',))
+
+        self.assertEqual(counts, (1, 1, 0))
+        self.assertEqual(Artist.objects.count(), 2)
+
+    def test_repeated_show_sync_does_not_duplicate_shows(self):
+        Artist.objects.create(name='Yes')
+        Venue.objects.create(name='First Avenue', city='Minneapolis', state='MN')
+        pages = [[event('1', 'Yes', 'First Avenue'), event('2', 'Yes', 'First Avenue', '2023-06-01T01:00:00Z')]]
+        for _ in range(2):
+            with patch('requests.Session.get', side_effect=paged_get('events', pages)):
+                response = self.sync(reverse('admin_get_show') + '?full=1')
+
+        self.assertIn('0 rows written', response['result'])
+        self.assertEqual(Show.objects.count(), 2)
+
+
+class ContentHashTests(TestCase):
+
+    pages = [[event('1', 'Yes', 'First Avenue'), event('2', 'REM', 'Target Center'),
+              event('3', 'Yes', 'Target Center')]]
+
+    def writes(self, function):
+        """ Calls function, and returns the SQL of every insert, update and delete it ran. """
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            function()
+
+        return [sql for sql in statements if sql.split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+
+    def test_resync_of_unchanged_events_writes_nothing(self):
+        sync_events(self.pages)
+        counts = {}
+        writes = self.writes(lambda: counts.update(sync_events(self.pages)))
+
+        self.assertEqual(writes, [])
+        self.assertEqual(counts, {'artists': (0, 0, 2), 'venues': (0, 0, 2), 'shows': (0, 0, 3)})
+
+    def test_only_changed_rows_rewritten(self):
+        sync_events(self.pages)
+        moved = event('2', 'REM', 'Target Center')
+        moved['_embedded']['venues'][0]['city']['name'] = 'St Paul'
+
+        self.assertEqual(sync_events([[moved]])['venues'], (0, 1, 0))
+        self.assertEqual(Venue.objects.get(name='Target Center').city, 'St Paul')
+        self.assertEqual(Venue.objects.get(name='First Avenue').city, 'Minneapolis')
+
+    def test_hash_stored_with_row(self):
+        sync_events(self.pages)
+        venue = Venue.objects.get(name='First Avenue')
+        self.assertEqual(venue.content_hash, content_hash(venue, ('name', 'city', 'state')))
+        self.assertEqual(len(venue.content_hash), 16)
+
+    def test_row_saved_outside_sync_rewritten_by_next_sync(self):
+        sync_events(self.pages)
+        venue = Venue.objects.get(name='First Avenue')
+        venue.city = 'Duluth'
+        venue.save()
+
+        self.assertEqual(sync_events(self.pages)['venues'], (0, 1, 1))
+        self.assertEqual(Venue.objects.get(name='First Avenue').city, 'Minneapolis')
+
+    def test_datetimes_hashed_in_utc(self):
+        utc = Show(artist_id=1, venue_id=1, show_date=datetime.datetime(2023, 5, 1, 1, tzinfo=datetime.timezone.utc))
+        central_time = datetime.timezone(datetime.timedelta(hours=-5))
+        central = Show(artist_id=1, venue_id=1, show_date=datetime.datetime(2023, 4, 30, 20, tzinfo=central_time))
+        fields = ('artist_id', 'venue_id', 'show_date')
+        self.assertEqual(content_hash(utc, fields), content_hash(central, fields))
+
+
+@patch('lmn.ticketmaster.sync.key', 'test-key')
+@patch('lmn.ticketmaster.ratelimit._scheduler', unthrottled)
+class CombinedEventIngestTests(SyncTestCase):
+
+    pages = [
+        [event('1', 'Yes', 'First Avenue'), event('2', 'REM', 'First Avenue')],
+        [event('3', 'Yes', 'Target Center'), event('4', 'Yes', 'Target Center')],
+    ]
+
+    def test_artists_venues_and_shows_populated_from_one_download(self):
+        with patch('requests.Session.get', side_effect=paged_get('events', self.pages)) as get:
+            response = self.sync(reverse('admin_get_events'))
+
+        self.assertIn('Artists, venues and shows have been populated correctly. 7 rows written', response['result'])
+        self.assertEqual(get.call_count, 2)
+        self.assertCountEqual(Artist.objects.values_list('name', flat=True), ['Yes', 'REM'])
+        self.assertCountEqual(Venue.objects.values_list('name', flat=True), ['First Avenue', 'Target Center'])
+        self.assertEqual(Show.objects.count(), 3)
+        self.assertTrue(Show.objects.filter(artist__name='REM', venue__name='First Avenue').exists())
+
+    def test_repeated_events_sync_writes_nothing(self):
+        for _ in range(2):
+            with patch('requests.Session.get', side_effect=paged_get('events', self.pages)):
+                response = self.sync(reverse('admin_get_events') + '?full=1')
+
+        self.assertIn('0 rows written', response['result'])
+        self.assertEqual(Show.objects.count(), 3)
+
+    def test_events_without_artist_are_skipped(self):
+        no_artist = event('5', 'Yes', 'First Avenue')
+        del no_artist['_embedded']['attractions']
+        with patch('requests.Session.get', side_effect=paged_get('events', [[no_artist]])):
+            response = self.sync(reverse('admin_get_events'))
+
+        self.assertIn('0 rows written', response['result'])
+
+    def test_events_sync_is_one_transaction(self):
+        with patch('requests.Session.get', side_effect=paged_get('events', self.pages)), \
+                patch.object(Show.objects, 'bulk_create', side_effect=Exception('Show insert failed')):
+            response = self.sync(reverse('admin_get_events'))
+
+        self.assertEqual(response['status'], 'failed')
+        self.assertIn('Show insert failed', response['result'])
+        self.assertFalse(Artist.objects.exists())
+        self.assertFalse(Venue.objects.exists())
+
+
+def market_get(pages_by_dma):
+    """ A stand-in for Session.get that answers each market's search with that market's single page of events. """
+    def get(url, params, **kwargs):
+        return page_response('events', pages_by_dma[params['dmaId']], 1)
+    return get
+
+
+@patch('lmn.ticketmaster.sync.key', 'test-key')
+@patch('lmn.ticketmaster.ratelimit._scheduler', unthrottled)
+@override_settings(TICKETMASTER_MARKETS=[{'dmaId': '336'}, {'dmaId': '324'}])
+class MultiMarketSyncTests(SyncTestCase):
+
+    pages_by_dma = {
+        '336': [event('1', 'Yes', 'First Avenue')],
+        '324': [event('2', 'Yes', 'Orpheum'), event('3', 'REM', 'Orpheum')],
+    }
+
+    def test_every_market_synced_with_its_own_cursor(self):
+        with patch('requests.Session.get', side_effect=market_get(self.pages_by_dma)):
+            response = self.sync(reverse('admin_get_events'))
+
+        self.assertEqual(response['status'], 'succeeded')
+        self.assertIn('Synced 2 market(s)', response['result'])
+        self.assertIn('dmaId=336: Artists, venues and shows have been populated correctly. 3 rows', response['result'])
+        self.assertIn('dmaId=324: Artists, venues and shows have been populated correctly. 4 rows', response['result'])
+        self.assertEqual(Show.objects.count(), 3)
+        self.assertCountEqual(SyncState.objects.values_list('market', flat=True), ['dmaId=336', 'dmaId=324'])
+
+    def test_failed_market_keeps_markets_already_synced(self):
+        def get(url, params, **kwargs):
+            if params['dmaId'] == '324':
+                raise requests.ConnectionError('Ticketmaster is down')
+            return market_get(self.pages_by_dma)(url, params)
+
+        with patch('requests.Session.get', side_effect=get):
+            response = self.sync(reverse('admin_get_events'))
+
+        self.assertEqual(response['status'], 'failed')
+        self.assertIn('Ticketmaster is down', response['result'])
+        self.assertTrue(Show.objects.filter(venue__name='First Avenue').exists())
+        self.assertEqual(list(SyncState.objects.values_list('market', flat=True)), ['dmaId=336'])
+
+    def test_job_result_shows_markets_as_they_finish(self):
+        results = []
+        enqueue('events')
+
+        def save(model_self, *args, **kwargs):
+            results.append(model_self.result)
+
+        get = market_get(self.pages_by_dma)
+        with patch('requests.Session.get', side_effect=get), patch.object(SyncJob, 'save', save):
+            work(once=True)
+
+        self.assertTrue(results[0].startswith('dmaId=336: '))
+        self.assertTrue(results[1].startswith('dmaId=336: '))
+        self.assertIn('dmaId=324: ', results[1])
+        self.assertTrue(results[-1].startswith('Synced 2 market(s)'))
+
+    def test_venue_sync_uses_venue_markets(self):
+        with override_settings(TICKETMASTER_VENUE_MARKETS=[{'stateCode': 'MN'}, {'stateCode': 'WI'}]), \
+                patch('requests.Session.get', side_effect=paged_get('venues', [[]])) as get:
+            self.sync(reverse('admin_get_venue'))
+
+        self.assertEqual([call.kwargs['params']['stateCode'] for call in get.call_args_list], ['MN', 'WI'])
+
+
+class MarketWorkerTests(TestCase):
+
+    def setUp(self):
+        self.saved = ingest.write_lock, ratelimit._scheduler, ticketmaster_client._session
+
+    def tearDown(self):
+        ingest.write_lock, ratelimit._scheduler, ticketmaster_client._session = self.saved
+
+    @override_settings(TICKETMASTER_REQUESTS_PER_SECOND=6)
+    def test_worker_processes_share_the_request_rate_and_write_lock(self):
+        lock = object()
+        ticketmaster_client._session = object()
+        _start_worker(3, lock)
+
+        self.assertIs(ingest.write_lock, lock)
+        self.assertEqual(ratelimit._scheduler.bucket.rate, 2)
+        self.assertIsNone(ticketmaster_client._session)
+
+
+@patch('lmn.ticketmaster.sync.key', 'test-key')
+@patch('lmn.ticketmaster.ratelimit._scheduler', unthrottled)
+class SyncRunHistoryTests(SyncTestCase):
+
+    pages = [
+        [event('1', 'Yes', 'First Avenue'), event('2', 'REM', 'First Avenue')],
+        [event('3', 'Yes', 'Target Center'), event('4', 'Yes', 'Target Center')],
+    ]
+
+    def test_run_recorded_with_rows_per_stage(self):
+        with patch('requests.Session.get', side_effect=paged_get('events', self.pages)):
+            self.sync(reverse('admin_get_events'))
+
+        run = SyncRun.objects.get()
+        summary = run.summary
+        self.assertTrue(run.succeeded)
+        self.assertEqual((run.endpoint, run.market), ('events', 'dmaId=336'))
+        self.assertEqual(summary['stages']['fetch']['rows'], 2)
+        self.assertEqual(summary['stages']['decode']['rows'], 4)
+        self.assertEqual(summary['stages']['transform']['rows'], 7)
+        self.assertEqual(summary['stages']['write']['rows'], 7)
+        self.assertEqual((summary['created'], summary['updated'], summary['unchanged']), (7, 0, 0))
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(set(summary['stages']), {'fetch', 'decode', 'transform', 'lookup', 'write'})
+        self.assertGreaterEqual(summary['seconds'], summary['stages']['write']['seconds'])
+
+    def test_unchanged_resync_looks_up_but_does_not_write(self):
+        for _ in range(2):
+            with patch('requests.Session.get', side_effect=paged_get('events', self.pages)):
+                self.sync(reverse('admin_get_events') + '?full=1')
+
+        summary = SyncRun.objects.order_by('pk').last().summary
+        self.assertEqual(summary['stages']['write']['rows'], 0)
+        self.assertEqual(summary['stages']['lookup']['rows'], 7 + 4)
+        self.assertEqual(summary['unchanged'], 7)
+
+    def test_retries_and_failures_recorded(self):
+        scheduler = RequestScheduler(rate=1000, max_retries=1, sleep=lambda seconds: None)
+        unavailable = MagicMock(status_code=503, headers={})
+        with patch('lmn.ticketmaster.ratelimit._scheduler', scheduler), \
+                patch('requests.Session.get', return_value=unavailable):
+            unavailable.raise_for_status.side_effect = requests.HTTPError('503 Service Unavailable')
+            self.sync(reverse('admin_get_events'))
+
+        run = SyncRun.objects.get()
+        self.assertFalse(run.succeeded)
+        self.assertIn('503', run.error)
+        self.assertEqual(run.summary['retries'], 1)
+        self.assertEqual(run.summary['requests'], 2)
+
+    def test_replayed_bytes_counted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_page(directory, 'events', 0, self.pages[0])
+            with override_settings(TICKETMASTER_REPLAY_DIR=directory):
+                self.sync(reverse('admin_get_events'))
+            size = os.path.getsize(os.path.join(directory, 'events', 'page-00000.json'))
+
+        self.assertEqual(SyncRun.objects.get().summary['bytes_downloaded'], size)
+
+    def test_history_command(self):
+        with patch('requests.Session.get', side_effect=paged_get('events', self.pages)):
+            self.sync(reverse('admin_get_events'))
+
+        out = StringIO()
+        call_command('sync_history', stdout=out)
+        self.assertIn('events  dmaId=336', out.getvalue())
+        self.assertIn('write ', out.getvalue())
+
+        out = StringIO()
+        call_command('sync_history', 'events', '--json', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['created'], 7)
+
+
+class BuildVenueTests(TestCase):
+
+    def test_state_code_preferred_over_state_name(self):
+        venue = build_venue({'name': 'First Avenue', 'city': {'name': 'Minneapolis'},
+                             'state': {'name': 'Minnesota', 'stateCode': 'MN'}})
+        self.assertEqual(venue.state, 'MN')
+
+    def test_state_name_not_required_when_state_code_given(self):
+        venue = build_venue({'name': 'First Avenue', 'city': {'name': 'Minneapolis'}, 'state': {'stateCode': 'MN'}})
+        self.assertEqual(venue.state, 'MN')
+
+
+class BuildShowsTests(TestCase):
+
+    def test_lookups_take_one_query_per_model_however_many_events(self):
+        Artist.objects.bulk_create([Artist(name=f'Artist {n}') for n in range(50)])
+        Venue.objects.bulk_create([Venue(name=f'Venue {n}', city='Minneapolis', state='MN') for n in range(50)])
+        events = [event(str(n), f'Artist {n}', f'Venue {n}') for n in range(50)]
+
+        with self.assertNumQueries(2):
+            shows = build_shows(events)
+
+        self.assertEqual(len(shows), 50)
+        self.assertEqual(shows[7].artist_id, Artist.objects.get(name='Artist 7').pk)
+        self.assertEqual(shows[7].venue_id, Venue.objects.get(name='Venue 7').pk)
+
+
+@patch('lmn.ticketmaster.sync.key', 'test-key')
+@patch('lmn.ticketmaster.ratelimit._scheduler', unthrottled)
+class SyncJobQueueTests(TestCase):
+
+    def test_sync_url_queues_job_without_syncing(self):
+        with patch('requests.Session.get') as get:
+            response = self.client.get(reverse('admin_get_events') + '?full=1')
+
+        self.assertEqual(response.status_code, 202)
+        job = SyncJob.objects.get(pk=response.json()['id'])
+        self.assertEqual((job.endpoint, job.full, job.status), ('events', True, SyncJob.QUEUED))
+        self.assertEqual(response.json()['status_url'], reverse('sync_job_status', kwargs={'job_pk': job.pk}))
+        get.assert_not_called()
+
+    def test_jobs_claimed_oldest_first_and_only_once(self):
+        first = enqueue('artist')
+        second = enqueue('venue')
+
+        self.assertEqual(claim_next_job(), first)
+        self.assertEqual(claim_next_job(), second)
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(SyncJob.objects.filter(status=SyncJob.RUNNING).count(), 2)
+
+    def test_unknown_endpoint_not_queued(self):
+        with self.assertRaises(ValueError):
+            enqueue('nope')
+
+    def test_status_of_unknown_job_is_404(self):
+        response = self.client.get(reverse('sync_job_status', kwargs={'job_pk': 1}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_worker_command_runs_queued_jobs(self):
+        enqueue('events')
+        out = StringIO()
+        with patch('requests.Session.get', side_effect=paged_get('events', [[event('1', 'Yes', 'First Avenue')]])):
+            call_command('sync_worker', '--once', stdout=out)
+
+        self.assertIn('Ran 1 sync jobs.', out.getvalue())
+        self.assertEqual(SyncJob.objects.get().status, SyncJob.SUCCEEDED)
+        self.assertEqual(Show.objects.count(), 1)
+
+    def test_sync_command_runs_sync_now(self):
+        out = StringIO()
+        with patch('requests.Session.get', side_effect=paged_get('events', [[event('1', 'Yes', 'First Avenue')]])):
+            call_command('sync_ticketmaster', 'events', stdout=out)
+
+        self.assertIn('Artists, venues and shows have been populated correctly.', out.getvalue())
+        self.assertFalse(SyncJob.objects.exists())
+
+    def test_sync_command_can_queue_instead(self):
+        call_command('sync_ticketmaster', 'show', '--full', '--enqueue', stdout=StringIO())
+        self.assertEqual(SyncJob.objects.get().endpoint, 'show')
+
+
+class ReplaySyncTests(SyncTestCase):
+
+    def test_sync_replays_recorded_pages_without_api_key(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_page(directory, 'events', 0, [event('1', 'Yes', 'First Avenue')])
+            write_page(directory, 'events', 1, [event('2', 'REM', 'Target Center')])
+
+            with override_settings(TICKETMASTER_REPLAY_DIR=directory), patch('requests.Session.get') as get:
+                response = self.sync(reverse('admin_get_events'))
+
+        self.assertEqual(response['status'], 'succeeded')
+        self.assertEqual(Show.objects.count(), 2)
+        get.assert_not_called()
+
+
+class StreamingSession:
+    """ Streams pages of event_count synthetic events, generating the response body as it is read. """
+
+    def __init__(self, event_count):
+        self.event_count = event_count
+        # The number of events sent so far.
+        self.sent = 0
+
+    def get(self, url, params, stream=False, **kwargs):
+        page = params['page']
+        total_pages = -(-self.event_count // page_size)
+        numbers = range(page * page_size, min((page + 1) * page_size, self.event_count))
+
+        def body():
+            yield b'{"_embedded": {"events": ['
+            for n in numbers:
+                separator = b', ' if n != numbers[0] else b''
+                self.sent += 1
+                yield separator + json.dumps(synthetic_event(n, self.event_count, self.event_count)).encode()
+            yield b']}, "page": {"totalPages": %d}}' % total_pages
+
+        response = MagicMock(status_code=200, headers={})
+        response.iter_content.side_effect = lambda **kwargs: body()
+        return response
+
+
+@override_settings(TICKETMASTER_MAX_RESULTS=100000)
+class StreamingIngestTests(SyncTestCase):
+
+    def streamed_pages(self, event_count):
+        client = TicketmasterClient('key', session=StreamingSession(event_count), scheduler=unthrottled)
+        return StreamingApiSource(client).pages('events', {})
+
+    def test_events_streamed_and_saved_in_batches(self):
+        counts = sync_events_in_batches(self.streamed_pages(1200))
+        self.assertEqual(counts, {'artists': (1200, 0, 0), 'venues': (1200, 0, 0), 'shows': (1200, 0, 0)})
+        self.assertEqual(Show.objects.count(), 1200)
+
+    def test_events_held_at_once_do_not_grow_with_events_synced(self):
+        session = StreamingSession(2500)
+        client = TicketmasterClient('key', session=session, scheduler=unthrottled)
+        batches = []
+        held = []
+        for batch in StreamingApiSource(client).pages('events', {}):
+            # The events read from the response but not given to the sync in an earlier batch.
+            held.append(session.sent - sum(batches))
+            batches.append(len(batch))
+
+        self.assertEqual(batches, [ingest.batch_size] * 5)
+        self.assertLessEqual(max(held), ingest.batch_size + 1)
+
+    @patch('lmn.ticketmaster.sync.key', 'test-key')
+    @patch('lmn.ticketmaster.ratelimit._scheduler', unthrottled)
+    def test_events_sync_streams_when_configured(self):
+        session = StreamingSession(450)
+        with override_settings(TICKETMASTER_STREAMING=True), patch('requests.Session.get', side_effect=session.get):
+            response = self.sync(reverse('admin_get_events'))
+
+        self.assertEqual(response['status'], 'succeeded')
+        self.assertEqual(Show.objects.count(), 450)
+        summary = SyncRun.objects.get().summary
+        self.assertEqual(summary['stages']['decode']['rows'], 450)
+        self.assertEqual(summary['stages']['fetch']['rows'], 3)
+        self.assertGreater(summary['bytes_downloaded'], 450 * 100)
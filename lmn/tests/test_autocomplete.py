@@ -0,0 +1,130 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from lmn import autocomplete
+from lmn.autocomplete import PrefixIndex, normalize
+from lmn.models import Artist, Note, Show, Venue
+from lmn.ticketmaster.markets import run_sync
+
+
+class PrefixIndexTests(TestCase):
+
+    def setUp(self):
+        self.index = PrefixIndex([
+            (1, 'The Beatles', 3),
+            (2, 'Beat Happening', 0),
+            (3, 'Béla Fleck', 1),
+            (4, 'Beat Beat Beat', 0),
+            (5, 'Heartbeat City', 9),
+            (6, 'AC/DC', 0),
+        ])
+
+    def names(self, text, limit=10):
+        return [name for pk, name, activity in self.index.complete(text, limit)]
+
+    def test_normalize(self):
+        self.assertEqual('bela fleck', normalize('  Béla   FLECK '))
+        self.assertEqual('ac dc', normalize('AC/DC'))
+
+    def test_completes_start_of_any_word_most_noted_first(self):
+        self.assertEqual(['The Beatles', 'Beat Beat Beat', 'Beat Happening'], self.names('beat'))
+        self.assertEqual(['The Beatles', 'Béla Fleck', 'Beat Beat Beat', 'Beat Happening'], self.names('BE'))
+        self.assertEqual(['Heartbeat City'], self.names('hear'))
+        self.assertEqual([], self.names('eat'))
+
+    def test_ignores_accents_and_punctuation(self):
+        self.assertEqual(['Béla Fleck'], self.names('bela f'))
+        self.assertEqual(['AC/DC'], self.names('ac-d'))
+        self.assertEqual([], self.names('  /  '))
+
+    def test_limit(self):
+        self.assertEqual(['The Beatles', 'Béla Fleck'], self.names('b', limit=2))
+
+    def test_long_runs_are_ranked_when_built(self):
+        index = PrefixIndex([(n, f'Band {n}', n % 7) for n in range(1000)])
+        # 'band 1' matches Band 1, Band 10 to 19 and Band 100 to 199, which is too few listings to remember.
+        self.assertEqual({'b', 'ba', 'ban', 'band'}, set(index.remembered))
+
+        with patch.object(index, 'best', side_effect=AssertionError('ranked again')):
+            best = index.complete('band', 5)
+        self.assertEqual([6, 6, 6, 6, 6], [activity for pk, name, activity in best])
+        names = [name for pk, name, activity in index.complete('band 1', 3)]
+        self.assertEqual(['Band 13', 'Band 104', 'Band 111'], names)
+
+
+class AutocompleteViewTests(TestCase):
+
+    def setUp(self):
+        autocomplete.clear()
+        self.quiet = Artist.objects.create(name='Queens of the Stone Age')
+        self.noted = Artist.objects.create(name='Queen')
+        venue = Venue.objects.create(name='First Avenue', city='Minneapolis', state='MN')
+        show = Show.objects.create(artist=self.noted, venue=venue, show_date='2020-01-01T20:00:00Z')
+        user = User.objects.create_user(username='fan', password='password')
+        for number in range(3):
+            Note.objects.create(show=show, user=user, title=f'Note {number}', text='Great')
+
+    def tearDown(self):
+        autocomplete.clear()
+
+    def get(self, url_name, text, **params):
+        return self.client.get(reverse(url_name), dict(q=text, **params)).json()['results']
+
+    def test_results_ranked_by_note_activity(self):
+        results = self.get('artist_autocomplete', 'que')
+        self.assertEqual([
+            {'id': self.noted.pk, 'name': 'Queen', 'notes': 3},
+            {'id': self.quiet.pk, 'name': 'Queens of the Stone Age', 'notes': 0},
+        ], results)
+
+        results = self.get('artist_autocomplete', 'que', limit=1)
+        self.assertEqual([{'id': self.noted.pk, 'name': 'Queen', 'notes': 3}], results)
+        self.assertEqual(['First Avenue'], [result['name'] for result in self.get('venue_autocomplete', 'ave')])
+
+    def test_loaded_index_answers_without_queries(self):
+        self.get('artist_autocomplete', 'q')
+        with self.assertNumQueries(0):
+            for text in ['q', 'qu', 'que', 'quee', 'queens', 'stone']:
+                self.get('artist_autocomplete', text)
+
+    def test_invalid_limit_uses_default(self):
+        self.assertEqual(2, len(self.get('artist_autocomplete', 'q', limit='many')))
+        self.assertEqual(1, len(self.get('artist_autocomplete', 'q', limit=-5)))
+
+    def test_saving_or_deleting_artist_reloads_index(self):
+        self.assertEqual(2, len(self.get('artist_autocomplete', 'que')))
+
+        Artist.objects.create(name='Queensrÿche')
+        self.assertEqual(3, len(self.get('artist_autocomplete', 'que')))
+
+        self.quiet.delete()
+        names = [result['name'] for result in self.get('artist_autocomplete', 'que')]
+        self.assertEqual(['Queen', 'Queensrÿche'], names)
+
+    def test_ingest_run_reloads_index(self):
+        self.get('artist_autocomplete', 'que')
+        Artist.objects.bulk_create([Artist(name='Quicksand')])
+        self.assertEqual([], self.get('artist_autocomplete', 'quick'))
+
+        with patch('lmn.ticketmaster.markets.sync_market', return_value=('dmaId=336', 'done', 0.1)):
+            run_sync('artists', processes=1)
+        self.assertEqual(['Quicksand'], [result['name'] for result in self.get('artist_autocomplete', 'quick')])
+
+    @override_settings(AUTOCOMPLETE_MAX_AGE=0)
+    def test_old_index_is_reloaded_in_background(self):
+        old = autocomplete.index('artists')
+        fresh = PrefixIndex([(1, 'Quicksand', 0)])
+
+        with patch('lmn.autocomplete.load', return_value=fresh):
+            # The old index answers while the new one loads.
+            self.assertIs(old, autocomplete.index('artists'))
+            for _ in range(100):
+                if autocomplete._indexes['artists'] is fresh:
+                    break
+                time.sleep(0.01)
+
+        self.assertIs(fresh, autocomplete._indexes['artists'])
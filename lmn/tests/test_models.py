@@ -1,8 +1,14 @@
-from django.test import TestCase
+import datetime
+import threading
+import time
+from io import StringIO
+
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth.models import User
-from django.db import IntegrityError
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection
 
-from ..models import Show, Note
+from ..models import Artist, Venue, Show, Note
 
 
 class TestUser(TestCase):
@@ -24,6 +30,14 @@ class TestUser(TestCase):
             user2.save()
 
 
+class TestArtist(TestCase):
+
+    def test_create_artist_duplicate_name_fails(self):
+        Artist.objects.create(name='Yes')
+        with self.assertRaises(IntegrityError):
+            Artist.objects.create(name='Yes')
+
+
 class TestShow(TestCase):
 
     fixtures = ['testing_users', 'testing_artists','testing_venues','testing_shows_most_notes', 'testing_notes_for_top_shows']
@@ -44,6 +58,11 @@ class TestShow(TestCase):
         
         self.assertEqual(test_show.note_count, 4)  # Note count should go back down to 4 if one note is deleted
 
+    def test_create_duplicate_show_fails(self):
+        show = Show.objects.get(pk=1)
+        with self.assertRaises(IntegrityError):
+            Show.objects.create(artist=show.artist, venue=show.venue, show_date=show.show_date)
+
     def test_shows_have_correct_note_count_no_notes(self):
         test_show = Show.objects.get(pk=5)
 
@@ -65,4 +84,103 @@ class TestShow(TestCase):
             Note.objects.create(show=test_show, user=test_user, title=title, text=text, posted_date=posted_date) 
 
         self.assertEqual(test_show.note_count, 100)
-        
\ No newline at end of file
+        
+    def test_note_count_stored_on_show(self):
+        shows = list(Show.objects.order_by('pk'))
+        with self.assertNumQueries(0):
+            counts = [show.note_count for show in shows]
+        self.assertEqual(counts, [4, 2, 1, 2, 0, 0, 0])
+
+    def test_deleting_note_twice_only_counts_once(self):
+        note = Note.objects.filter(show_id=1).first()
+        stale_copy = Note.objects.get(pk=note.pk)
+        note.delete()
+        self.assertEqual(stale_copy.delete()[0], 0)
+        self.assertEqual(Show.objects.get(pk=1).note_count, 3)
+
+    def test_deleting_user_takes_their_notes_off_counts(self):
+        user = User.objects.get(pk=1)
+        show_pks = set(Note.objects.filter(user=user).values_list('show_id', flat=True))
+        self.assertTrue(show_pks)
+        user.delete()
+        for show in Show.objects.filter(pk__in=show_pks):
+            self.assertEqual(show.note_count, Note.objects.filter(show=show).count())
+
+    def test_queryset_delete_takes_notes_off_counts(self):
+        Note.objects.filter(show_id=1).delete()
+        self.assertEqual(Show.objects.get(pk=1).note_count, 0)
+
+    def test_repair_command_fixes_wrong_counts(self):
+        Show.objects.filter(pk__in=[1, 5]).update(note_count=99)
+
+        out = StringIO()
+        call_command('repair_note_counts', '--check', stdout=out)
+        self.assertIn('Show 1: note_count 99, has 4 notes', out.getvalue())
+        self.assertIn('2 shows have a wrong note count.', out.getvalue())
+        self.assertEqual(Show.objects.get(pk=1).note_count, 99)
+
+        out = StringIO()
+        call_command('repair_note_counts', stdout=out)
+        self.assertIn('Fixed the note count of 2 shows.', out.getvalue())
+        self.assertEqual(Show.objects.get(pk=1).note_count, 4)
+        self.assertEqual(Show.objects.get(pk=5).note_count, 0)
+
+
+def retry_if_locked(function):
+    """ Calls function until it isn't stopped by SQLite's table lock. The tests' in-memory database makes writers
+    on other threads fail at once instead of waiting. Each failed attempt rolled back the whole transaction. """
+    while True:
+        try:
+            return function()
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            time.sleep(0.001)
+
+
+class TestShowNoteCountConcurrency(TransactionTestCase):
+
+    def setUp(self):
+        self.show = Show.objects.create(artist=Artist.objects.create(name='Yes'),
+                                        venue=Venue.objects.create(name='First Avenue', city='Minneapolis', state='MN'),
+                                        show_date=datetime.datetime(2017, 2, 12, 19, 30, tzinfo=datetime.timezone.utc))
+        self.users = [User.objects.create(username=f'writer{n}', email=f'writer{n}@example.com') for n in range(8)]
+
+    def run_in_parallel(self, writers):
+        errors = []
+
+        def run(writer):
+            try:
+                writer()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(writer,)) for writer in writers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+    def test_count_exact_with_parallel_writers(self):
+        # Each writer adds 25 notes to the same show, deleting every fifth one again, all at the same time.
+        def writer(user):
+            def write():
+                # Each writer has its own, soon out of date, copy of the show.
+                show = retry_if_locked(lambda: Show.objects.get(pk=self.show.pk))
+                for n in range(25):
+                    note = retry_if_locked(
+                        lambda: Note.objects.create(show=show, user=user, title=f'Note {n}', text='Text')
+                    )
+                    if n % 5 == 4:
+                        retry_if_locked(note.delete)
+            return write
+
+        self.run_in_parallel([writer(user) for user in self.users])
+
+        self.show.refresh_from_db()
+        self.assertEqual(Note.objects.filter(show=self.show).count(), 8 * 20)
+        self.assertEqual(self.show.note_count, 8 * 20)
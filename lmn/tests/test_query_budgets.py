@@ -0,0 +1,132 @@
+""" Query budgets: the most database queries each page may make.
+
+Every page is requested as the data grows, and must stay within its budget and make the same number of queries
+at every size. A page that makes a query for each note, show or user it displays fails as soon as there are two.
+When a page's queries change on purpose, change its budget here. """
+
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lmn import autocomplete, notes_feed
+from lmn.models import Artist, Note, Show, Venue
+from lmn.tests import SharedCacheMixin
+
+
+QueryBudget = namedtuple('QueryBudget', ['url_name', 'kwargs', 'queries', 'login'], defaults=[False])
+
+# kwargs are made from the Data the page is requested with. Logged in requests look up the session and user,
+# 2 queries more than the same page logged out.
+query_budgets = [
+    QueryBudget('homepage', lambda data: {}, 0),
+    QueryBudget('artist_list', lambda data: {}, 2),
+    QueryBudget('artist_detail', lambda data: {'artist_pk': data.artist.pk}, 1),
+    QueryBudget('venues_for_artist', lambda data: {'artist_pk': data.artist.pk}, 2),
+    QueryBudget('venue_list', lambda data: {}, 2),
+    QueryBudget('venue_detail', lambda data: {'venue_pk': data.venue.pk}, 1),
+    QueryBudget('artists_at_venue', lambda data: {'venue_pk': data.venue.pk}, 2),
+    # The latest notes feed is kept in the cache as notes are added.
+    QueryBudget('latest_notes', lambda data: {}, 0),
+    # Each round of requests follows new notes for the show, so its page isn't cached yet.
+    QueryBudget('notes_for_show', lambda data: {'show_pk': data.show.pk}, 2),
+    QueryBudget('note_detail', lambda data: {'note_pk': data.note.pk}, 1),
+    QueryBudget('new_note', lambda data: {'show_pk': data.show.pk}, 3, login=True),
+    QueryBudget('edit_note', lambda data: {'note_pk': data.note.pk}, 4, login=True),
+    QueryBudget('shows_with_most_notes', lambda data: {}, 1),
+    QueryBudget('user_profile', lambda data: {'user_pk': data.user.pk}, 2),
+    QueryBudget('user_profile', lambda data: {'user_pk': data.user.pk}, 4, login=True),
+    QueryBudget('user_profile_notes', lambda data: {'user_pk': data.user.pk}, 1),
+    QueryBudget('api_artist_list', lambda data: {}, 1),
+    QueryBudget('api_show_list', lambda data: {}, 1),
+    QueryBudget('api_note_list', lambda data: {}, 1),
+    QueryBudget('api_note_detail', lambda data: {'note_pk': data.note.pk}, 1),
+    # Artists and venues were just added, so these load the autocomplete index. Loaded, they make no queries.
+    QueryBudget('artist_autocomplete', lambda data: {}, 1),
+    QueryBudget('venue_autocomplete', lambda data: {}, 1),
+]
+
+# The number of artists, venues, users, shows and notes added before each round of requests.
+growth = [1, 4, 20]
+
+
+class Data:
+    """ Artists, venues, users, shows and notes, which grow with add. The first of each, which the pages are
+    requested for, gains shows and notes as the data grows. """
+
+    def __init__(self):
+        self.size = 0
+        self.artist = self.venue = self.user = self.show = self.note = None
+
+    def add(self, count):
+        for number in range(self.size, self.size + count):
+            artist = Artist.objects.create(name=f'Artist {number}')
+            venue = Venue.objects.create(name=f'Venue {number}', city='Minneapolis', state='MN')
+            user = User.objects.create_user(username=f'user{number}', password='password')
+            self.artist = self.artist or artist
+            self.venue = self.venue or venue
+            self.user = self.user or user
+
+            show_date = datetime(2020, 1, 1, tzinfo=timezone.utc) + timedelta(days=number)
+            show = Show.objects.create(artist=artist, venue=self.venue, show_date=show_date)
+            self.show = self.show or show
+            if number:
+                Show.objects.create(artist=self.artist, venue=venue, show_date=show_date)
+
+            note = Note.objects.create(show=self.show, user=user, title=f'Note {number}', text='Great show')
+            self.note = self.note or note
+            Note.objects.create(show=show, user=self.user, title=f'Another note {number}', text='Loud')
+
+        self.size += count
+
+
+@contextmanager
+def committing():
+    """ Runs the on commit callbacks registered inside, as if their changes committed. TestCase never commits. """
+    start = len(connection.run_on_commit)
+    yield
+    callbacks = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for savepoints, callback in callbacks:
+        callback()
+
+
+class QueryBudgetTests(SharedCacheMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        autocomplete.clear()
+        # As rebuild_latest_notes would, before any notes are added.
+        notes_feed.rebuild()
+
+    def queries_for(self, budget, data):
+        client = Client()
+        if budget.login:
+            client.force_login(data.user)
+
+        url = reverse(budget.url_name, kwargs=budget.kwargs(data))
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(200, response.status_code, url)
+        return len(context)
+
+    def test_pages_stay_within_query_budgets_as_data_grows(self):
+        data = Data()
+        counts = {budget: [] for budget in query_budgets}
+
+        for count in growth:
+            # Notes are added to the latest notes feed when they commit.
+            with committing():
+                data.add(count)
+            for budget in query_budgets:
+                counts[budget].append(self.queries_for(budget, data))
+
+        for budget, queries in counts.items():
+            with self.subTest(url_name=budget.url_name, login=budget.login):
+                self.assertLessEqual(max(queries), budget.queries, f'Queries with {growth} rows added: {queries}')
+                self.assertEqual(len(set(queries)), 1, f'Queries grew with {growth} rows added: {queries}')
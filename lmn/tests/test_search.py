@@ -0,0 +1,95 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lmn.models import Artist, Venue
+from lmn.search import has_index, install, search
+from lmn.ticketmaster.ingest import upsert
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        for name in ['The Beatles', 'Beat Happening', 'Heartbeat City', 'The Beat', 'Queen', '100% Silk']:
+            Artist.objects.create(name=name)
+
+    def names(self, text):
+        return [artist.name for artist in search(Artist.objects.all(), text).order_by('search_rank', 'id')]
+
+    def test_test_database_has_search_index(self):
+        self.assertTrue(has_index())
+
+    def test_matches_words_anywhere_in_names_ignoring_case(self):
+        self.assertEqual({'The Beatles', 'Beat Happening', 'Heartbeat City', 'The Beat'}, set(self.names('BEAT')))
+        self.assertEqual(['Heartbeat City'], self.names('city beat'))
+        self.assertEqual([], self.names('Beatles City'))
+
+    def test_names_starting_with_search_rank_first(self):
+        names = self.names('beat')
+        self.assertEqual('Beat Happening', names[0])
+
+    def test_search_uses_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.names('beat')
+        self.assertIn('lmn_artist_fts MATCH', queries[-1]['sql'])
+
+    def test_short_words_scan_names(self):
+        self.assertEqual(['Queen'], self.names('qu'))
+        self.assertEqual(['Heartbeat City'], self.names('a c'))
+
+    def test_databases_without_index_scan_names(self):
+        with patch('lmn.search.has_index', return_value=False):
+            with CaptureQueriesContext(connection) as queries:
+                names = self.names('beat')
+        self.assertNotIn('MATCH', queries[-1]['sql'])
+        self.assertEqual(['Beat Happening', 'The Beatles', 'Heartbeat City', 'The Beat'], names)
+
+    def test_query_syntax_is_searched_as_text(self):
+        self.assertEqual(['100% Silk'], self.names('100%'))
+        self.assertEqual([], self.names('"beat" OR queen'))
+        self.assertEqual([], self.names('_'))
+
+    def test_index_follows_saves_updates_and_deletes(self):
+        artist = Artist.objects.get(name='Queen')
+        artist.name = 'Queens of the Stone Age'
+        artist.save()
+        self.assertEqual(['Queens of the Stone Age'], self.names('stone'))
+
+        Artist.objects.filter(name__startswith='Queens').update(name='Kyuss')
+        self.assertEqual([], self.names('stone'))
+        self.assertEqual(['Kyuss'], self.names('kyuss'))
+
+        Artist.objects.filter(name='Kyuss').delete()
+        self.assertEqual([], self.names('kyuss'))
+
+    def test_index_follows_bulk_ingest(self):
+        upsert(Artist, [Artist(name=f'Synced Band {number}') for number in range(50)], ('name',), ('name',))
+        self.assertEqual(50, len(self.names('synced')))
+
+    def test_rebuild_refills_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO lmn_artist_fts(lmn_artist_fts) VALUES ('delete-all')")
+        self.assertEqual([], self.names('queen'))
+
+        install(connection, rebuild=True)
+        self.assertEqual(['Queen'], self.names('queen'))
+
+    def test_venue_search_pages_by_rank(self):
+        Venue.objects.bulk_create(
+            Venue(name=f'Hall {number:02}', city='Minneapolis', state='MN') for number in range(15)
+        )
+        Venue.objects.create(name='Music Hall', city='Duluth', state='MN')
+
+        url = reverse('venue_list')
+        first = self.client.get(url, {'search_name': 'hall'})
+        second = self.client.get(url, {'search_name': 'hall', 'cursor': first.context['venues'].next_cursor})
+
+        first_names = [venue.name for venue in first.context['venues']]
+        second_names = [venue.name for venue in second.context['venues']]
+        self.assertEqual(10, len(first_names))
+        self.assertEqual(16, len(set(first_names + second_names)))
+        # Names starting with the search come before the name with it at the end.
+        self.assertEqual('Music Hall', second_names[-1])
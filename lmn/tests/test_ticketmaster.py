@@ -0,0 +1,392 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from lmn.ticketmaster import client as ticketmaster_client
+from lmn.ticketmaster.cache import ResponseCache
+from lmn.ticketmaster.client import TicketmasterClient, shared_session
+from lmn.ticketmaster.ratelimit import RequestScheduler, TokenBucket
+from lmn.ticketmaster.cursors import published_since_filter
+from lmn.ticketmaster.sources import RecordingSource, ReplaySource
+from lmn.ticketmaster.standin import StandInServer
+from lmn.ticketmaster.stream import StreamingPageParser
+
+
+# These tests aren't held to Ticketmaster's quota.
+unthrottled = RequestScheduler(rate=1000, max_retries=0)
+
+
+class FakeSession:
+    """ Answers each page request with the page number, after a short delay, and records concurrency. """
+
+    def __init__(self, total_pages, delay=0.05):
+        self.total_pages = total_pages
+        self.delay = delay
+        self.active = 0
+        self.most_active = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.most_active = max(self.most_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = {
+            '_embedded': {'events': [{'id': params['page']}]},
+            'page': {'totalPages': self.total_pages},
+        }
+        return response
+
+
+class TicketmasterClientTests(SimpleTestCase):
+
+    def test_pages_yielded_in_order(self):
+        session = FakeSession(total_pages=5, delay=0)
+        client = TicketmasterClient('key', workers=3, session=session, scheduler=unthrottled)
+        pages = list(client.fetch_pages('events', {}))
+        self.assertEqual(pages, [[{'id': 0}], [{'id': 1}], [{'id': 2}], [{'id': 3}], [{'id': 4}]])
+
+    def test_pages_fetched_concurrently_up_to_worker_limit(self):
+        session = FakeSession(total_pages=5)
+        list(TicketmasterClient('key', workers=2, session=session, scheduler=unthrottled).fetch_pages('events', {}))
+        self.assertEqual(session.most_active, 2)
+
+    def test_single_page_search_makes_one_request(self):
+        session = MagicMock()
+        session.get.return_value = MagicMock(status_code=200, headers={})
+        session.get.return_value.json.return_value = {'page': {'totalPages': 1}}
+        pages = list(TicketmasterClient('key', session=session, scheduler=unthrottled).fetch_pages('venues', {}))
+        self.assertEqual(pages, [[]])
+        self.assertEqual(session.get.call_count, 1)
+
+    @override_settings(TICKETMASTER_WORKERS=7)
+    def test_shared_session_is_reused_and_pooled(self):
+        ticketmaster_client._session = None
+        session = shared_session()
+        self.assertIs(session, shared_session())
+        self.assertEqual(session.get_adapter('https://app.ticketmaster.com/')._pool_maxsize, 7)
+        ticketmaster_client._session = None
+
+
+class ConditionalSession:
+    """ Serves one page of events with an ETag, and answers 304 when the request revalidates that ETag. """
+
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, params, headers, **kwargs):
+        self.requests.append(headers)
+        if headers.get('If-None-Match') == '"v1"':
+            return MagicMock(status_code=304, headers={})
+
+        body = {'_embedded': {'events': [{'id': '1'}]}, 'page': {'totalPages': 1}}
+        response = MagicMock(status_code=200, headers={'ETag': '"v1"'}, content=json.dumps(body).encode())
+        response.json.return_value = body
+        return response
+
+
+class ResponseCacheTests(SimpleTestCase):
+    # save_validators waits for the current transaction to commit, so the tests use the database, in autocommit.
+    databases = {'default'}
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.directory.name, max_bytes=1000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_unchanged_page_revalidated_and_skipped(self):
+        session = ConditionalSession()
+        client = TicketmasterClient('key', session=session, cache=self.cache, scheduler=unthrottled)
+
+        self.assertEqual(list(client.fetch_pages('events', {}, 'events')), [[{'id': '1'}]])
+        client.save_validators()
+        self.assertEqual(list(client.fetch_pages('events', {}, 'events')), [])
+        self.assertEqual(session.requests, [{}, {'If-None-Match': '"v1"'}])
+
+    def test_pages_not_cached_until_saved(self):
+        session = ConditionalSession()
+        client = TicketmasterClient('key', session=session, cache=self.cache, scheduler=unthrottled)
+
+        list(client.fetch_pages('events', {}, 'events'))
+        # The sync failed before saving, so the page is read again.
+        self.assertEqual(list(client.fetch_pages('events', {}, 'events')), [[{'id': '1'}]])
+        self.assertEqual(session.requests, [{}, {}])
+
+    def test_each_sync_revalidates_its_own_pages(self):
+        session = ConditionalSession()
+        client = TicketmasterClient('key', session=session, cache=self.cache, scheduler=unthrottled)
+
+        list(client.fetch_pages('events', {}, 'artist'))
+        client.save_validators()
+        self.assertEqual(list(client.fetch_pages('events', {}, 'show')), [[{'id': '1'}]])
+        self.assertEqual(session.requests, [{}, {}])
+
+    def test_full_fetch_not_revalidated(self):
+        session = ConditionalSession()
+        client = TicketmasterClient('key', session=session, cache=self.cache, scheduler=unthrottled)
+
+        list(client.fetch_pages('events', {}, 'events'))
+        client.save_validators()
+        self.assertEqual(list(client.fetch_pages('events', {}, 'events', full=True)), [[{'id': '1'}]])
+        self.assertEqual(session.requests, [{}, {}])
+
+    def test_response_without_validators_not_cached(self):
+        response = MagicMock(headers={}, content=b'{}')
+        self.cache.store('key', 'url', response, 1)
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_api_key_not_part_of_cache_key(self):
+        key = ResponseCache.key
+        self.assertEqual(key('url', {'page': 0, 'apikey': 'a'}), key('url', {'page': 0, 'apikey': 'b'}))
+        self.assertNotEqual(key('url', {'page': 0}), key('url', {'page': 1}))
+        self.assertNotEqual(key('url', {'page': 0}, 'artist'), key('url', {'page': 0}, 'show'))
+
+    def test_least_recently_used_evicted_over_max_bytes(self):
+        for n in range(3):
+            self.cache.store(f'key{n}', 'url', MagicMock(headers={'ETag': str(n)}, content=b'x' * 400), 1)
+            # Make each entry's last use distinct, oldest first.
+            os.utime(self.cache.body_path(f'key{n}'), (n, n))
+            if n == 1:
+                self.cache.touch('key0')
+
+        self.assertCountEqual([key for key, _, _, _ in self.cache.entries()], ['key0', 'key2'])
+        self.assertLessEqual(self.cache.total_size(), 1000)
+
+    def test_cache_command_info_and_clear(self):
+        response = MagicMock(headers={'ETag': '"v1"'}, content=b'{}')
+        self.cache.store('key', 'https://example.com/events.json', response, 1)
+
+        with override_settings(TICKETMASTER_CACHE_DIR=self.directory.name):
+            out = StringIO()
+            call_command('ticketmaster_cache', 'list', stdout=out)
+            self.assertIn('https://example.com/events.json', out.getvalue())
+            self.assertIn('1 cached responses, 2 of', out.getvalue())
+
+            out = StringIO()
+            call_command('ticketmaster_cache', 'clear', stdout=out)
+            self.assertIn('Removed 1 cached responses.', out.getvalue())
+
+        self.assertEqual(self.cache.entries(), [])
+
+
+class FakeClock:
+    """ A clock that only moves when something sleeps. """
+
+    def __init__(self):
+        self.now = 0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def response(status_code, headers=None):
+    return MagicMock(status_code=status_code, headers=headers or {})
+
+
+class RateLimitTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def scheduler(self, rate=5, max_retries=3):
+        return RequestScheduler(rate, max_retries, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_bucket_allows_burst_then_spaces_requests_at_rate(self):
+        bucket = TokenBucket(rate=5, capacity=5, clock=self.clock, sleep=self.clock.sleep)
+        for _ in range(10):
+            bucket.acquire()
+        self.assertAlmostEqual(self.clock.now, 1.0)
+
+    def test_transient_failures_retried_with_growing_backoff(self):
+        responses = iter([response(503), response(500), response(200)])
+        scheduler = self.scheduler()
+
+        with patch('random.uniform', side_effect=lambda low, high: high):
+            result = scheduler.send(lambda: next(responses))
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(scheduler.retries, 2)
+        self.assertEqual(self.clock.sleeps, [0.5, 1.0])
+
+    def test_retried_responses_closed(self):
+        failed, succeeded = response(503), response(200)
+        responses = iter([failed, succeeded])
+        self.scheduler().send(lambda: next(responses))
+        failed.close.assert_called_once_with()
+        succeeded.close.assert_not_called()
+
+    def test_retry_after_respected(self):
+        responses = iter([response(429, {'Retry-After': '7'}), response(200)])
+        self.scheduler().send(lambda: next(responses))
+        self.assertEqual(self.clock.sleeps, [7])
+
+    def test_connection_errors_retried(self):
+        attempts = iter([requests.ConnectionError('reset'), response(200)])
+
+        def request():
+            attempt = next(attempts)
+            if isinstance(attempt, Exception):
+                raise attempt
+            return attempt
+
+        self.assertEqual(self.scheduler().send(request).status_code, 200)
+
+    def test_gives_up_after_max_retries(self):
+        scheduler = self.scheduler(max_retries=2)
+        result = scheduler.send(lambda: response(503))
+        self.assertEqual(result.status_code, 503)
+        self.assertEqual(scheduler.retries, 2)
+
+    def test_client_errors_not_retried(self):
+        scheduler = self.scheduler()
+        self.assertEqual(scheduler.send(lambda: response(401)).status_code, 401)
+        self.assertEqual(scheduler.retries, 0)
+
+    def test_used_up_quota_pauses_requests_until_reset(self):
+        scheduler = self.scheduler()
+        reset = int((time.time() + 60) * 1000)
+        scheduler.send(lambda: response(200, {'Rate-Limit-Available': '0', 'Rate-Limit-Reset': str(reset)}))
+        scheduler.send(lambda: response(200))
+        self.assertAlmostEqual(sum(self.clock.sleeps), 60, delta=1)
+
+    def test_bad_quota_reset_header_ignored(self):
+        scheduler = self.scheduler()
+        result = scheduler.send(lambda: response(200, {'Rate-Limit-Available': '0', 'Rate-Limit-Reset': 'soon'}))
+        self.assertEqual(result.status_code, 200)
+        scheduler.send(lambda: response(200))
+        self.assertEqual(self.clock.sleeps, [])
+
+
+class EventSourceTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_recorded_pages_replayed_in_order(self):
+        class ListSource:
+            def pages(self, resource, query, sync=None, full=False):
+                return iter([[{'id': n}] for n in range(12)])
+
+        recorded = list(RecordingSource(ListSource(), self.directory.name).pages('events', {'dmaId': '1'}))
+        replayed = list(ReplaySource(self.directory.name).pages('events', {'dmaId': '1'}))
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(list(ReplaySource(self.directory.name).pages('venues', {'dmaId': '1'})), [])
+
+    def test_each_market_recorded_and_replayed_on_its_own(self):
+        class MarketSource:
+            def pages(self, resource, query, sync=None, full=False):
+                return iter([[{'id': f'{query["dmaId"]}-{n}'}] for n in range(3)])
+
+        recording = RecordingSource(MarketSource(), self.directory.name)
+        minneapolis = list(recording.pages('events', {'dmaId': '336'}))
+        chicago = list(recording.pages('events', {'dmaId': '249'}))
+
+        replay = ReplaySource(self.directory.name)
+        # A later delta sync of the market, asking only for events published since, replays the same pages.
+        self.assertEqual(list(replay.pages('events', {'dmaId': '336', published_since_filter: '2023-05-01T00:00:00Z'})),
+                         minneapolis)
+        self.assertEqual(list(replay.pages('events', {'dmaId': '249'})), chicago)
+        self.assertEqual(list(replay.pages('events', {'dmaId': '602'})), [])
+
+
+@override_settings(TICKETMASTER_CACHE_DIR='', TICKETMASTER_MAX_RESULTS=100000)
+class StandInServerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = StandInServer(event_count=450, artist_count=10, venue_count=5)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_client_pages_through_synthetic_events(self):
+        with override_settings(TICKETMASTER_BASE_URL=self.server.base_url):
+            client = TicketmasterClient('key', session=requests.Session(), scheduler=unthrottled)
+            pages = list(client.fetch_pages('events', {}))
+
+        events = [event for page in pages for event in page]
+        self.assertEqual([len(page) for page in pages], [200, 200, 50])
+        self.assertEqual(len({event['id'] for event in events}), 450)
+        self.assertEqual(events[13]['_embedded']['attractions'][0]['name'], 'Artist 3')
+
+    def test_client_streams_synthetic_events(self):
+        with override_settings(TICKETMASTER_BASE_URL=self.server.base_url):
+            client = TicketmasterClient('key', session=requests.Session(), scheduler=unthrottled)
+            events = list(client.stream_results('events', {}))
+
+        self.assertEqual([event['id'] for event in events], [f'E{n}' for n in range(450)])
+
+    def test_venues_served(self):
+        response = requests.get(self.server.base_url + 'venues.json', params={'size': 200})
+        self.assertEqual(len(response.json()['_embedded']['venues']), 5)
+
+    def test_unknown_resource_is_404(self):
+        self.assertEqual(requests.get(self.server.base_url + 'attractions.json').status_code, 404)
+
+
+def chunked(text, size):
+    data = text.encode()
+    return (data[start:start + size] for start in range(0, len(data), size))
+
+
+class StreamingPageParserTests(SimpleTestCase):
+
+    page = {
+        '_links': {'self': {'href': '/events.json?page=0'}},
+        '_embedded': {'events': [{'id': n, 'name': f'Caf\u00e9 "{n}" ]}}', 'price': 12.5 * n} for n in range(5)]},
+        'page': {'size': 5, 'totalElements': 12345, 'totalPages': 2469},
+    }
+
+    def test_results_parsed_however_the_response_is_split(self):
+        text = json.dumps(self.page, indent=2, ensure_ascii=False)
+        for size in (1, 2, 3, 7, 64, len(text) * 2):
+            parser = StreamingPageParser(chunked(text, size), 'events')
+            self.assertEqual(list(parser.items()), self.page['_embedded']['events'])
+            self.assertEqual(parser.page, self.page['page'])
+
+    def test_results_yielded_before_the_rest_of_the_response_is_read(self):
+        read = []
+
+        def chunks():
+            for chunk in chunked(json.dumps(self.page), 10):
+                read.append(chunk)
+                yield chunk
+
+        items = StreamingPageParser(chunks(), 'events').items()
+        next(items)
+        self.assertLess(sum(map(len, read)), len(json.dumps(self.page)) / 2)
+
+    def test_page_without_results(self):
+        parser = StreamingPageParser(chunked('{"page": {"totalPages": 0}}', 4), 'events')
+        self.assertEqual(list(parser.items()), [])
+        self.assertEqual(parser.page, {'totalPages': 0})
+
+    def test_truncated_response_raises(self):
+        text = json.dumps(self.page)[:-40]
+        with self.assertRaises(ValueError):
+            list(StreamingPageParser(chunked(text, 16), 'events').items())
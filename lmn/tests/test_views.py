@@ -1,4 +1,7 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
 
 from django.urls import reverse
 from django.contrib import auth
@@ -6,10 +9,12 @@ from django.contrib.auth import authenticate
 from django.dispatch import Signal
 
 import re
+from io import StringIO
 import datetime
 from datetime import timezone
 
-from lmn.models import Note, Show
+from lmn.models import Artist, Note, Show, Venue
+from lmn.tests import SharedCacheMixin
 from django.contrib.auth.models import User
 
 
@@ -25,6 +30,10 @@ class TestEmptyViews(TestCase):
 
     """ Main views - the ones in the navigation menu """
 
+    def setUp(self):
+        # The latest notes feed could be cached by an earlier test
+        cache.clear()
+
     def test_with_no_artists_returns_empty_list(self):
         response = self.client.get(reverse('artist_list'))
         self.assertFalse(response.context['artists'])  # An empty list is false
@@ -203,6 +212,114 @@ class TestArtistViews(TestCase):
         self.assertEqual(len(artists_on_page), 3)
 
 
+class TestKeysetPagination(TestCase):
+
+    def setUp(self):
+        # 45 artists, 3 pages of 20. Zero padded so name order is number order.
+        Artist.objects.bulk_create(Artist(name=f'Artist {number:02}') for number in range(45))
+
+    def names(self, response):
+        return [artist.name for artist in response.context['artists']]
+
+    def test_next_cursors_walk_every_artist_in_name_order(self):
+        url = reverse('artist_list')
+        seen = []
+        response = self.client.get(url)
+        while True:
+            seen += self.names(response)
+            page = response.context['artists']
+            if not page.has_next:
+                break
+            response = self.client.get(url, {'cursor': page.next_cursor})
+
+        self.assertEqual([f'Artist {number:02}' for number in range(45)], seen)
+        self.assertTrue(page.has_previous)
+
+    def test_previous_cursor_returns_to_the_page_before(self):
+        url = reverse('artist_list')
+        first = self.client.get(url)
+        second = self.client.get(url, {'cursor': first.context['artists'].next_cursor})
+        back = self.client.get(url, {'cursor': second.context['artists'].previous_cursor})
+
+        self.assertEqual(self.names(first), self.names(back))
+        self.assertFalse(back.context['artists'].has_previous)
+        self.assertTrue(back.context['artists'].has_next)
+
+    def test_last_cursor_shows_the_last_page(self):
+        url = reverse('artist_list')
+        first = self.client.get(url)
+        last = self.client.get(url, {'cursor': first.context['artists'].last_cursor})
+
+        self.assertEqual([f'Artist {number:02}' for number in range(25, 45)], self.names(last))
+        self.assertFalse(last.context['artists'].has_next)
+        self.assertTrue(last.context['artists'].has_previous)
+
+    def test_deep_page_takes_the_same_queries_as_the_first(self):
+        url = reverse('artist_list')
+        response = self.client.get(url)
+        second_page = self.client.get(url, {'cursor': response.context['artists'].next_cursor}).context['artists']
+        deep_cursor = second_page.next_cursor
+
+        # One query to count the artists, one to read the page.
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'cursor': deep_cursor})
+        self.assertEqual(5, len(response.context['artists']))
+        self.assertContains(response, '45 in total.')
+
+    @override_settings(LIST_PAGINATION_COUNT=False)
+    def test_total_count_can_be_turned_off(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('artist_list'))
+        self.assertIsNone(response.context['artists'].count)
+        self.assertNotContains(response, 'in total')
+
+    def test_invalid_cursor_shows_first_page(self):
+        for cursor in ['not a cursor', 'WyJ4IiwxLDJd', '']:
+            response = self.client.get(reverse('artist_list'), {'cursor': cursor})
+            self.assertEqual(200, response.status_code)
+            self.assertEqual('Artist 00', self.names(response)[0])
+
+    def test_cursor_from_another_list_shows_first_page(self):
+        # A name, from the artist list, where the search results expect a search rank.
+        cursor = self.client.get(reverse('artist_list')).context['artists'].next_cursor
+        response = self.client.get(reverse('artist_list'), {'search_name': 'Artist', 'cursor': cursor})
+        self.assertEqual(200, response.status_code)
+        self.assertFalse(response.context['artists'].has_previous)
+        self.assertEqual(20, len(response.context['artists']))
+
+    def test_cursors_keep_the_search(self):
+        response = self.client.get(reverse('artist_list'), {'search_name': 'Artist 1'})
+        # Names with both words, Artist 01, Artist 10 to Artist 19, Artist 21, Artist 31 and Artist 41
+        self.assertEqual(14, len(response.context['artists']))
+        self.assertFalse(response.context['artists'].has_other_pages())
+
+        response = self.client.get(reverse('artist_list'), {'search_name': 'Artist'})
+        self.assertContains(response, f'cursor={response.context["artists"].next_cursor}&search_name=Artist')
+
+    def test_venue_list_pages_by_cursor(self):
+        Venue.objects.bulk_create(
+            Venue(name=f'Venue {number:02}', city='Minneapolis', state='MN') for number in range(15)
+        )
+        response = self.client.get(reverse('venue_list'))
+        self.assertEqual(10, len(response.context['venues']))
+
+        response = self.client.get(reverse('venue_list'), {'cursor': response.context['venues'].next_cursor})
+        names = [venue.name for venue in response.context['venues']]
+        self.assertEqual([f'Venue {number:02}' for number in range(10, 15)], names)
+
+    @override_settings(LIST_PAGINATION='numbered')
+    def test_numbered_pages_link_to_nearby_pages_only(self):
+        Artist.objects.bulk_create(Artist(name=f'Artist {number:03}') for number in range(100, 300))
+
+        response = self.client.get(reverse('artist_list'), {'page': 6})
+        self.assertEqual(6, response.context['artists'].number)
+        self.assertEqual(range(4, 9), response.context['artists'].nearby_pages)
+        self.assertContains(response, 'Page 6 of 13.')
+        self.assertNotContains(response, '?page=3"')
+
+
 class TestVenues(TestCase):
 
     fixtures = ['testing_venues', 'testing_artists', 'testing_shows']
@@ -433,6 +550,66 @@ class TestUserProfile(TestCase):
         response = self.client.get(reverse('user_profile', kwargs={'user_pk': 3}))
         self.assertFalse(response.context['notes'])
 
+    def add_notes_posted_together(self, count):
+        # Notes posted at the same time are ordered by pk, newest first, so none are skipped between pages.
+        show = Show.objects.get(pk=1)
+        notes = [Note.objects.create(show=show, user_id=3, title=f'Note {n}', text='Loud') for n in range(count)]
+        Note.objects.filter(user=3).update(posted_date=datetime.datetime(2020, 2, 1, tzinfo=timezone.utc))
+        return [note.pk for note in reversed(notes)]
+
+    def test_user_profile_pages_through_notes_with_cursors(self):
+        expected = self.add_notes_posted_together(45)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('user_profile', kwargs={'user_pk': 3}))
+        first_page = response.context['notes']
+        self.assertEqual(expected[:20], [note.pk for note in first_page])
+        self.assertContains(response, 'class="load-more"')
+
+        response = self.client.get(reverse('user_profile', kwargs={'user_pk': 3}), {'cursor': first_page.next_cursor})
+        second_page = response.context['notes']
+        self.assertEqual(expected[20:40], [note.pk for note in second_page])
+
+        response = self.client.get(reverse('user_profile', kwargs={'user_pk': 3}), {'cursor': second_page.next_cursor})
+        self.assertEqual(expected[40:], [note.pk for note in response.context['notes']])
+        self.assertNotContains(response, 'class="load-more"')
+
+    def test_cursor_from_another_list_shows_first_page(self):
+        expected = self.add_notes_posted_together(25)
+        Artist.objects.bulk_create(Artist(name=f'Artist {number:02}') for number in range(25))
+        artist_cursor = self.client.get(reverse('artist_list')).context['artists'].next_cursor
+
+        response = self.client.get(reverse('user_profile', kwargs={'user_pk': 3}), {'cursor': artist_cursor})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected[:20], [note.pk for note in response.context['notes']])
+
+        response = self.client.get(reverse('user_profile_notes', kwargs={'user_pk': 3}), {'cursor': artist_cursor})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(expected[:20], [note['id'] for note in response.json()['notes']])
+
+    def test_user_profile_notes_json_loads_more(self):
+        expected = self.add_notes_posted_together(25)
+        response = self.client.get(reverse('user_profile', kwargs={'user_pk': 3}))
+        url = reverse('user_profile_notes', kwargs={'user_pk': 3})
+        self.assertContains(response, f'data-load-more-url="{url}?cursor={response.context["notes"].next_cursor}"')
+
+        with self.assertNumQueries(1):
+            first = self.client.get(url).json()
+        self.assertEqual(expected[:20], [note['id'] for note in first['notes']])
+        second = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        self.assertEqual(expected[20:], [note['id'] for note in second['notes']])
+        self.assertIsNone(second['next_cursor'])
+
+        note = second['notes'][-1]
+        self.assertEqual('Note 0', note['title'])
+        self.assertEqual('REM', note['artist'])
+        self.assertEqual('The Turf Club', note['venue'])
+        self.assertEqual(reverse('note_detail', kwargs={'note_pk': note['id']}), note['url'])
+
+    def test_user_profile_notes_json_for_user_with_no_notes(self):
+        response = self.client.get(reverse('user_profile_notes', kwargs={'user_pk': 3}))
+        self.assertEqual({'notes': [], 'next_cursor': None}, response.json())
+
     def test_username_shown_on_profile_page(self):
         # A string "username's notes" is visible
         response = self.client.get(reverse('user_profile', kwargs={'user_pk': 1}))
@@ -764,6 +941,10 @@ class TestNotes(TestCase):
     # Have to add Notes and Users and Show, and also artists and venues because of foreign key constrains in Show
     fixtures = ['testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes'] 
 
+    def setUp(self):
+        # Pages of notes cached by an earlier test could be for rows with the same pks
+        cache.clear()
+
     def test_latest_notes(self):
         response = self.client.get(reverse('latest_notes'))
         # Should be note 3, then 2, then 1
@@ -906,6 +1087,266 @@ class TestNotes(TestCase):
         self.assertContains(response,'testing')
         self.assertContains(response,'Testing note created')
 
+
+class TestNotesForShowPages(SharedCacheMixin, TestCase):
+    fixtures = ['testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes']
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('notes_for_show', kwargs={'show_pk': 1})
+
+    def test_notes_for_show_pages_through_notes_with_cursors(self):
+        show = Show.objects.get(pk=1)
+        notes = [Note.objects.create(show=show, user_id=3, title=f'Note {n}', text=f'Note text {n}') for n in range(43)]
+        # Notes posted at the same time are ordered by pk, newest first
+        Note.objects.filter(show=1).update(posted_date=datetime.datetime(2020, 2, 1, tzinfo=timezone.utc))
+        cache.clear()  # update doesn't save each note, so doesn't refresh the cached pages
+        expected = [note.pk for note in reversed(notes)] + [2, 1]
+
+        first_page = self.client.get(self.url).context['notes']
+        self.assertEqual(expected[:20], [note.pk for note in first_page])
+        second_page = self.client.get(self.url, {'cursor': first_page.next_cursor}).context['notes']
+        self.assertEqual(expected[20:40], [note.pk for note in second_page])
+        response = self.client.get(self.url, {'cursor': second_page.next_cursor})
+        self.assertEqual(expected[40:], [note.pk for note in response.context['notes']])
+        self.assertNotContains(response, 'older &rsaquo;')
+
+        response = self.client.get(self.url, {'cursor': response.context['notes'].previous_cursor})
+        self.assertEqual(expected[20:40], [note.pk for note in response.context['notes']])
+
+    def test_invalid_cursors_share_the_first_page(self):
+        Artist.objects.create(name='ZZ Top')
+        artist_cursor = self.client.get(reverse('artist_list')).context['artists'].previous_cursor
+        first = self.client.get(self.url)
+        for cursor in [artist_cursor, 'not a cursor']:
+            # Served from the first page's cached page, so only the show is read.
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(first.content, response.content)
+
+    def test_cached_page_is_served_without_reading_notes(self):
+        self.client.get(self.url)
+        # Only the show is read
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'yay!')
+        self.assertContains(response, 'kinda ok')
+
+    def test_adding_editing_and_deleting_a_note_for_the_show_refreshes_its_pages(self):
+        self.client.get(self.url)
+
+        note = Note.objects.create(show_id=1, user_id=3, title='New', text='Brand new note')
+        self.assertContains(self.client.get(self.url), 'Brand new note')
+
+        note.text = 'Edited note'
+        note.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Edited note')
+        self.assertNotContains(response, 'Brand new note')
+
+        note.delete()
+        self.assertNotContains(self.client.get(self.url), 'Edited note')
+
+    def test_note_for_another_show_keeps_pages_cached(self):
+        self.client.get(self.url)
+        Note.objects.create(show_id=2, user_id=3, title='Other', text='Another show')
+        Note.objects.get(pk=3).delete()
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    @override_settings(NOTES_PAGE_CACHE_SECONDS=0)
+    def test_pages_not_cached_when_turned_off(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_pages_not_cached_in_each_process_memory(self):
+        # Another process would keep serving the pages after a note changed in this one.
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+
+# A database cache whose table was never created, with python manage.py createcachetable.
+missing_cache_table = {
+    'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'lmn_missing_cache'},
+}
+
+
+@override_settings(CACHES=missing_cache_table)
+class TestMissingCacheTable(TestCase):
+    fixtures = ['testing_users', 'testing_artists', 'testing_venues', 'testing_shows']
+
+    def test_notes_saved_and_pages_served_without_the_cache(self):
+        note_count = Show.objects.get(pk=1).note_count
+        with self.assertLogs(level='ERROR'):
+            note = Note.objects.create(show_id=1, user_id=3, title='New', text='Brand new note')
+            note.text = 'Edited note'
+            note.save()
+            self.assertContains(self.client.get(reverse('notes_for_show', kwargs={'show_pk': 1})), 'Edited note')
+            note.delete()
+        self.assertFalse(Note.objects.filter(pk=note.pk).exists())
+        self.assertEqual(Show.objects.get(pk=1).note_count, note_count)
+
+
+@override_settings(CACHES=missing_cache_table)
+class TestLatestNotesWithMissingCacheTable(TransactionTestCase):
+    # A TransactionTestCase, so the feed is changed once notes commit.
+    fixtures = ['testing_users', 'testing_artists', 'testing_venues', 'testing_shows']
+
+    def test_notes_saved_and_listed_without_the_cache(self):
+        with self.assertLogs(level='ERROR'):
+            note = Note.objects.create(show_id=1, user_id=3, title='New', text='Brand new note')
+            response = self.client.get(reverse('latest_notes'))
+            User.objects.filter(pk=3).update(username='renamed')
+            User.objects.get(pk=3).save()
+        self.assertEqual([note.pk], [feed_note.pk for feed_note in response.context['notes']])
+        self.assertContains(response, 'Brand new note')
+
+
+class TestLatestNotesFeed(SharedCacheMixin, TransactionTestCase):
+    # A TransactionTestCase, since the feed changes when notes commit.
+    fixtures = ['testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes']
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('latest_notes')
+
+    def latest_pks(self):
+        return [note.pk for note in self.client.get(self.url).context['notes']]
+
+    def test_feed_is_served_without_reading_the_database(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        show = Show.objects.get(pk=2)
+        self.assertContains(response, f'{show.artist.name} at {show.venue.name}')
+        self.assertContains(response, 'bob')
+
+    def test_adding_editing_and_deleting_notes_changes_the_feed(self):
+        self.client.get(self.url)
+
+        note = Note.objects.create(show_id=1, user_id=3, title='New', text='Brand new note')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual([note.pk, 3, 2, 1], [feed_note.pk for feed_note in response.context['notes']])
+        self.assertContains(response, 'Brand new note')
+
+        note.text = 'Edited note'
+        note.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Edited note')
+        self.assertNotContains(response, 'Brand new note')
+
+        Note.objects.get(pk=3).delete()
+        self.assertEqual([note.pk, 2, 1], self.latest_pks())
+
+    def test_feed_shows_the_20_newest_and_refills_after_deletes(self):
+        notes = [Note.objects.create(show_id=1, user_id=3, title=f'Note {n}', text='Loud') for n in range(60)]
+        self.assertEqual([note.pk for note in reversed(notes[-20:])], self.latest_pks())
+
+        for note in notes[-30:]:
+            note.delete()
+        self.assertEqual([note.pk for note in reversed(notes[10:30])], self.latest_pks())
+
+    def test_changes_are_not_in_the_feed_until_committed(self):
+        self.client.get(self.url)
+        with transaction.atomic():
+            Note.objects.create(show_id=1, user_id=3, title='New', text='Not committed')
+            self.assertNotContains(self.client.get(self.url), 'Not committed')
+        self.assertContains(self.client.get(self.url), 'Not committed')
+
+    def test_renaming_a_user_in_the_feed_forgets_the_feed(self):
+        self.client.get(self.url)
+        user = User.objects.get(pk=2)
+        user.username = 'robert'
+        user.save()
+        self.assertContains(self.client.get(self.url), 'robert')
+
+    def test_logging_in_keeps_the_feed(self):
+        self.client.get(self.url)
+        self.client.force_login(User.objects.get(pk=2))
+        with self.assertNumQueries(2):  # The session and user
+            self.client.get(self.url)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_feed_not_kept_in_each_process_memory(self):
+        self.client.get(self.url)
+        # Another process's feed wouldn't have this note.
+        Note.objects.filter(pk=3).update(title='Changed elsewhere')
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Changed elsewhere')
+
+    def test_rebuild_latest_notes_command_warms_the_feed(self):
+        out = StringIO()
+        call_command('rebuild_latest_notes', stdout=out)
+        self.assertIn('3 notes', out.getvalue())
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+
+class TestJsonApi(TestCase):
+    fixtures = ['testing_users', 'testing_artists', 'testing_venues', 'testing_shows', 'testing_notes']
+
+    def test_artist_list_pages_through_artists_by_name(self):
+        url = reverse('api_artist_list')
+        with self.assertNumQueries(1):
+            first = self.client.get(url, {'limit': 2}).json()
+        self.assertEqual(['ACDC', 'REM'], [artist['name'] for artist in first['results']])
+        self.assertIsNone(first['previous_cursor'])
+
+        second = self.client.get(url, {'limit': 2, 'cursor': first['next_cursor']}).json()
+        self.assertEqual([{'id': 3, 'name': 'Yes'}], second['results'])
+        self.assertIsNone(second['next_cursor'])
+        back = self.client.get(url, {'limit': 2, 'cursor': second['previous_cursor']}).json()
+        self.assertEqual(first['results'], back['results'])
+
+    def test_venue_detail(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_venue_detail', kwargs={'venue_pk': 2}))
+        self.assertEqual({'id': 2, 'name': 'The Turf Club', 'city': 'St. Paul', 'state': 'MN'}, response.json())
+
+    def test_detail_not_found(self):
+        for url_name, kwarg in [('api_artist_detail', 'artist_pk'), ('api_venue_detail', 'venue_pk'),
+                                ('api_show_detail', 'show_pk'), ('api_note_detail', 'note_pk')]:
+            response = self.client.get(reverse(url_name, kwargs={kwarg: 10000}))
+            self.assertEqual(404, response.status_code, url_name)
+
+    def test_show_list_most_recent_first_with_artist_and_venue(self):
+        with self.assertNumQueries(1):
+            shows = self.client.get(reverse('api_show_list')).json()['results']
+        expected = list(Show.objects.order_by('-show_date', '-id').values_list('id', flat=True))
+        self.assertEqual(expected, [show['id'] for show in shows])
+        show = Show.objects.select_related('artist', 'venue').get(pk=shows[0]['id'])
+        self.assertEqual(show.artist.name, shows[0]['artist'])
+        self.assertEqual(show.venue.name, shows[0]['venue'])
+
+    def test_show_list_for_artist(self):
+        shows = self.client.get(reverse('api_show_list'), {'artist': 1}).json()['results']
+        self.assertEqual([2, 1], [show['id'] for show in shows])
+        self.assertEqual(400, self.client.get(reverse('api_show_list'), {'artist': 'REM'}).status_code)
+
+    def test_note_list_and_detail(self):
+        notes = self.client.get(reverse('api_note_list')).json()['results']
+        self.assertEqual([3, 2, 1], [note['id'] for note in notes])
+        notes = self.client.get(reverse('api_note_list'), {'show': 1, 'user': 2}).json()['results']
+        self.assertEqual([2], [note['id'] for note in notes])
+
+        with self.assertNumQueries(1):
+            note = self.client.get(reverse('api_note_detail', kwargs={'note_pk': 2})).json()
+        self.assertEqual('yay!', note['text'])
+        self.assertEqual('bob', note['username'])
+        self.assertEqual(1, note['show_id'])
+
+    def test_cursor_from_another_list_is_a_bad_request(self):
+        artists = self.client.get(reverse('api_artist_list'), {'limit': 1}).json()
+        response = self.client.get(reverse('api_note_list'), {'cursor': artists['next_cursor']})
+        self.assertEqual(400, response.status_code)
+
+
 class TestAddingNoteForFutureShow(TestCase):
     
     fixtures = ['testing_future_note', 'testing_users']
@@ -1025,6 +1466,31 @@ class TestShowsWithMostNotesPage(TestCase):
 
         self.assertContains(response, 'Top 4 recent shows with the most notes')  # Assert that response contains the correct number displayed
 
+    def test_page_takes_the_same_queries_however_many_notes(self):
+        # Note counts are stored on each show, so the page doesn't count notes or load them
+        with self.assertNumQueries(1):
+            self.client.get(reverse('shows_with_most_notes'))
+
+        user = User.objects.get(pk=1)
+        for show in Show.objects.all():
+            for number in range(20):
+                Note.objects.create(show=show, user=user, title=f'Note {number}', text='Great')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('shows_with_most_notes'))
+        self.assertContains(response, 'Number of <a href="/notes/for_show/3/">notes</a>: 21')
+
+    def test_page_reflects_notes_added_and_deleted(self):
+        user = User.objects.get(pk=1)
+        note = Note.objects.create(show=Show.objects.get(pk=5), user=user, title='First note', text='Great')
+
+        response = self.client.get(reverse('shows_with_most_notes'))
+        self.assertEqual([3, 5, 4, 2, 1], [show.pk for show in response.context['top_5_shows']])
+
+        note.delete()
+        response = self.client.get(reverse('shows_with_most_notes'))
+        self.assertEqual([3, 4, 2, 1], [show.pk for show in response.context['top_5_shows']])
+
 
 class TestUserAuthentication(TestCase):
     """ Some aspects of registration (e.g. missing data, duplicate username) covered in test_forms """
@@ -0,0 +1,168 @@
+""" An on-disk cache of Ticketmaster responses, for conditional requests.
+
+Each cached page is stored as its raw body plus a small metadata file holding the ETag and Last-Modified
+headers Ticketmaster sent with it. Each sync has its own entries. The sync's next request for the same page
+sends them back as If-None-Match and If-Modified-Since, and a 304 Not Modified response means the page can be
+skipped without parsing it. A delta sync's published since filter moves on every run, so it isn't part of the key,
+and each run revalidates the pages of the run before.
+When the bodies grow past max_bytes, the least recently used entries are evicted. """
+
+import os
+import json
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+
+from .cursors import published_since_filter
+
+
+# Request parameters left out of cache keys. Changing the API key doesn't empty the cache.
+unkeyed_params = ('apikey', published_since_filter)
+
+
+class ResponseCache:
+    """ Cached Ticketmaster response bodies and their validators, in one directory. """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """ The cache configured by TICKETMASTER_CACHE_DIR and TICKETMASTER_CACHE_MAX_BYTES,
+        or None if caching is off. """
+        if not settings.TICKETMASTER_CACHE_DIR:
+            return None
+        return cls(settings.TICKETMASTER_CACHE_DIR, settings.TICKETMASTER_CACHE_MAX_BYTES)
+
+    @staticmethod
+    def key(url, params, sync=None):
+        """ The cache key for a request made by sync, without the unkeyed_params. """
+        kept = sorted((name, str(value)) for name, value in params.items() if name not in unkeyed_params)
+        request = json.dumps([sync, url, kept])
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def body_path(self, key):
+        return os.path.join(self.directory, f'{key}.body')
+
+    def meta_path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        """ The metadata stored for key, or None if it isn't cached. """
+        try:
+            with open(self.meta_path(key)) as meta_file:
+                return json.load(meta_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def validators(self, meta):
+        """ The conditional request headers for a cached entry's metadata. """
+        headers = {}
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def touch(self, key):
+        """ Marks an entry as just used, so it is evicted last. """
+        try:
+            os.utime(self.body_path(key))
+        except FileNotFoundError:
+            pass
+
+    def read_body(self, key):
+        """ The cached response body for key, as bytes. """
+        with open(self.body_path(key), 'rb') as body_file:
+            return body_file.read()
+
+    def store(self, key, url, response, total_pages):
+        """
+        Caches a response, if Ticketmaster sent an ETag or Last-Modified header
+        that a later request can revalidate with.
+
+        Args:
+            key (str): The request's cache key.
+            url (str): The request URL, kept for inspecting the cache.
+            response: The requests.Response.
+            total_pages (int): The page count the response reported,
+                so a 304 for this page can be handled without the body.
+        """
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'total_pages': total_pages,
+            'size': len(response.content),
+            'stored': time.time(),
+        }
+
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.body_path(key), 'wb') as body_file:
+                body_file.write(response.content)
+            with open(self.meta_path(key), 'w') as meta_file:
+                json.dump(meta, meta_file)
+            self.evict()
+
+    def entries(self):
+        """
+        The cached entries, least recently used first.
+
+        Returns:
+            list: (key, metadata, size in bytes, last used time) for each entry.
+        """
+
+        if not os.path.isdir(self.directory):
+            return []
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.body'):
+                continue
+            key = name[:-len('.body')]
+            try:
+                stat = os.stat(self.body_path(key))
+            except FileNotFoundError:
+                continue
+            entries.append((key, self.get(key) or {}, stat.st_size, stat.st_mtime))
+
+        return sorted(entries, key=lambda entry: entry[3])
+
+    def total_size(self):
+        return sum(size for _, _, size, _ in self.entries())
+
+    def remove(self, key):
+        for path in (self.body_path(key), self.meta_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """ Removes the least recently used entries until the cached bodies fit in max_bytes. """
+        entries = self.entries()
+        total = sum(size for _, _, size, _ in entries)
+
+        for key, _, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(key)
+            total -= size
+
+    def clear(self):
+        """ Removes every entry. Returns the number removed. """
+        entries = self.entries()
+        for key, _, _, _ in entries:
+            self.remove(key)
+        return len(entries)
@@ -0,0 +1,236 @@
+""" Client for the Ticketmaster Discovery API.
+
+All requests share one pooled requests.Session, so syncs reuse TCP/TLS connections,
+and the pages of a search after the first are fetched concurrently on a bounded thread pool.
+Pages are revalidated against the response cache, and pages Ticketmaster reports as unchanged are skipped.
+Each sync keeps its own cached pages, and a page is only cached once the sync's writes have committed,
+see save_validators.
+Every request goes through the rate limiting request scheduler.
+
+With TICKETMASTER_STREAMING, stream_results reads each page as it downloads instead, see stream.py. """
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.db import transaction
+
+from . import stats
+from .cache import ResponseCache
+from .cursors import published_since_filter
+from .ratelimit import shared_scheduler
+from .stream import StreamingPageParser
+
+
+# The largest page size Ticketmaster allows.
+page_size = 200
+# Seconds to wait for Ticketmaster to respond before giving up on a request.
+timeout = 30
+# Bytes read from a streamed response at a time.
+stream_chunk_size = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def shared_session():
+    """ The process-wide Session, created on first use with a connection pool sized for the fetch workers. """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.TICKETMASTER_WORKERS)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+
+    return _session
+
+
+class TicketmasterClient:
+    """ Fetches pages of search results from the Ticketmaster Discovery API. """
+
+    def __init__(self, api_key, workers=None, session=None, cache=None, scheduler=None):
+        self.api_key = api_key
+        self.workers = workers or settings.TICKETMASTER_WORKERS
+        self.session = session or shared_session()
+        self.cache = cache or ResponseCache.from_settings()
+        self.scheduler = scheduler or shared_scheduler()
+        # The responses of the last fetch_pages, to cache once the sync has written their rows.
+        self.pending = []
+
+    def get_page(self, resource, query, page, sync=None, full=False, pending=None):
+        """
+        Requests one page of a search, conditionally if the page is in the response cache.
+
+        Args:
+            sync (str): The sync reading the page. Syncs sending the same query keep separate cached pages,
+                since a page one sync has written is still new to another.
+            full (bool): Request the page unconditionally, as a full sync rereads every page.
+            pending (list): Where to add the response for save_validators to cache, instead of caching it now.
+
+        Returns:
+            tuple: The number of pages in the search, and the decoded JSON response,
+            or None in place of the response if the page hasn't changed since it was cached.
+        """
+
+        url = '{}{}.json'.format(settings.TICKETMASTER_BASE_URL, resource)
+        params = dict(query, page=page, size=page_size, apikey=self.api_key)
+
+        cache_key = meta = None
+        headers = {}
+        if self.cache:
+            cache_key = self.cache.key(url, params, sync)
+            if not full:
+                meta = self.cache.get(cache_key)
+                headers = self.cache.validators(meta)
+                if published_since_filter in query:
+                    # The cached page is from the run before, with an earlier filter. Its ETag still says whether
+                    # this page's content is the same, but events published since may be dated before its Last-Modified.
+                    headers.pop('If-Modified-Since', None)
+
+        run_stats = stats.current()
+        with run_stats.stage('fetch', rows=1):
+            response = self.scheduler.send(
+                lambda: self.session.get(url, params=params, headers=headers, timeout=timeout)
+            )
+            run_stats.count('bytes_downloaded', len(response.content))
+
+        # 304 Not Modified. The cached metadata has the page count, so the body doesn't need to be read or parsed.
+        if response.status_code == 304 and meta:
+            self.cache.touch(cache_key)
+            return meta['total_pages'], None
+
+        # Raise an exception if the response status code is not 200 OK.
+        response.raise_for_status()
+        with run_stats.stage('decode'):
+            data = response.json()
+        run_stats.add('decode', rows=len(embedded_results(data, resource)))
+        total_pages = data.get('page', {}).get('totalPages', 0)
+
+        if self.cache:
+            if pending is None:
+                self.cache.store(cache_key, url, response, total_pages)
+            else:
+                pending.append((cache_key, url, response, total_pages))
+
+        return total_pages, data
+
+    def fetch_pages(self, resource, query, sync=None, full=False):
+        """
+        Pages through a search. The first page is fetched on its own to learn the page count,
+        then the rest are fetched concurrently, at most self.workers at a time.
+
+        Args:
+            resource (str): The resource to search, for example 'events' or 'venues'.
+            query (dict): The search query parameters.
+            sync (str): The sync reading the pages, which has its own cached pages.
+            full (bool): Request every page unconditionally.
+
+        Yields:
+            list: The results embedded in each page, in page order. Pages that haven't changed since the sync cached
+            them are left out, since everything in them has already been saved.
+            The pages read are cached by save_validators.
+        """
+
+        self.pending = pending = []
+        total_pages, first = self.get_page(resource, query, 0, sync, full, pending)
+        if first is not None:
+            yield embedded_results(first, resource)
+
+        total_pages = min(total_pages, settings.TICKETMASTER_MAX_RESULTS // page_size)
+        if total_pages <= 1:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pages = pool.map(
+                lambda page: self.get_page(resource, query, page, sync, full, pending), range(1, total_pages)
+            )
+            for _, data in pages:
+                if data is not None:
+                    yield embedded_results(data, resource)
+
+    def save_validators(self):
+        """ Caches the pages read by the last fetch_pages, once the current transaction commits. A sync calls this
+        after writing the pages' rows, so if its writes fail or roll back, its next run rereads those pages
+        rather than being told they haven't changed. """
+        pending, self.pending = self.pending, []
+        if self.cache and pending:
+            transaction.on_commit(lambda: self.store(pending))
+
+    def store(self, pending):
+        for cache_key, url, response, total_pages in pending:
+            self.cache.store(cache_key, url, response, total_pages)
+
+    def stream_results(self, resource, query):
+        """
+        Pages through a search one page after another, parsing each page as it downloads,
+        so only one result at a time is held in memory rather than whole pages.
+
+        Streamed pages are not cached, since the cache stores whole response bodies.
+
+        Yields:
+            dict: Each result in the search, in page order.
+        """
+
+        url = '{}{}.json'.format(settings.TICKETMASTER_BASE_URL, resource)
+        max_pages = settings.TICKETMASTER_MAX_RESULTS // page_size
+        page = 0
+        total_pages = 1
+
+        run_stats = stats.current()
+
+        while page < min(total_pages, max_pages):
+            params = dict(query, page=page, size=page_size, apikey=self.api_key)
+            with run_stats.stage('fetch', rows=1):
+                response = self.scheduler.send(
+                    lambda: self.session.get(url, params=params, timeout=timeout, stream=True)
+                )
+
+            try:
+                response.raise_for_status()
+                chunks = timed_chunks(response.iter_content(chunk_size=stream_chunk_size), run_stats)
+                parser = StreamingPageParser(chunks, resource)
+                yield from timed_items(parser.items(), run_stats)
+            finally:
+                response.close()
+
+            # Ticketmaster sends the page count after the results.
+            total_pages = parser.page.get('totalPages', 0)
+            page += 1
+
+
+def timed_chunks(chunks, run_stats):
+    """ Passes on the chunks of a streamed response, counting the time spent waiting for them as fetch time. """
+    chunks = iter(chunks)
+    while True:
+        with run_stats.stage('fetch'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        run_stats.count('bytes_downloaded', len(chunk))
+        yield chunk
+
+
+def timed_items(items, run_stats):
+    """ Passes on the results of a streamed page,
+    counting the time spent parsing them, less fetch time, as decode time. """
+    end = object()
+    while True:
+        started = time.perf_counter()
+        fetch_started = run_stats.seconds['fetch']
+        item = next(items, end)
+        fetch_seconds = run_stats.seconds['fetch'] - fetch_started
+        run_stats.add('decode', time.perf_counter() - started - fetch_seconds, rows=0 if item is end else 1)
+        if item is end:
+            return
+        yield item
+
+
+def embedded_results(data, resource):
+    """ The results in one page of a response. A page with no results has no '_embedded' key at all. """
+    return data.get('_embedded', {}).get(resource, [])
@@ -0,0 +1,280 @@
+""" Writes Ticketmaster data to the database as batched, idempotent upserts.
+
+Each model is matched on its natural key (Artist and Venue on name, Show on artist, venue and show_date),
+so re-running a sync inserts only rows that are new and updates only rows whose data changed.
+Whether a row changed is decided by comparing a short hash of its synced fields with the hash stored in the row's
+content_hash column, so unchanged rows are neither loaded in full nor written. """
+
+import hashlib
+import logging
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+from django.db import IntegrityError, transaction
+from django.utils.dateparse import parse_datetime
+
+from ..models import Artist, Venue, Show
+from . import stats
+
+
+# Number of rows written per database transaction.
+batch_size = 500
+
+# Held around every write transaction. Market syncs running in several processes on SQLite, which allows only one
+# writer at a time, replace it with a lock shared between the processes, see markets.py.
+write_lock = nullcontext()
+
+
+def upsert(model, objects, key_fields, update_fields=()):
+    """
+    Inserts or updates unsaved model instances, one transaction per batch_size objects.
+
+    Args:
+        model: The model class.
+        objects (list): Unsaved instances of model.
+        key_fields (tuple): The fields that together identify a row,
+            using attnames such as 'artist_id' for foreign keys.
+        update_fields (tuple): The fields to bring up to date on rows that already exist.
+
+    Returns:
+        tuple: The number of rows created, the number of rows updated, and the number of rows left unchanged.
+    """
+
+    created = updated = unchanged = 0
+
+    for start in range(0, len(objects), batch_size):
+        with write_lock, transaction.atomic():
+            batch_counts = _upsert_batch(model, objects[start:start + batch_size], key_fields, update_fields)
+        created += batch_counts[0]
+        updated += batch_counts[1]
+        unchanged += batch_counts[2]
+
+    return created, updated, unchanged
+
+
+def _upsert_batch(model, objects, key_fields, update_fields):
+    """ Upserts one batch in the current transaction. If a key appears more than once, the last object wins. """
+
+    by_key = {}
+    for obj in objects:
+        obj.content_hash = content_hash(obj, key_fields + tuple(update_fields))
+        by_key[tuple(getattr(obj, field) for field in key_fields)] = obj
+
+    # One query finds the primary key and hash of every existing row that could match. With a composite key
+    # this can return a few rows that only match on some of the key fields, so the exact match is made on the full key.
+    lookup = {f'{field}__in': {key[i] for key in by_key} for i, field in enumerate(key_fields)}
+    run_stats = stats.current()
+    conflict = found = None
+    while True:
+        with run_stats.stage('lookup'):
+            rows = model.objects.filter(**lookup).values_list(*key_fields, 'pk', 'content_hash')
+            existing = {tuple(row[:-2]): row[-2:] for row in rows}
+        run_stats.add('lookup', rows=len(existing))
+
+        if conflict is not None and len(existing) == found:
+            # No other sync inserted any of these rows, so the insert failed for some other reason.
+            raise conflict
+        found = len(existing)
+
+        new_rows = []
+        changed_rows = []
+
+        for key, obj in by_key.items():
+            row = existing.get(key)
+            if row is None:
+                new_rows.append(obj)
+            elif row[1] != obj.content_hash:
+                obj.pk = row[0]
+                changed_rows.append(obj)
+
+        with run_stats.stage('write', rows=len(new_rows) + len(changed_rows)):
+            try:
+                # A savepoint, so a failed insert leaves the batch's transaction usable.
+                with transaction.atomic():
+                    model.objects.bulk_create(new_rows)
+            except IntegrityError as e:
+                # A concurrent sync inserted some of the same rows between the lookup and the insert. Looking the
+                # batch up again makes those rows updates, or unchanged, so only rows inserted here count as created.
+                conflict = e
+                continue
+            if changed_rows:
+                model.objects.bulk_update(changed_rows, tuple(update_fields) + ('content_hash',))
+        break
+
+    unchanged = len(by_key) - len(new_rows) - len(changed_rows)
+    run_stats.count('created', len(new_rows))
+    run_stats.count('updated', len(changed_rows))
+    run_stats.count('unchanged', unchanged)
+    return len(new_rows), len(changed_rows), unchanged
+
+
+def content_hash(obj, fields):
+    """ A 16 character hash of the values of fields on obj. Datetimes are hashed in UTC, as they are stored. """
+    values = []
+    for field in fields:
+        value = getattr(obj, field)
+        if isinstance(value, datetime):
+            value = value.astimezone(timezone.utc).isoformat()
+        values.append(str(value))
+
+    return hashlib.blake2b('\x1f'.join(values).encode(), digest_size=8).hexdigest()
+
+
+def pks_by_name(model, names):
+    """
+    Maps names to primary keys for the rows of model with those names, one query per batch_size names.
+
+    Returns:
+        dict: name to primary key, for every name that is in the table.
+    """
+
+    names = list(names)
+    pks = {}
+
+    with stats.current().stage('lookup'):
+        for start in range(0, len(names), batch_size):
+            pks.update(model.objects.filter(name__in=names[start:start + batch_size]).values_list('name', 'pk'))
+    stats.current().add('lookup', rows=len(pks))
+
+    return pks
+
+
+def build_venue(venue):
+    """
+    Builds an unsaved Venue from a Ticketmaster venue, either from the venue search or embedded in an event.
+    Venue.state holds a two letter code, so the state code is used when Ticketmaster provides one.
+    """
+
+    state = venue['state']
+    return Venue(name=venue['name'], city=venue['city']['name'], state=state.get('stateCode') or state['name'])
+
+
+def parse_event(result):
+    """
+    Pulls the artist, venue and start time out of one Ticketmaster event.
+
+    Returns:
+        tuple: The artist name, an unsaved Venue, and the show datetime,
+        or None if the event is missing any of them and should be skipped.
+    """
+
+    try:
+        artist_name = result['_embedded']['attractions'][0]['name']
+        venue = build_venue(result['_embedded']['venues'][0])
+    except (KeyError, IndexError) as e:
+        logging.warning(f"Event {result.get('id')} has no artist or venue ({e}). Skipping this event.")
+        return None
+
+    try:
+        show_date = parse_datetime(result['dates']['start']['dateTime'])
+    except KeyError:
+        logging.warning(f"No 'dateTime' key found in the 'start' key of the 'dates' dictionary "
+                        f"for event {result.get('id')}. Skipping this event.")
+        return None
+
+    return artist_name, venue, show_date
+
+
+def build_shows(results):
+    """
+    Builds unsaved Show objects from one page of Ticketmaster events, for artists and venues already in the database.
+
+    The page's artist and venue primary keys are loaded up front with one query per model,
+    so each event is matched with dictionary lookups instead of its own queries.
+    Events without a start time, or whose artist or venue is not in the database, are skipped.
+    """
+
+    run_stats = stats.current()
+    with run_stats.stage('transform'):
+        events = [event for event in map(parse_event, results) if event is not None]
+
+    artist_pks = pks_by_name(Artist, {artist_name for artist_name, _, _ in events})
+    venue_pks = pks_by_name(Venue, {venue.name for _, venue, _ in events})
+
+    shows = []
+
+    with run_stats.stage('transform'):
+        for artist_name, venue, show_date in events:
+            if artist_name not in artist_pks:
+                logging.warning(f"Artist '{artist_name}' does not exist in the database.")
+                continue
+
+            if venue.name not in venue_pks:
+                logging.warning(f"Venue '{venue.name}' does not exist in the database.")
+                continue
+
+            shows.append(Show(show_date=show_date, artist_id=artist_pks[artist_name], venue_id=venue_pks[venue.name]))
+    run_stats.add('transform', rows=len(shows))
+
+    return shows
+
+
+def sync_events(pages):
+    """
+    Ingests artists, venues and shows together from one pass over Ticketmaster event pages.
+
+    The distinct artists and venues are upserted first, then their primary keys are looked up by name
+    and the shows are upserted with them, all in a single transaction.
+
+    Args:
+        pages: An iterable of lists of Ticketmaster events, such as TicketmasterClient.fetch_pages('events', query).
+
+    Returns:
+        dict: For each of 'artists', 'venues' and 'shows', a tuple of the rows created, updated and left unchanged.
+    """
+
+    artist_names = set()
+    venues = {}
+    shows = set()
+
+    run_stats = stats.current()
+
+    for results in pages:
+        with run_stats.stage('transform'):
+            for result in results:
+                event = parse_event(result)
+                if event is None:
+                    continue
+
+                artist_name, venue, show_date = event
+                artist_names.add(artist_name)
+                venues[venue.name] = venue
+                shows.add((artist_name, venue.name, show_date))
+
+    run_stats.add('transform', rows=len(artist_names) + len(venues))
+
+    with write_lock, transaction.atomic():
+        counts = {
+            'artists': upsert(Artist, [Artist(name=name) for name in artist_names], key_fields=('name',)),
+            'venues': upsert(Venue, list(venues.values()), key_fields=('name',), update_fields=('city', 'state')),
+        }
+
+        artist_pks = pks_by_name(Artist, artist_names)
+        venue_pks = pks_by_name(Venue, venues)
+        with run_stats.stage('transform', rows=len(shows)):
+            show_rows = [
+                Show(artist_id=artist_pks[artist_name], venue_id=venue_pks[venue_name], show_date=show_date)
+                for artist_name, venue_name, show_date in shows
+            ]
+        counts['shows'] = upsert(Show, show_rows, key_fields=('artist_id', 'venue_id', 'show_date'))
+
+    return counts
+
+
+def sync_events_in_batches(pages):
+    """
+    Ingests artists, venues and shows like sync_events, but writes each page in its own transaction,
+    so memory use depends on the page size rather than the size of the whole sync.
+    Used with StreamingApiSource, whose pages are batches of at most batch_size events.
+
+    Returns:
+        dict: For each of 'artists', 'venues' and 'shows', a tuple of the rows created, updated and left unchanged.
+    """
+
+    totals = {'artists': (0, 0, 0), 'venues': (0, 0, 0), 'shows': (0, 0, 0)}
+
+    for results in pages:
+        for model, counts in sync_events([results]).items():
+            totals[model] = tuple(total + count for total, count in zip(totals[model], counts))
+
+    return totals
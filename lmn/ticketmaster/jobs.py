@@ -0,0 +1,94 @@
+""" A small database-backed queue of Ticketmaster syncs.
+
+The sync URLs only add a SyncJob to the queue. A worker process, started with
+python manage.py sync_worker
+claims queued jobs one at a time, oldest first, and runs them. """
+
+import time
+import logging
+
+from django.utils import timezone
+
+from ..models import SyncJob
+from .markets import run_sync
+from .sync import syncs
+
+
+def enqueue(endpoint, full=False):
+    """ Queues a sync of endpoint, one of the keys of sync.syncs. """
+    if endpoint not in syncs:
+        raise ValueError(f'Unknown sync endpoint {endpoint}')
+    return SyncJob.objects.create(endpoint=endpoint, full=full)
+
+
+def claim_next_job():
+    """
+    Marks the oldest queued job as running and returns it, or returns None if the queue is empty.
+
+    The job is claimed with a conditional update on its status, so when several workers share the queue
+    only one of them can claim each job.
+    """
+
+    while True:
+        job = SyncJob.objects.filter(status=SyncJob.QUEUED).order_by('created', 'pk').first()
+        if job is None:
+            return None
+
+        started = timezone.now()
+        claimed = SyncJob.objects.filter(pk=job.pk, status=SyncJob.QUEUED).update(
+            status=SyncJob.RUNNING, started=started
+        )
+        if claimed:
+            job.status = SyncJob.RUNNING
+            job.started = started
+            return job
+
+
+def run_job(job):
+    """
+    Runs a claimed job and records whether it succeeded, with the sync's summary or error.
+    While it runs, job.result shows the markets synced so far.
+    """
+
+    def progress(result):
+        job.result = result
+        job.save(update_fields=['result'])
+
+    try:
+        job.result = run_sync(job.endpoint, full=job.full, progress=progress)
+        job.status = SyncJob.SUCCEEDED
+    except Exception as e:
+        logging.error(f'Error: {e}')
+        job.result = str(e)
+        job.status = SyncJob.FAILED
+
+    job.finished = timezone.now()
+    job.save(update_fields=['result', 'status', 'finished'])
+    return job
+
+
+def work(poll_interval=5, once=False):
+    """
+    Runs queued jobs until stopped, checking for new jobs every poll_interval seconds when the queue is empty.
+
+    Args:
+        poll_interval (float): Seconds to wait between checks of an empty queue.
+        once (bool): Stop as soon as the queue is empty, instead of waiting for more jobs.
+
+    Returns:
+        int: The number of jobs run, when once is True.
+    """
+
+    jobs_run = 0
+
+    while True:
+        job = claim_next_job()
+
+        if job is not None:
+            logging.info(f'Running sync job {job.pk}: {job.endpoint}')
+            run_job(job)
+            jobs_run += 1
+        elif once:
+            return jobs_run
+        else:
+            time.sleep(poll_interval)
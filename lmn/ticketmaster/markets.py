@@ -0,0 +1,135 @@
+""" Runs a sync for every configured market, sharded across a pool of worker processes.
+
+Each market is synced by one process, writing in its own transactions, so a market that fails leaves the others'
+data and sync cursors in place. SQLite only allows one writer at a time, so on SQLite the processes take turns
+to write, holding a shared lock, while their downloads and parsing still run in parallel.
+Every process has its own Session and request scheduler, and the scheduler's rate is divided between the processes,
+so together they stay within the one API quota.
+Each market's sync is recorded as a SyncRun, with its stats, see stats.py.
+Set TICKETMASTER_MARKETS and TICKETMASTER_VENUE_MARKETS to choose the markets, and TICKETMASTER_PROCESSES
+to choose the number of processes. """
+
+import json
+import time
+import logging
+import multiprocessing
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .. import autocomplete
+from ..models import SyncRun
+from . import client, ingest, ratelimit, stats
+from .cursors import market_key
+from .sync import markets_for, syncs
+
+
+def sync_market(endpoint, market, full=False, source=None):
+    """
+    Runs endpoint's sync for one market, and saves a SyncRun with the time spent in each stage of the sync.
+    The run's summary is also logged as JSON.
+
+    Returns:
+        tuple: The market's key, such as 'dmaId=336', the sync's summary, and the seconds the sync took.
+    """
+
+    run = SyncRun(endpoint=endpoint, market=market_key(market), full=full, started=timezone.now())
+    started = time.perf_counter()
+
+    with stats.recording() as run_stats:
+        try:
+            result = syncs[endpoint](market, full=full, source=source)
+            run.succeeded = True
+        except Exception as e:
+            run.error = str(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            run.finished = timezone.now()
+            run.summary = dict(
+                {'endpoint': endpoint, 'market': run.market, 'full': full, 'succeeded': run.succeeded,
+                 'error': run.error, 'seconds': round(elapsed, 4)},
+                **run_stats.summary(),
+            )
+            logging.info(json.dumps(run.summary))
+            with ingest.write_lock:
+                run.save()
+
+    return run.market, result, elapsed
+
+
+def _start_worker(processes, write_lock):
+    """ Sets up a worker process with its own Session, its share of the request rate, and the shared write lock. """
+    django.setup()
+    ingest.write_lock = write_lock
+    client._session = None
+    ratelimit._scheduler = ratelimit.RequestScheduler(
+        rate=settings.TICKETMASTER_REQUESTS_PER_SECOND / processes,
+        max_retries=settings.TICKETMASTER_MAX_RETRIES,
+    )
+
+
+def run_sync(endpoint, full=False, source=None, processes=None, progress=None):
+    """
+    Syncs endpoint for each of its configured markets, in up to processes worker processes at once.
+
+    Args:
+        endpoint (str): One of the keys of sync.syncs.
+        full (bool): Ignore the sync cursors and reload everything.
+        source: The event source to read from. A given source can't be shared with other processes,
+            so the markets are then synced one after another in this process.
+        processes (int): The most markets synced at the same time. Defaults to TICKETMASTER_PROCESSES.
+        progress: Called with the summary so far each time a market finishes.
+
+    Returns:
+        str: The summary of every market's sync, and how long they took together.
+    """
+
+    markets = markets_for(endpoint)
+    processes = min(processes or settings.TICKETMASTER_PROCESSES, len(markets))
+    started = time.perf_counter()
+    lines = []
+    market_seconds = 0
+
+    def finished(key, result, elapsed):
+        nonlocal market_seconds
+        market_seconds += elapsed
+        lines.append(f'{key}: {result}')
+        logging.info(f'Market {key} ({len(lines)}/{len(markets)}) finished in {elapsed:.2f}s.')
+        if progress:
+            with ingest.write_lock:
+                progress('\n'.join(lines))
+
+    if processes <= 1 or source is not None:
+        processes = 1
+        for market in markets:
+            finished(*sync_market(endpoint, market, full, source))
+    else:
+        write_lock = multiprocessing.RLock() if connections['default'].vendor == 'sqlite' else nullcontext()
+        # Forked workers mustn't share this process's database connections.
+        connections.close_all()
+
+        ingest.write_lock = write_lock
+        try:
+            with ProcessPoolExecutor(
+                max_workers=processes, initializer=_start_worker, initargs=(processes, write_lock)
+            ) as pool:
+                futures = [pool.submit(sync_market, endpoint, market, full) for market in markets]
+                for future in as_completed(futures):
+                    finished(*future.result())
+        finally:
+            ingest.write_lock = nullcontext()
+
+    # Bulk writes don't send the signals that clear the autocomplete index.
+    autocomplete.clear()
+
+    elapsed = time.perf_counter() - started
+    # How many market syncs were running at once, on average. Near processes when the syncs scale with the pool.
+    overlap = market_seconds / elapsed if elapsed else 0
+    header = (f'Synced {len(markets)} market(s) in {elapsed:.2f}s with {processes} processes '
+              f'({market_seconds:.2f}s of market syncs, {overlap:.1f} at a time).')
+    return '\n'.join([header] + lines)
@@ -0,0 +1,148 @@
+""" Keeps Ticketmaster requests inside the API quota.
+
+Every request waits for a token from a token bucket refilled at TICKETMASTER_REQUESTS_PER_SECOND.
+When Ticketmaster's rate limit headers say the quota is used up, the bucket is paused until the quota resets.
+429 and 5xx responses, timeouts and connection errors are retried with jittered exponential backoff. """
+
+import time
+import random
+import logging
+import threading
+
+import requests
+from django.conf import settings
+
+from . import stats
+
+
+# Statuses worth retrying: rate limited, or a temporary problem on Ticketmaster's side.
+retry_statuses = {429, 500, 502, 503, 504}
+# The backoff before retry n is a random time up to backoff_base * 2 ** n seconds, but never more than backoff_cap.
+backoff_base = 0.5
+backoff_cap = 30
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class TokenBucket:
+    """ Hands out tokens at a steady rate, allowing bursts of up to capacity. Safe to share between threads. """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = capacity
+        self.updated = clock()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """ Waits until a token is available, and takes it. """
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+
+            self.sleep(wait)
+
+    def pause(self, seconds):
+        """ Hands out no tokens for the next seconds, and none saved up from before. """
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+            self.tokens = 0
+
+
+class RequestScheduler:
+    """ Sends requests through a token bucket, watching the rate limit headers and retrying transient failures. """
+
+    def __init__(self, rate, max_retries, clock=time.monotonic, sleep=time.sleep):
+        self.bucket = TokenBucket(rate, capacity=max(1, rate), clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.retries = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(settings.TICKETMASTER_REQUESTS_PER_SECOND, settings.TICKETMASTER_MAX_RETRIES)
+
+    def send(self, request):
+        """
+        Sends a request when the bucket allows, retrying it if it fails in a way that might not happen again.
+
+        Args:
+            request: A function taking no arguments that makes the request and returns the requests.Response.
+
+        Returns:
+            The response. After max_retries retries, the last response is returned even if it is an error,
+            and the last timeout or connection error is raised.
+        """
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            stats.current().count('requests')
+            last_attempt = attempt == self.max_retries
+
+            try:
+                response = request()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                self.retry(attempt, f'Error: {e}')
+                continue
+
+            self.observe(response.headers)
+            if response.status_code not in retry_statuses or last_attempt:
+                return response
+
+            # Nothing reads the body of a response that's retried, so its connection goes back to the pool now.
+            response.close()
+            self.retry(attempt, f'Ticketmaster responded {response.status_code}', retry_after(response.headers))
+
+    def retry(self, attempt, reason, at_least=0):
+        """ Waits before retrying, for a random time that grows exponentially with each attempt. """
+        delay = max(at_least, random.uniform(0, min(backoff_cap, backoff_base * 2 ** attempt)))
+        self.retries += 1
+        stats.current().count('retries')
+        logging.warning(f'{reason}. Retrying in {delay:.2f}s.')
+        self.sleep(delay)
+
+    def observe(self, headers):
+        """ Pauses the bucket until the quota resets if Ticketmaster says none of it is left. """
+        if headers.get('Rate-Limit-Available') == '0' and headers.get('Rate-Limit-Reset'):
+            # Rate-Limit-Reset is when the quota resets, in milliseconds since the epoch.
+            try:
+                seconds = int(headers['Rate-Limit-Reset']) / 1000 - time.time()
+            except ValueError:
+                return
+            if seconds > 0:
+                logging.warning(f'Ticketmaster quota used up. Pausing requests for {seconds:.0f}s.')
+                self.bucket.pause(seconds)
+
+
+def retry_after(headers):
+    """ The seconds to wait given by a Retry-After header, or 0 if there isn't one in seconds. """
+    try:
+        return max(0, float(headers.get('Retry-After', 0)))
+    except ValueError:
+        return 0
+
+
+def shared_scheduler():
+    """ The process-wide scheduler. The quota belongs to the API key, so every sync in the process shares it. """
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler.from_settings()
+
+    return _scheduler
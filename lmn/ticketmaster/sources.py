@@ -0,0 +1,118 @@
+""" Where syncs read Ticketmaster pages from.
+
+A source has pages(resource, query, sync, full), which yields the list of results in each page of a search read by
+the sync named sync, every page if full is True, and commit(), which the sync calls once it has written those pages.
+ApiSource reads from the Ticketmaster API, and StreamingApiSource does too, while holding only one batch of results
+in memory at a time. ReplaySource reads pages recorded on disk by RecordingSource,
+so syncs can be run and benchmarked without the API. """
+
+import os
+import json
+import glob
+import hashlib
+
+from . import stats
+from .client import embedded_results
+from .cursors import published_since_filter
+from .ingest import batch_size
+
+
+class ApiSource:
+    """ Pages from the Ticketmaster API, through a TicketmasterClient. """
+
+    def __init__(self, client):
+        self.client = client
+
+    def pages(self, resource, query, sync=None, full=False):
+        return self.client.fetch_pages(resource, query, sync, full)
+
+    def commit(self):
+        """ Caches the pages read, so the sync's next run skips the ones that haven't changed. """
+        self.client.save_validators()
+
+
+class StreamingApiSource:
+    """ Results from the Ticketmaster API, parsed as they download and regrouped into lists of at most batch_size. """
+
+    def __init__(self, client):
+        self.client = client
+
+    def pages(self, resource, query, sync=None, full=False):
+        batch = []
+        for result in self.client.stream_results(resource, query):
+            batch.append(result)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def commit(self):
+        pass
+
+
+class ReplaySource:
+    """
+    Pages recorded on disk, as directory/<resource>/<query>/page-00000.json, page-00001.json and so on, see
+    query_directory. The pages recorded for the query are replayed, in order. Pages written straight into
+    directory/<resource>, by hand for example, are replayed for every query of the resource without its own.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def pages(self, resource, query, sync=None, full=False):
+        run_stats = stats.current()
+
+        paths = sorted(glob.glob(os.path.join(query_directory(self.directory, resource, query), 'page-*.json')))
+        if not paths:
+            paths = sorted(glob.glob(os.path.join(self.directory, resource, 'page-*.json')))
+        for path in paths:
+            with run_stats.stage('fetch', rows=1), open(path, 'rb') as page_file:
+                content = page_file.read()
+            run_stats.count('bytes_downloaded', len(content))
+
+            with run_stats.stage('decode'):
+                results = embedded_results(json.loads(content), resource)
+            run_stats.add('decode', rows=len(results))
+            yield results
+
+    def commit(self):
+        pass
+
+
+class RecordingSource:
+    """ Passes on the pages of another source, writing each one to disk in the layout ReplaySource reads.
+    Each query, one for each market for example, is recorded in its own directory. """
+
+    def __init__(self, source, directory):
+        self.source = source
+        self.directory = directory
+
+    def pages(self, resource, query, sync=None, full=False):
+        # This recording of the query replaces the last, which may have had more pages.
+        for path in glob.glob(os.path.join(query_directory(self.directory, resource, query), 'page-*.json')):
+            os.remove(path)
+        for number, results in enumerate(self.source.pages(resource, query, sync, full)):
+            write_page(self.directory, resource, number, results, query)
+            yield results
+
+    def commit(self):
+        self.source.commit()
+
+
+def query_directory(directory, resource, query):
+    """ Where the pages of a search of resource with query are recorded, named by a hash of the query.
+    The published since filter is left out, so a recording replays for every later run of the same search. """
+    params = sorted((name, str(value)) for name, value in query.items() if name != published_since_filter)
+    name = hashlib.sha256(json.dumps(params).encode()).hexdigest()[:16]
+    return os.path.join(directory, resource, name)
+
+
+def write_page(directory, resource, number, results, query=None):
+    """ Writes one page of results in the layout ReplaySource reads, for query, or for every query if it is None. """
+    page_directory = os.path.join(directory, resource) if query is None else query_directory(directory, resource, query)
+    os.makedirs(page_directory, exist_ok=True)
+    with open(os.path.join(page_directory, f'page-{number:05d}.json'), 'w') as page_file:
+        json.dump({'_embedded': {resource: results}}, page_file)
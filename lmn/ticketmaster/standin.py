@@ -0,0 +1,102 @@
+""" A local stand-in for the Ticketmaster Discovery API, serving synthetic music events and venues.
+
+It answers events.json and venues.json searches with the same paginated layout as Ticketmaster,
+with different events for each dmaId, after a configurable delay per request. The data is generated from each
+result's position, so every run serves the same events, which makes ingest throughput measurable and repeatable
+without the real API.
+Start it with python manage.py ticketmaster_standin, and point TICKETMASTER_BASE_URL at it. """
+
+import json
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse
+
+
+# Synthetic events are spread over ten years of days from 2023-01-01, in seconds since the epoch.
+first_day = 1672531200
+
+# Path prefix served, so TICKETMASTER_BASE_URL can be http://host:port/discovery/v2/ as for the real API.
+base_path = '/discovery/v2/'
+
+
+def synthetic_venue(n):
+    return {
+        'id': f'V{n}',
+        'name': f'Venue {n}',
+        'city': {'name': f'City {n % 50}'},
+        'state': {'name': 'Minnesota', 'stateCode': 'MN'},
+    }
+
+
+def synthetic_event(n, artist_count, venue_count):
+    """ Event n. Events cycle through artist_count artists and venue_count venues, one day apart. """
+    day = n % 3650
+    return {
+        'id': f'E{n}',
+        'name': f'Event {n}',
+        'dates': {'start': {'dateTime': time.strftime('%Y-%m-%dT20:00:00Z', time.gmtime(first_day + day * 86400))}},
+        '_embedded': {
+            'attractions': [{'id': f'A{n % artist_count}', 'name': f'Artist {n % artist_count}'}],
+            'venues': [synthetic_venue(n % venue_count)],
+        },
+    }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """ Answers searches using the settings of the StandInServer it belongs to. """
+
+    def do_GET(self):
+        url = parse.urlparse(self.path)
+        params = dict(parse.parse_qsl(url.query))
+        resource = url.path[len(base_path):].replace('.json', '') if url.path.startswith(base_path) else None
+
+        if resource == 'events':
+            # Each DMA gets its own events, so syncs of several markets write different shows.
+            offset = int(params.get('dmaId', 0)) * self.server.event_count
+            artists, venues = self.server.artist_count, self.server.venue_count
+            total, make = self.server.event_count, lambda n: synthetic_event(offset + n, artists, venues)
+        elif resource == 'venues':
+            total, make = self.server.venue_count, synthetic_venue
+        else:
+            self.send_error(404)
+            return
+
+        page = int(params.get('page', 0))
+        size = int(params.get('size', 20))
+        first = page * size
+        results = [make(n) for n in range(first, min(first + size, total))]
+
+        body = {'page': {'size': size, 'totalElements': total, 'totalPages': -(-total // size), 'number': page}}
+        if results:
+            body['_embedded'] = {resource: results}
+
+        time.sleep(self.server.latency)
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """ The stand-in server. Port 0 picks a free port, see server_address. """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, event_count=10000, artist_count=1000, venue_count=200, latency=0.0):
+        super().__init__((host, port), StandInHandler)
+        self.event_count = event_count
+        self.artist_count = artist_count
+        self.venue_count = venue_count
+        self.latency = latency
+
+    @property
+    def base_url(self):
+        """ The value for TICKETMASTER_BASE_URL to sync from this server. """
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}{base_path}'
@@ -0,0 +1,84 @@
+""" Timers and counters for the stages of a Ticketmaster sync, so it's clear where a sync spends its time.
+
+The stages are
+fetch: waiting for Ticketmaster, or reading recorded pages. Rows are pages fetched.
+decode: parsing JSON responses. Rows are results decoded.
+transform: turning results into model instances. Rows are instances built.
+lookup: finding existing rows in the database. Rows are rows found.
+write: inserting and updating rows. Rows are rows written.
+
+Each market sync records into its own SyncStats, made current by recording() in markets.sync_market,
+and the summary is saved as a SyncRun. Pages are fetched on several threads, so a stage's seconds are summed
+across threads and can add up to more than the sync took. """
+
+import time
+import threading
+from contextlib import contextmanager
+
+
+stages = ('fetch', 'decode', 'transform', 'lookup', 'write')
+
+# Counts kept besides the stages.
+counters = ('requests', 'retries', 'bytes_downloaded', 'created', 'updated', 'unchanged')
+
+
+class SyncStats:
+    """ The time spent and rows handled in each stage of one sync, and its other counts.
+    Safe to share between threads. """
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(stages, 0.0)
+        self.rows = dict.fromkeys(stages, 0)
+        self.counts = dict.fromkeys(counters, 0)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        """ Times the block as part of stage name, and counts rows for the stage. """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started, rows)
+
+    def add(self, name, seconds=0.0, rows=0):
+        with self.lock:
+            self.seconds[name] += seconds
+            self.rows[name] += rows
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counts[counter] += amount
+
+    def summary(self):
+        """ The stats as a dictionary that can be saved as JSON. """
+        with self.lock:
+            return dict(
+                {'stages': {
+                    name: {'seconds': round(self.seconds[name], 4), 'rows': self.rows[name]} for name in stages
+                }},
+                **self.counts,
+            )
+
+
+# The stats being recorded. Outside a recorded sync, such as in tests that call the ingest functions directly,
+# this collects stats that are never read.
+_current = SyncStats()
+
+
+def current():
+    """ The SyncStats of the sync running in this process. """
+    return _current
+
+
+@contextmanager
+def recording():
+    """ Records the stats of the block into a new SyncStats, which it yields. """
+    global _current
+
+    previous = _current
+    _current = SyncStats()
+    try:
+        yield _current
+    finally:
+        _current = previous
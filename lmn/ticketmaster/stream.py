@@ -0,0 +1,127 @@
+""" Incremental parsing of Ticketmaster responses, so a page of results never has to be held in memory at once.
+
+StreamingPageParser reads a response body chunk by chunk and yields each result of the page as soon as it has
+been read in full. Only the current result, and the unread part of the current chunk, are held at any time. """
+
+import json
+import codecs
+
+
+class StreamingPageParser:
+    """
+    Parses one page of a Ticketmaster search, in the layout {"_embedded": {"<resource>": [...]}, "page": {...}, ...}.
+
+    items() yields the results one at a time. Once it is exhausted, page holds the response's page details,
+    such as totalPages, which Ticketmaster sends after the results.
+    """
+
+    def __init__(self, chunks, resource):
+        self.chunks = iter(chunks)
+        self.resource = resource
+        self.page = {}
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder('utf-8')()
+
+    def items(self):
+        """ Yields each result in the page. """
+        for key in self._members():
+            if key == '_embedded':
+                for embedded_key in self._members():
+                    if embedded_key == self.resource:
+                        yield from self._array_items()
+                    else:
+                        self._value()
+            elif key == 'page':
+                self.page = self._value()
+            else:
+                self._value()
+
+    def _fill(self):
+        """ Drops what has been parsed and reads the next chunk. Returns False at the end of the stream. """
+        if self.eof:
+            return False
+
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            self.buffer += self.text.decode(b'', final=True)
+            return False
+
+        self.buffer += self.text.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return True
+
+    def _peek(self):
+        """ The next character that isn't whitespace, without consuming it. """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError('Unexpected end of JSON response')
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f'Expected {char!r} in JSON response, found {found!r}')
+        self.pos += 1
+
+    def _value(self):
+        """ Decodes the next complete JSON value, reading more chunks until it has all arrived. """
+        self._peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+
+            self._fill()
+
+    def _members(self):
+        """ Yields the key of each member of the object that comes next. The caller must consume each value. """
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+
+        while True:
+            key = self._value()
+            self._expect(':')
+            yield key
+
+            separator = self._peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f'Expected "," or "}}" in JSON response, found {separator!r}')
+
+    def _array_items(self):
+        """ Yields each item of the array that comes next. """
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+
+        while True:
+            yield self._value()
+
+            separator = self._peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f'Expected "," or "]" in JSON response, found {separator!r}')
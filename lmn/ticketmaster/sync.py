@@ -0,0 +1,212 @@
+""" The Ticketmaster syncs. Each one syncs one market: it reads pages from an event source, by default the
+Ticketmaster API, writes to the database, and returns a summary of what it wrote.
+They are run for every configured market by markets.run_sync, from the sync worker, see jobs.py. """
+
+import os
+import time
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+from dotenv import load_dotenv
+
+from ..models import Artist, Venue, Show
+from . import stats
+from .client import TicketmasterClient
+from .cursors import events_query, record_sync
+from .ingest import build_shows, build_venue, sync_events, sync_events_in_batches, upsert
+from .sources import ApiSource, ReplaySource, StreamingApiSource
+
+
+# Load the environment variables from .env file
+load_dotenv()
+
+# Get the API keys from the environment variables
+key = os.getenv('TICKETMASTER_KEY')
+
+
+def require_key():
+    """ Raises ValueError if syncs read from the Ticketmaster API and there is no API key to read with. """
+    if not key and not settings.TICKETMASTER_REPLAY_DIR:
+        raise ValueError('TICKETMASTER_KEY not found in environment variables')
+
+
+def event_source():
+    """
+    The configured event source: recorded pages if TICKETMASTER_REPLAY_DIR is set, otherwise the Ticketmaster API,
+    parsed as it downloads if TICKETMASTER_STREAMING is set.
+    """
+
+    if settings.TICKETMASTER_REPLAY_DIR:
+        return ReplaySource(settings.TICKETMASTER_REPLAY_DIR)
+
+    require_key()
+    if settings.TICKETMASTER_STREAMING:
+        return StreamingApiSource(TicketmasterClient(key))
+    return ApiSource(TicketmasterClient(key))
+
+
+def summary(message, created, updated, unchanged, started):
+    """
+    Describes a finished sync, with how many rows were written or found unchanged, and how fast.
+
+    Args:
+        message (str): The success message.
+        created (int): The number of rows inserted.
+        updated (int): The number of existing rows changed.
+        unchanged (int): The number of existing rows that were already up to date, and weren't written.
+        started (float): The time.perf_counter() value taken when the sync started.
+    """
+
+    rows = created + updated
+    elapsed = time.perf_counter() - started
+    rate = (rows + unchanged) / elapsed if elapsed else 0
+    result = (f'{message} {rows} rows written ({created} created, {updated} updated), {unchanged} unchanged, '
+              f'in {elapsed:.2f}s ({rate:.1f} rows/s).')
+    logging.info(result)
+    return result
+
+
+def sync_artists(market, full=False, source=None):
+    """
+    Retrieves the music artists playing in market, such as {'dmaId': '336'}, from the Ticketmaster API
+    and saves them to the database.
+    Only events published since the last successful artist sync are requested, unless full is True.
+    Pages are read from source, or from the configured event source if it is None.
+    """
+
+    source = source or event_source()
+    artist_names = set()
+    sync_started = timezone.now()
+    started = time.perf_counter()
+    created = updated = unchanged = 0
+
+    # Set the query parameters to retrieve music events in the market.
+    query = events_query('artist', market, {'classificationName': 'music'}, full)
+
+    for results in source.pages('events', query, 'artist', full):
+        artists = []
+
+        # Loop through each event to get the artist name, skipping artists already seen in this sync.
+        with stats.current().stage('transform'):
+            for result in results:
+                artist_name = result['_embedded']['attractions'][0]['name']
+
+                if artist_name not in artist_names:
+                    artist_names.add(artist_name)
+                    artists.append(Artist(name=artist_name))
+        stats.current().add('transform', rows=len(artists))
+
+        page_created, page_updated, page_unchanged = upsert(Artist, artists, key_fields=('name',))
+        created += page_created
+        updated += page_updated
+        unchanged += page_unchanged
+
+    record_sync('artist', market, sync_started)
+    source.commit()
+    return summary('Artists have been populated correctly.', created, updated, unchanged, started)
+
+
+def sync_venues(market, full=False, source=None):
+    """
+    Retrieves the music venues in market, such as {'stateCode': 'MN'}, from the Ticketmaster API
+    and saves them to the database.
+    The venue search has no date filter, so every venue sync reads every venue.
+    full only stops cached pages being revalidated.
+    Pages are read from source, or from the configured event source if it is None.
+    """
+
+    source = source or event_source()
+    sync_started = timezone.now()
+    started = time.perf_counter()
+    created = updated = unchanged = 0
+
+    # Set the query parameters to retreive venues in the market.
+    query = dict({'classificationName': 'music'}, **market)
+
+    for results in source.pages('venues', query, 'venue', full):
+        # Build a Venue for each venue in the page.
+        with stats.current().stage('transform', rows=len(results)):
+            venues = [build_venue(result) for result in results]
+
+        page_created, page_updated, page_unchanged = upsert(Venue, venues, key_fields=('name',),
+                                                            update_fields=('city', 'state'))
+        created += page_created
+        updated += page_updated
+        unchanged += page_unchanged
+
+    record_sync('venue', market, sync_started)
+    source.commit()
+    return summary('Venues have been populated correctly.', created, updated, unchanged, started)
+
+
+def sync_shows(market, full=False, source=None):
+    """
+    Retrieves the music shows in market, such as {'dmaId': '336'}, from the Ticketmaster API
+    and saves them to the database.
+    Only events published since the last successful show sync are requested, unless full is True.
+    Shows whose artist or venue is not in the database yet are skipped, and need a full sync to be picked up later.
+    Pages are read from source, or from the configured event source if it is None.
+    """
+
+    source = source or event_source()
+    sync_started = timezone.now()
+    started = time.perf_counter()
+    created = updated = unchanged = 0
+
+    # Set the query parameters to retrieve music events in the market.
+    query = events_query('show', market, {'classificationName': 'music'}, full)
+
+    for results in source.pages('events', query, 'show', full):
+        page_created, page_updated, page_unchanged = upsert(Show, build_shows(results),
+                                                            key_fields=('artist_id', 'venue_id', 'show_date'))
+        created += page_created
+        updated += page_updated
+        unchanged += page_unchanged
+
+    record_sync('show', market, sync_started)
+    source.commit()
+    return summary('Shows have been populated correctly.', created, updated, unchanged, started)
+
+
+def sync_all_events(market, full=False, source=None):
+    """
+    Retrieves the music events in market, such as {'dmaId': '336'}, from the Ticketmaster API once,
+    and saves their artists, venues and shows to the database together, in one transaction.
+    Replaces running the artist, venue and show syncs in order.
+    With TICKETMASTER_STREAMING, each batch of events is written in its own transaction instead, to bound memory use.
+    Only events published since the last successful events sync are requested, unless full is True.
+    Pages are read from source, or from the configured event source if it is None.
+    """
+
+    source = source or event_source()
+    sync_started = timezone.now()
+    started = time.perf_counter()
+
+    # Set the query parameters to retrieve music events in the market.
+    query = events_query('events', market, {'classificationName': 'music'}, full)
+    if settings.TICKETMASTER_STREAMING:
+        counts = sync_events_in_batches(source.pages('events', query, 'events', full))
+    else:
+        counts = sync_events(source.pages('events', query, 'events', full))
+
+    record_sync('events', market, sync_started)
+    source.commit()
+    created, updated, unchanged = (sum(model_counts) for model_counts in zip(*counts.values()))
+    return summary('Artists, venues and shows have been populated correctly.', created, updated, unchanged, started)
+
+
+# The syncs by endpoint name, as used by the sync URLs, the sync_ticketmaster command and SyncJob.endpoint.
+syncs = {
+    'artist': sync_artists,
+    'venue': sync_venues,
+    'show': sync_shows,
+    'events': sync_all_events,
+}
+
+
+def markets_for(endpoint):
+    """ The configured markets an endpoint syncs. Venues are searched by state, everything else by DMA. """
+    if endpoint == 'venue':
+        return settings.TICKETMASTER_VENUE_MARKETS
+    return settings.TICKETMASTER_MARKETS
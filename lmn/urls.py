@@ -1,7 +1,9 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
 
-from .views import views_main, views_artists, views_venues, views_notes, views_users, views_shows, views_api
+from .views import (
+    views_main, views_artists, views_venues, views_notes, views_users, views_shows, views_api, views_json_api
+)
 
 
 urlpatterns = [
@@ -12,6 +14,7 @@ urlpatterns = [
     path('venues/list/', views_venues.venue_list, name='venue_list'),
     path('venues/detail/<int:venue_pk>/', views_venues.venue_detail, name='venue_detail'),
     path('venues/artists_at/<int:venue_pk>/', views_venues.artists_at_venue, name='artists_at_venue'),
+    path('venues/autocomplete/', views_venues.venue_autocomplete, name='venue_autocomplete'),
 
     # Note related URLs
     path('notes/latest/', views_notes.latest_notes, name='latest_notes'),
@@ -26,12 +29,14 @@ urlpatterns = [
     path('artists/list/', views_artists.artist_list, name='artist_list'),
     path('artists/detail/<int:artist_pk>/', views_artists.artist_detail, name='artist_detail'),
     path('artists/venues_played/<int:artist_pk>/', views_artists.venues_for_artist, name='venues_for_artist'),
+    path('artists/autocomplete/', views_artists.artist_autocomplete, name='artist_autocomplete'),
 
     # Show related URLS
     path('shows/most_notes_list/', views_shows.shows_with_most_notes, name='shows_with_most_notes'),
 
     # User related URLs
     path('user/profile/<int:user_pk>/', views_users.user_profile, name='user_profile'),
+    path('user/profile/<int:user_pk>/notes/', views_users.user_profile_notes, name='user_profile_notes'),
     path('user/profile/', views_users.my_user_profile, name='my_user_profile'),
     path('user/edit_account_info/<int:user_pk>/', views_users.edit_user_account_info, name='edit_user_account_info'),
     path('user/change_password/<int:user_pk>/', views_users.change_user_password, name='change_user_password'),
@@ -45,5 +50,17 @@ urlpatterns = [
     path('artist', views_api.get_artist, name='admin_get_artist'),
     path('venue', views_api.get_venue, name='admin_get_venue'),
     path('show', views_api.get_show, name='admin_get_show'),
+    path('events', views_api.get_events, name='admin_get_events'),
+    path('sync/jobs/<int:job_pk>/', views_api.sync_job_status, name='sync_job_status'),
+
+    # Read-only JSON API URLs
+    path('api/artists/', views_json_api.artist_list, name='api_artist_list'),
+    path('api/artists/<int:artist_pk>/', views_json_api.artist_detail, name='api_artist_detail'),
+    path('api/venues/', views_json_api.venue_list, name='api_venue_list'),
+    path('api/venues/<int:venue_pk>/', views_json_api.venue_detail, name='api_venue_detail'),
+    path('api/shows/', views_json_api.show_list, name='api_show_list'),
+    path('api/shows/<int:show_pk>/', views_json_api.show_detail, name='api_show_detail'),
+    path('api/notes/', views_json_api.note_list, name='api_note_list'),
+    path('api/notes/<int:note_pk>/', views_json_api.note_detail, name='api_note_detail'),
 
 ]
@@ -1,13 +1,16 @@
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
+from ..autocomplete import complete, max_limit
 from ..models import Artist, Show
 from ..forms import ArtistSearchForm
+from ..pagination import paginate
+from ..search import search
 
 
 def venues_for_artist(request, artist_pk):
     """ Get all of the venues where this artist has played a show """
-    shows = Show.objects.filter(artist=artist_pk).order_by('-show_date')  # most recent first
+    shows = Show.objects.filter(artist=artist_pk).select_related('venue').order_by('-show_date')  # most recent first
     artist = Artist.objects.get(pk=artist_pk)
     return render(request, 'lmn/venues/venue_list_for_artist.html', {'artist': artist, 'shows': shows})
 
@@ -16,26 +19,17 @@ def artist_list(request):
     """ Get a list of all artists, ordered by name.
 
     If request contains a GET parameter search_name then 
-    only include artists with names containing that text. """
+    only include artists with names containing that text.
+    Pages are chosen with a cursor GET parameter, see pagination.py. """
     form = ArtistSearchForm()
     search_name = request.GET.get('search_name')
     if search_name:
-        artists = Artist.objects.filter(name__icontains=search_name).order_by('name')
+        artists = search(Artist.objects.all(), search_name)
     else:
-        artists = Artist.objects.all().order_by('name')
+        artists = Artist.objects.all()
 
-    paginator = Paginator(artists, 20)
     # Show 20 artists per page
-
-    page = request.GET.get('page')
-    try:
-        paginated_artists = paginator.page(page)
-    except PageNotAnInteger:
-        # If page is not an integer, deliver first page.
-        paginated_artists = paginator.page(1)
-    except EmptyPage:
-        # If page is out of range (e.g. 9999), deliver last page of results.
-        paginated_artists = paginator.page(paginator.num_pages)
+    paginated_artists = paginate(request, artists, 20, key='search_rank' if search_name else 'name')
 
     return render(request, 'lmn/artists/artist_list.html', {'artists': paginated_artists, 'form': form, 'search_term': search_name})
 
@@ -44,3 +38,15 @@ def artist_detail(request, artist_pk):
     """ Get details about one artist """
     artist = get_object_or_404(Artist, pk=artist_pk)
     return render(request, 'lmn/artists/artist_detail.html', {'artist': artist})
+
+
+def artist_autocomplete(request):
+    """ Names of artists matching what has been typed in the search form, most noted first, as JSON.
+
+    GET parameters are q, the text typed, and optionally limit, the most names returned,
+    up to autocomplete.max_limit. """
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), max_limit)
+    except ValueError:
+        limit = 10
+    return JsonResponse({'results': complete('artists', request.GET.get('q', ''), limit)})
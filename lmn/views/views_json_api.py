@@ -0,0 +1,133 @@
+""" A read-only JSON API of artists, venues, shows and notes, for the mobile app.
+
+Each kind of row has a list endpoint and a detail endpoint. Rows are read with values(), as dictionaries, and
+written to JSON from those, without making a model instance for each row. Lists return one page of results,
+chosen with a cursor GET parameter like the artist and venue lists, see pagination.py, and the response's
+next_cursor and previous_cursor, null at either end, choose the pages either side. A limit GET parameter sets
+the most results on a page. Each page, and each detail, is read in one query. """
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from ..models import Artist, Note, Show, Venue
+from ..pagination import cursor_position, keyset_page
+
+
+# The number of results on a page without a limit GET parameter, and the most a limit may ask for.
+default_limit = 20
+max_limit = 100
+
+# The fields of each kind of row in the JSON, with the values() lookups they're read from.
+artist_fields = (('id', 'id'), ('name', 'name'))
+venue_fields = (('id', 'id'), ('name', 'name'), ('city', 'city'), ('state', 'state'))
+show_fields = (
+    ('id', 'id'), ('show_date', 'show_date'), ('note_count', 'note_count'),
+    ('artist_id', 'artist_id'), ('artist', 'artist__name'), ('venue_id', 'venue_id'), ('venue', 'venue__name'),
+)
+note_fields = (
+    ('id', 'id'), ('title', 'title'), ('text', 'text'), ('posted_date', 'posted_date'),
+    ('show_id', 'show_id'), ('show_date', 'show__show_date'),
+    ('artist', 'show__artist__name'), ('venue', 'show__venue__name'),
+    ('user_id', 'user_id'), ('username', 'user__username'),
+)
+
+
+def lookups(fields):
+    return [lookup for name, lookup in fields]
+
+
+def serialize(rows, fields):
+    """ The JSON fields of rows, dictionaries from values() with fields' lookups. """
+    return [{name: row[lookup] for name, lookup in fields} for row in rows]
+
+
+def bad_request(message):
+    return JsonResponse({'error': message}, status=400)
+
+
+def page_limit(request):
+    """ The most results on a page, from the request's limit GET parameter, between 1 and max_limit. """
+    try:
+        return min(max(int(request.GET.get('limit', default_limit)), 1), max_limit)
+    except ValueError:
+        return default_limit
+
+
+def list_response(request, queryset, fields, key, descending=False):
+    """ The page of queryset's rows that the request's cursor points to, ordered by key then id, as JSON. """
+    rows = queryset.values(*lookups(fields))
+    cursor = request.GET.get('cursor')
+    if cursor and cursor_position(rows, cursor, key) is None:
+        # Not one of ours, or from another list, with a name where a date is expected for example.
+        return bad_request('Invalid cursor.')
+    page = keyset_page(rows, cursor, page_limit(request), count=False, key=key, descending=descending)
+    return JsonResponse({
+        'results': serialize(page, fields),
+        'next_cursor': page.next_cursor if page.has_next else None,
+        'previous_cursor': page.previous_cursor if page.has_previous else None,
+    })
+
+
+def detail_response(queryset, fields, pk):
+    """ The row of queryset with pk as JSON, or a 404 response. """
+    row = get_object_or_404(queryset.values(*lookups(fields)), pk=pk)
+    return JsonResponse(serialize([row], fields)[0])
+
+
+def filter_by_pks(request, queryset, *names):
+    """ queryset filtered by the foreign keys among names given as GET parameters, or None if one isn't a number. """
+    for name in names:
+        pk = request.GET.get(name)
+        if pk is not None:
+            if not pk.isdigit():
+                return None
+            queryset = queryset.filter(**{f'{name}_id': int(pk)})
+    return queryset
+
+
+def artist_list(request):
+    """ Artists, ordered by name. """
+    return list_response(request, Artist.objects.all(), artist_fields, key='name')
+
+
+def artist_detail(request, artist_pk):
+    """ One artist. """
+    return detail_response(Artist.objects.all(), artist_fields, artist_pk)
+
+
+def venue_list(request):
+    """ Venues, ordered by name. """
+    return list_response(request, Venue.objects.all(), venue_fields, key='name')
+
+
+def venue_detail(request, venue_pk):
+    """ One venue. """
+    return detail_response(Venue.objects.all(), venue_fields, venue_pk)
+
+
+def show_list(request):
+    """ Shows, most recent first, with their artist and venue names.
+    Optional artist and venue GET parameters, artist and venue ids, list only that artist's or venue's shows. """
+    shows = filter_by_pks(request, Show.objects.all(), 'artist', 'venue')
+    if shows is None:
+        return bad_request('artist and venue must be ids.')
+    return list_response(request, shows, show_fields, key='show_date', descending=True)
+
+
+def show_detail(request, show_pk):
+    """ One show, with its artist and venue names. """
+    return detail_response(Show.objects.all(), show_fields, show_pk)
+
+
+def note_list(request):
+    """ Notes, newest first, with their show and user.
+    Optional show and user GET parameters, show and user ids, list only that show's or user's notes. """
+    notes = filter_by_pks(request, Note.objects.all(), 'show', 'user')
+    if notes is None:
+        return bad_request('show and user must be ids.')
+    return list_response(request, notes, note_fields, key='posted_date', descending=True)
+
+
+def note_detail(request, note_pk):
+    """ One note, with its show and user. """
+    return detail_response(Note.objects.all(), note_fields, note_pk)
@@ -3,6 +3,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.utils.functional import SimpleLazyObject
 
 from datetime import datetime
 from django.utils import timezone
@@ -11,12 +12,15 @@ from django.core.exceptions import ValidationError
 
 from ..models import Note, Show
 from ..forms import NewNoteForm 
+from ..note_cache import notes_version, page_cache_seconds
+from .. import notes_feed
+from ..pagination import cursor_position, encode_cursor, keyset_page
 
 
 @login_required
 def new_note(request, show_pk):
     """ Create a new note for a show. A user cannot add note for a show that has not happened yet."""
-    show = get_object_or_404(Show, pk=show_pk)
+    show = get_object_or_404(Show.objects.select_related('artist', 'venue'), pk=show_pk)
 
     if request.method == 'POST':
         if show.in_past == False:
@@ -58,21 +62,38 @@ def edit_note(request, note_pk):
     
 
 def latest_notes(request):
-    """ Get the 20 most recent notes, ordered with most recent first. """
-    notes = Note.objects.all().order_by('-posted_date')[:20]   # Slice of the 20 most recent notes
+    """ Get the 20 most recent notes, ordered with most recent first.
+    They are read from the latest notes feed in the cache, see notes_feed.py, so usually without a query. """
+    notes = notes_feed.latest_notes()
     return render(request, 'lmn/notes/note_list.html', {'notes': notes, 'title': 'Latest Notes'})
 
 
 def notes_for_show(request, show_pk): 
-    """ Get notes for one show, most recent first. """
-    show = get_object_or_404(Show, pk=show_pk)  
-    notes = Note.objects.filter(show=show_pk).order_by('-posted_date')
-    return render(request, 'lmn/notes/notes_for_show.html', {'show': show, 'notes': notes})
+    """ Get notes for one show, most recent first, 20 at a time.
+    Pages are chosen with a cursor GET parameter, see pagination.py, and cached, see note_cache.py. """
+    show = get_object_or_404(Show.objects.select_related('artist', 'venue'), pk=show_pk)
+    notes = Note.objects.filter(show=show_pk).select_related('user')
+    position = cursor_position(notes, request.GET.get('cursor'), 'posted_date')
+    # The cursor is part of the cached page's key, so it's written again from what it holds. Every cursor that
+    # isn't one of ours, or is from another list, gives the first page, and shares its cached page.
+    cursor = encode_cursor(*position) if position else ''
+    # Only read when the page isn't cached.
+    notes_page = SimpleLazyObject(
+        lambda: keyset_page(notes, cursor, 20, count=False, key='posted_date', descending=True)
+    )
+    cache_seconds = page_cache_seconds()
+    version = notes_version(show.pk) if cache_seconds else None
+    if version is None:
+        # Not cached, or the cache failed.
+        cache_seconds = 0
+    return render(request, 'lmn/notes/notes_for_show.html', {
+        'show': show, 'notes': notes_page, 'cursor': cursor, 'notes_version': version, 'cache_seconds': cache_seconds,
+    })
 
 
 def note_detail(request, note_pk):
     """ Display one note. """
-    note = get_object_or_404(Note, pk=note_pk)
+    note = get_object_or_404(Note.objects.select_related('show__artist', 'show__venue', 'user'), pk=note_pk)
     return render(request, 'lmn/notes/note_detail.html', {'note': note})
 
 
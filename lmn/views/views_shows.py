@@ -1,18 +1,15 @@
 from django.shortcuts import render
-from django.db.models import Count
 
 from ..models import Show
 
 
 def shows_with_most_notes(request):
-    """ Get the the most recent Shows with the top 5 count of notes.
-    Also, get all of the notes associated with each Show. """
+    """ Get the the most recent Shows with the top 5 count of notes. """
 
-    # Get the top 5 shows with the most notes by getting the count and ordering first by most recent show date, then number of notes. 
-    # Exclude shows with 0 notes.
-    top_5_shows = Show.objects.annotate(num_notes=Count('note')).exclude(num_notes=0).order_by('-show_date', '-num_notes')[:5]  # Adapted from Django docs https://docs.djangoproject.com/en/4.2/topics/db/aggregation/
-    
-    for show in top_5_shows:
-        show.notes = show.note_set.all() # Get data on the Note objects associated with each Show
+    # Get the top 5 shows with the most notes, ordering first by most recent show date, then number of notes.
+    # Exclude shows with 0 notes. Each show's note_count is stored, and the shows with notes are indexed in this order,
+    # so this is one query reading five index entries, however many notes there are.
+    top_5_shows = Show.objects.filter(note_count__gt=0).select_related('artist', 'venue')
+    top_5_shows = top_5_shows.order_by('-show_date', '-note_count')[:5]
 
-    return render(request, 'lmn/shows/shows_with_most_notes.html', {'top_5_shows': top_5_shows})
\ No newline at end of file
+    return render(request, 'lmn/shows/shows_with_most_notes.html', {'top_5_shows': top_5_shows})
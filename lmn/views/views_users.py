@@ -1,3 +1,4 @@
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -7,18 +8,55 @@ from django.contrib.auth.signals import user_logged_out
 from django.dispatch import receiver
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
+from django.urls import reverse
+from django.utils.text import Truncator
 
 from ..forms import UserRegistrationForm, UserUpdateForm
 from ..models import Note
+from ..pagination import keyset_page
+
+
+# The number of notes on each page of a profile, and in each load more.
+notes_per_page = 20
+
+
+def user_notes_page(request, notes):
+    """ The page of a user's notes, newest first, that the request's cursor GET parameter points to. """
+    cursor = request.GET.get('cursor')
+    return keyset_page(notes, cursor, notes_per_page, count=False, key='posted_date', descending=True)
 
 
 def user_profile(request, user_pk):
     """ Get user profile for any user on the site. 
     Any user may view any other user's profile. 
-    """
+    Shows a page of the user's notes, newest first. Older pages are chosen with a cursor GET parameter,
+    or loaded into the page from user_profile_notes. """
     user = User.objects.get(pk=user_pk)
-    usernotes = Note.objects.filter(user=user.pk).order_by('-posted_date')
-    return render(request, 'lmn/users/user_profile.html', {'user_profile': user, 'notes': usernotes, 'messages': messages.get_messages(request)})
+    usernotes = Note.objects.filter(user=user.pk).select_related('show__artist', 'show__venue')
+    notes_page = user_notes_page(request, usernotes)
+    return render(request, 'lmn/users/user_profile.html', {
+        'user_profile': user, 'notes': notes_page, 'messages': messages.get_messages(request)
+    })
+
+
+def user_profile_notes(request, user_pk):
+    """ A page of a user's notes, newest first, as JSON, for the profile's load more link.
+
+    The cursor GET parameter chooses the page, and the response's next_cursor, null on the last page,
+    loads the page after. The notes and their show, artist and venue are read as values in one query. """
+    fields = ('id', 'title', 'text', 'posted_date', 'show__show_date', 'show__artist__name', 'show__venue__name')
+    notes_page = user_notes_page(request, Note.objects.filter(user=user_pk).values(*fields))
+    notes = [{
+        'id': note['id'],
+        'title': note['title'],
+        'text': Truncator(note['text']).chars(300),
+        'posted_date': note['posted_date'],
+        'show_date': note['show__show_date'],
+        'artist': note['show__artist__name'],
+        'venue': note['show__venue__name'],
+        'url': reverse('note_detail', kwargs={'note_pk': note['id']}),
+    } for note in notes_page]
+    return JsonResponse({'notes': notes, 'next_cursor': notes_page.next_cursor if notes_page.has_next else None})
 
 
 @login_required
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+from urllib.parse import parse_qsl
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -37,7 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'lmn'
+    'lmn.apps.LmnConfig'
 ]
 
 MIDDLEWARE = [
@@ -103,6 +104,19 @@ DATABASES = {
 }
 
 
+# Note pages and the latest notes feed are only cached when every process serving the site shares the cache, since
+# a note saved in one process changes what is cached for all of them. The default cache is kept in each process's
+# memory and needs no setup, so nothing is cached and every page reads the database. Set CACHE_BACKEND and
+# CACHE_LOCATION to a shared cache, such as memcached, to cache them. A DatabaseCache is shared too, after
+# python manage.py createcachetable, but every cache read is then a database query.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -145,3 +159,61 @@ STATIC_URL = '/static/'
 # Where to send user after successful login, and logout, if no other page is provided.
 LOGIN_REDIRECT_URL = 'my_user_profile'
 LOGOUT_REDIRECT_URL = 'homepage'
+
+
+# The Ticketmaster Discovery API. Point this at the stand-in server, started with manage.py ticketmaster_standin,
+# to run syncs without the real API.
+TICKETMASTER_BASE_URL = os.getenv('TICKETMASTER_BASE_URL', 'https://app.ticketmaster.com/discovery/v2/')
+# Ticketmaster only pages through the first 1000 results of a search. Only raise this for the stand-in server.
+TICKETMASTER_MAX_RESULTS = int(os.getenv('TICKETMASTER_MAX_RESULTS', 1000))
+# A directory of recorded Ticketmaster pages, see manage.py sync_ticketmaster --record. When set, syncs replay
+# these pages instead of calling the API.
+TICKETMASTER_REPLAY_DIR = os.getenv('TICKETMASTER_REPLAY_DIR', '')
+
+# The markets synced, as comma separated Ticketmaster query parameters. Events are searched by DMA, by default
+# Minneapolis-St. Paul, and venues by state, by default Minnesota. A market can have more than one parameter,
+# for example countryCode=US&stateCode=WI.
+TICKETMASTER_MARKETS = [
+    dict(parse_qsl(market)) for market in os.getenv('TICKETMASTER_MARKETS', 'dmaId=336').split(',') if market
+]
+TICKETMASTER_VENUE_MARKETS = [
+    dict(parse_qsl(market)) for market in os.getenv('TICKETMASTER_VENUE_MARKETS', 'stateCode=MN').split(',') if market
+]
+# Number of markets synced at the same time, each in its own process. Only raise this with a database that
+# handles concurrent writers, such as PostgreSQL. SQLite allows one writer at a time.
+TICKETMASTER_PROCESSES = int(os.getenv('TICKETMASTER_PROCESSES', 1))
+
+# Number of Ticketmaster result pages fetched at the same time during a sync.
+TICKETMASTER_WORKERS = int(os.getenv('TICKETMASTER_WORKERS', 4))
+# Set TICKETMASTER_STREAMING=1 to parse Ticketmaster pages as they download and write events in batches,
+# which bounds a sync's memory use, at the cost of fetching pages one at a time and skipping the response cache.
+TICKETMASTER_STREAMING = os.getenv('TICKETMASTER_STREAMING', '0') == '1'
+
+# Where Ticketmaster responses are cached for conditional requests.
+# Set TICKETMASTER_CACHE_DIR to an empty value to turn the cache off.
+TICKETMASTER_CACHE_DIR = os.getenv('TICKETMASTER_CACHE_DIR', os.path.join(BASE_DIR, '.ticketmaster_cache'))
+# The most the cached response bodies may take up on disk, in bytes, before the least recently used are evicted.
+TICKETMASTER_CACHE_MAX_BYTES = int(os.getenv('TICKETMASTER_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+
+# Ticketmaster's quota is 5 requests per second. Requests are spaced out to stay within it.
+TICKETMASTER_REQUESTS_PER_SECOND = float(os.getenv('TICKETMASTER_REQUESTS_PER_SECOND', 5))
+# How many times a rate limited or failed Ticketmaster request is retried before the sync gives up.
+TICKETMASTER_MAX_RETRIES = int(os.getenv('TICKETMASTER_MAX_RETRIES', 5))
+
+# The artist and venue lists page through names with cursors, so a deep page costs the same as the first.
+# Set LIST_PAGINATION=numbered for numbered pages, which use OFFSET and get slower the deeper the page.
+LIST_PAGINATION = os.getenv('LIST_PAGINATION', 'keyset')
+# Count every artist or venue to show the total with cursor pages. Set LIST_PAGINATION_COUNT=0 to skip the COUNT(*).
+LIST_PAGINATION_COUNT = os.getenv('LIST_PAGINATION_COUNT', '1') == '1'
+
+# Artist and venue autocomplete answers from an index in each process's memory. Changes made in another process,
+# such as the sync worker, are loaded once the index is this many seconds old.
+AUTOCOMPLETE_MAX_AGE = int(os.getenv('AUTOCOMPLETE_MAX_AGE', 300))
+
+# Each page of a show's notes is cached until a note for the show is added, edited or deleted, or for at most
+# this many seconds, so changes made some other way, such as a new username, show in time. 0 turns the cache off.
+NOTES_PAGE_CACHE_SECONDS = int(os.getenv('NOTES_PAGE_CACHE_SECONDS', 600))
+
+# The latest notes feed is kept in the cache as notes are added, edited and deleted, and read again from the database
+# after at most this many seconds, so changes made some other way, such as a sync changing a show's date, show in time.
+LATEST_NOTES_FEED_SECONDS = int(os.getenv('LATEST_NOTES_FEED_SECONDS', 600))